@@ -0,0 +1,64 @@
+"""
+Micro-benchmark: resource_discovery.arn.parse_arn over a million ARNs
+
+Compares the shared parser (one split, tuple result) with the inline
+arn.split(':') the discovery clients used to do, which extracted only region
+and account.
+
+Usage (from the repository root):
+    python -m benchmarks.arn_parse [--count 1000000]
+"""
+import argparse
+import time
+
+from resource_discovery.arn import parse_arn
+
+ACCOUNTS = [f"{100000000000 + i}" for i in range(50)]
+REGIONS = ['us-east-1', 'us-west-2', 'eu-west-1', 'ap-southeast-2', 'us-gov-west-1', '']
+SERVICES = [('ec2', 'instance/i-{:017x}'), ('lambda', 'function:fn-{:x}'), ('iam', 'role/service/r-{:x}'),
+            ('rds', 'db:db-{:x}'), ('sns', 'topic-{:x}'), ('s3', 'bucket-{:x}')]
+
+
+def sample_arns(count):
+    arns = []
+    for i in range(count):
+        service, resource = SERVICES[i % len(SERVICES)]
+        if service == 's3':
+            arns.append(f"arn:aws:s3:::{resource.format(i)}")
+            continue
+        region = '' if service == 'iam' else REGIONS[i % len(REGIONS)]
+        partition = 'aws-us-gov' if region.startswith('us-gov-') else 'aws'
+        arns.append(f"arn:{partition}:{service}:{region}:{ACCOUNTS[i % len(ACCOUNTS)]}:{resource.format(i)}")
+    return arns
+
+
+def inline_split(arn):
+    """What each converter did before (region/account only)"""
+    arn_parts = arn.split(':')
+    region = arn_parts[3] if len(arn_parts) > 3 and arn_parts[3] else 'global'
+    account_id = arn_parts[4] if len(arn_parts) > 4 else 'unknown'
+    return region, account_id
+
+
+def timed(func, arns):
+    start = time.perf_counter()
+    for arn in arns:
+        func(arn)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=1000000, help='ARNs to parse (default: 1000000)')
+    args = parser.parse_args()
+
+    arns = sample_arns(args.count)
+    baseline = timed(inline_split, arns)
+    parsed = timed(parse_arn, arns)
+    print(f"{args.count} ARNs")
+    print(f"  inline split (region/account): {baseline:6.2f}s  {baseline / args.count * 1e9:6.0f} ns/ARN")
+    print(f"  parse_arn (all components):    {parsed:6.2f}s  {parsed / args.count * 1e9:6.0f} ns/ARN")
+
+
+if __name__ == '__main__':
+    main()
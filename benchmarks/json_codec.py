@@ -0,0 +1,112 @@
+"""
+Micro-benchmark: resource_discovery.codec backends on resource payloads
+
+Times every installed backend (orjson, msgspec, json) on the JSON work
+discovery and reporting do per resource: decoding Cloud Control Properties,
+encoding tags/configuration for the database, and encoding to_dict() records
+as NDJSON lines. json.dumps(default=str), which the modules called before, is
+the baseline.
+
+Usage (from the repository root):
+    python -m benchmarks.json_codec [--count 20000]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from resource_discovery import codec
+from resource_discovery.models import DiscoverySource, Resource
+
+TYPES = ['AWS::EC2::Instance', 'AWS::Lambda::Function', 'AWS::IAM::Role', 'AWS::S3::Bucket']
+
+
+def sample_properties(i):
+    """Cloud Control Properties text of a mid-sized resource (~1.2 KB)"""
+    return json.dumps({
+        'Arn': f"arn:aws:ec2:us-east-1:123456789012:instance/i-{i:017x}",
+        'InstanceType': 't3.large',
+        'ImageId': f"ami-{i % 97:08x}",
+        'LaunchTime': '2026-03-30T12:00:00Z',
+        'SecurityGroupIds': [f"sg-{i % 13:08x}", f"sg-{i % 7:08x}"],
+        'BlockDeviceMappings': [
+            {'DeviceName': f"/dev/xvd{c}", 'Ebs': {'VolumeSize': 8 * (n + 1), 'VolumeType': 'gp3',
+                                                   'Encrypted': True, 'DeleteOnTermination': True}}
+            for n, c in enumerate('abcd')
+        ],
+        'NetworkInterfaces': [{'DeviceIndex': '0', 'SubnetId': f"subnet-{i % 31:08x}",
+                               'PrivateIpAddress': f"10.0.{i % 256}.{i % 251}",
+                               'AssociatePublicIpAddress': False}],
+        'Monitoring': {'State': 'disabled'},
+        'MetadataOptions': {'HttpTokens': 'required', 'HttpPutResponseHopLimit': 2},
+        'Tags': [{'Key': 'Name', 'Value': f"web-{i}"}, {'Key': 'Environment', 'Value': 'production'},
+                 {'Key': 'CostCenter', 'Value': str(1000 + i % 40)}, {'Key': 'Owner', 'Value': 'platform'}],
+    })
+
+
+def sample_resources(count):
+    created = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    resources = []
+    for i in range(count):
+        configuration = json.loads(sample_properties(i))
+        resources.append(Resource(
+            arn=configuration['Arn'],
+            resource_type=TYPES[i % len(TYPES)],
+            region='us-east-1',
+            account_id='123456789012',
+            name=f"web-{i}",
+            tags={t['Key']: t['Value'] for t in configuration['Tags']},
+            configuration=configuration,
+            relationships=[f"arn:aws:ec2:us-east-1:123456789012:security-group/sg-{i % 13:08x}"],
+            created_at=created + timedelta(minutes=i),
+            last_modified=created + timedelta(days=1, minutes=i),
+            source=DiscoverySource.CLOUD_CONTROL,
+        ))
+    return resources
+
+
+def timed(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=20000, help='Resources per workload (default: 20000)')
+    args = parser.parse_args()
+
+    properties = [sample_properties(i) for i in range(args.count)]
+    resources = sample_resources(args.count)
+    fields = [(r.tags, r.configuration) for r in resources]
+    records = [r.to_dict() for r in resources]
+    size = sum(map(len, properties)) / args.count
+
+    workloads = [
+        ('decode Properties', properties, lambda: codec.loads, json.loads),
+        ('encode tags+configuration', fields,
+         lambda: (lambda f: (codec.dumps(f[0]), codec.dumps(f[1]))),
+         lambda f: (json.dumps(f[0], default=str), json.dumps(f[1], default=str))),
+        ('encode NDJSON record', records, lambda: (lambda r: codec.dumpb(r, newline=True)),
+         lambda r: (json.dumps(r, default=str) + '\n').encode('utf-8')),
+    ]
+
+    print(f"{args.count} resources, ~{size:.0f} bytes of Properties each; backends: {', '.join(codec.BACKENDS)}")
+    previous = codec.backend()
+    try:
+        for label, items, codec_func, baseline_func in workloads:
+            baseline = timed(baseline_func, items)
+            print(f"  {label}")
+            print(f"    {'json module':<20} {baseline / args.count * 1e6:7.2f} us/resource")
+            for name in codec.BACKENDS:
+                codec.use_backend(name)
+                elapsed = timed(codec_func(), items)
+                print(f"    {'codec/' + name:<20} {elapsed / args.count * 1e6:7.2f} us/resource  "
+                      f"{baseline / elapsed:5.1f}x")
+    finally:
+        codec.use_backend(previous)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Memory benchmark: per-resource overhead of resource_discovery.models.Resource
+
+Compares the slotted, interning Resource with the plain dataclass it replaced.
+Resources are built from JSON lines one at a time, the way the discovery
+clients build them from API responses, so every string starts out as a fresh
+object.
+
+Usage (from the repository root):
+    python -m benchmarks.resource_memory [--count 200000]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from resource_discovery.models import DiscoverySource, Resource
+
+
+@dataclass
+class DictResource:
+    """Resource as it was before: __dict__ per instance, fresh strings and containers"""
+    arn: str
+    resource_type: str
+    region: str
+    account_id: str
+    name: Optional[str] = None
+    tags: Dict[str, str] = field(default_factory=dict)
+    configuration: Dict[str, Any] = field(default_factory=dict)
+    relationships: List[str] = field(default_factory=list)
+    created_at: Optional[datetime] = None
+    last_modified: Optional[datetime] = None
+    source: DiscoverySource = DiscoverySource.RESOURCE_EXPLORER
+
+
+ACCOUNTS = [f"{100000000000 + i}" for i in range(20)]
+REGIONS = ['us-east-1', 'us-east-2', 'us-west-2', 'eu-west-1', 'ap-southeast-2']
+TYPES = ['AWS::EC2::Instance', 'AWS::S3::Bucket', 'AWS::IAM::Role', 'AWS::Lambda::Function',
+         'AWS::EC2::SecurityGroup', 'AWS::EC2::Volume', 'AWS::RDS::DBInstance']
+
+
+def sample_lines(count):
+    """JSON lines resembling Resource Explorer results; most resources carry no tags"""
+    lines = []
+    for i in range(count):
+        account, region, resource_type = ACCOUNTS[i % 20], REGIONS[i % 5], TYPES[i % 7]
+        lines.append(json.dumps({
+            'arn': f"arn:aws:{resource_type.split('::')[1].lower()}:{region}:{account}:resource/r-{i:08x}",
+            'resource_type': resource_type,
+            'region': region,
+            'account_id': account,
+            'name': f"r-{i:08x}",
+            'tags': {'Environment': 'prod'} if i % 4 == 0 else {},
+            'configuration': {},
+            'relationships': [],
+        }))
+    return lines
+
+
+def measure(model, lines):
+    """Bytes allocated per resource to build and hold `model` instances for every line"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    resources = [model(**json.loads(line)) for line in lines]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    assert len(resources) == len(lines)
+    return used / len(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--count', type=int, default=200000, help='Resources to build (default: 200000)')
+    args = parser.parse_args()
+
+    lines = sample_lines(args.count)
+    before = measure(DictResource, lines)
+    after = measure(Resource, lines)
+    print(f"{args.count} resources")
+    print(f"  dataclass with __dict__: {before:8.1f} bytes/resource")
+    print(f"  slotted Resource:        {after:8.1f} bytes/resource")
+    print(f"  saved:                   {before - after:8.1f} bytes/resource ({1 - after / before:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -28,6 +28,31 @@ CREATE INDEX IF NOT EXISTS idx_resources_inserted ON public.resources(inserted_a
 CREATE INDEX IF NOT EXISTS idx_resources_arn ON public.resources(resource_arn);
 CREATE INDEX IF NOT EXISTS idx_resources_tags ON public.resources USING GIN (tags);
 
+-- Search: trigram indexes for partial name/ARN matches, tsvector over identifying properties
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE public.resources ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', COALESCE(name, '')), 'A') ||
+    setweight(to_tsvector('simple', COALESCE(resource_id, '')), 'B') ||
+    setweight(to_tsvector('simple',
+        COALESCE(tags->>'Name', '') || ' ' ||
+        COALESCE(properties->>'BucketName', '') || ' ' ||
+        COALESCE(properties->>'FunctionName', '') || ' ' ||
+        COALESCE(properties->>'DBInstanceIdentifier', '') || ' ' ||
+        COALESCE(properties->>'DBClusterIdentifier', '') || ' ' ||
+        COALESCE(properties->>'ClusterName', '') || ' ' ||
+        COALESCE(properties->>'TableName', '') || ' ' ||
+        COALESCE(properties->>'InstanceId', '') || ' ' ||
+        COALESCE(properties->>'InstanceType', '') || ' ' ||
+        COALESCE(properties->>'Engine', '') || ' ' ||
+        COALESCE(properties->>'VpcId', '')
+    ), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_resources_name_trgm ON public.resources USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_resources_arn_trgm ON public.resources USING GIN (resource_arn gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_resources_search ON public.resources USING GIN (search_vector);
+
 -- Resource relationships table
 CREATE TABLE IF NOT EXISTS public.resource_relationships (
     id BIGSERIAL PRIMARY KEY,
@@ -57,12 +82,119 @@ CREATE TABLE IF NOT EXISTS public.discovery_runs (
 CREATE INDEX IF NOT EXISTS idx_discovery_runs_started ON public.discovery_runs(started_at DESC);
 CREATE INDEX IF NOT EXISTS idx_discovery_runs_status ON public.discovery_runs(status);
 
+-- One row per distinct error of a run (account, region, source, operation, error code),
+-- with its count and a few sample messages, for querying which accounts fail and why
+CREATE TABLE IF NOT EXISTS public.discovery_run_errors (
+    id BIGSERIAL PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES public.discovery_runs(run_id) ON DELETE CASCADE,
+    account_id TEXT NOT NULL DEFAULT '',
+    region TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    operation TEXT NOT NULL DEFAULT '',
+    error_code TEXT NOT NULL,
+    error_count INTEGER NOT NULL DEFAULT 1,
+    first_seen_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_seen_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    sample_messages TEXT[] NOT NULL DEFAULT '{}',
+    UNIQUE (run_id, account_id, region, source, operation, error_code)
+);
+
+CREATE INDEX IF NOT EXISTS idx_discovery_run_errors_account ON public.discovery_run_errors(account_id, last_seen_at DESC);
+CREATE INDEX IF NOT EXISTS idx_discovery_run_errors_code ON public.discovery_run_errors(error_code, last_seen_at DESC);
+
+-- Field-level change log for the diff report. Rows are written by trigger only
+-- when an upsert actually changes name, tags or properties (one JSONB entry per
+-- changed field: {"properties.InstanceType": {"old": ..., "new": ...}}), tagged
+-- with the discovery run saving the resources (the cloudauditor.run_id setting).
+-- Additions and removals are derived from inserted_at / last_seen_at instead.
+-- Only the changes of the last few runs are kept (DatabaseClient.prune_resource_changes).
+CREATE TABLE IF NOT EXISTS public.resource_changes (
+    id BIGSERIAL PRIMARY KEY,
+    resource_pk BIGINT NOT NULL REFERENCES public.resources(id) ON DELETE CASCADE,
+    changes JSONB NOT NULL,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    run_id TEXT
+);
+
+ALTER TABLE public.resource_changes ADD COLUMN IF NOT EXISTS run_id TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_resource_changes_changed ON public.resource_changes(changed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_resource_changes_resource ON public.resource_changes(resource_pk);
+CREATE INDEX IF NOT EXISTS idx_resource_changes_run ON public.resource_changes(run_id);
+
+CREATE OR REPLACE FUNCTION public.record_resource_change() RETURNS trigger AS $$
+DECLARE
+    diff JSONB;
+    old_tags JSONB := CASE WHEN jsonb_typeof(OLD.tags) = 'object' AND jsonb_typeof(NEW.tags) = 'object' THEN OLD.tags END;
+    new_tags JSONB := CASE WHEN jsonb_typeof(OLD.tags) = 'object' AND jsonb_typeof(NEW.tags) = 'object' THEN NEW.tags END;
+    old_props JSONB := CASE WHEN jsonb_typeof(OLD.properties) = 'object' AND jsonb_typeof(NEW.properties) = 'object' THEN OLD.properties END;
+    new_props JSONB := CASE WHEN jsonb_typeof(OLD.properties) = 'object' AND jsonb_typeof(NEW.properties) = 'object' THEN NEW.properties END;
+BEGIN
+    SELECT jsonb_object_agg(field, jsonb_build_object('old', old_value, 'new', new_value))
+    INTO diff
+    FROM (
+        SELECT 'name' AS field, to_jsonb(OLD.name) AS old_value, to_jsonb(NEW.name) AS new_value
+        UNION ALL
+        -- Non-object payloads are compared whole
+        SELECT 'tags', OLD.tags, NEW.tags WHERE old_tags IS NULL
+        UNION ALL
+        SELECT 'tags.' || key, o.value, n.value
+        FROM jsonb_each(old_tags) o FULL JOIN jsonb_each(new_tags) n USING (key)
+        UNION ALL
+        SELECT 'properties', OLD.properties, NEW.properties WHERE old_props IS NULL
+        UNION ALL
+        SELECT 'properties.' || key, o.value, n.value
+        FROM jsonb_each(old_props) o FULL JOIN jsonb_each(new_props) n USING (key)
+    ) fields
+    WHERE old_value IS DISTINCT FROM new_value;
+
+    IF diff IS NOT NULL THEN
+        INSERT INTO public.resource_changes (resource_pk, changes, run_id)
+        VALUES (NEW.id, diff, NULLIF(current_setting('cloudauditor.run_id', true), ''));
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resources_record_change ON public.resources;
+CREATE TRIGGER trg_resources_record_change
+    AFTER UPDATE ON public.resources
+    FOR EACH ROW
+    WHEN (OLD.name IS DISTINCT FROM NEW.name
+          OR OLD.tags IS DISTINCT FROM NEW.tags
+          OR OLD.properties IS DISTINCT FROM NEW.properties)
+    EXECUTE FUNCTION public.record_resource_change();
+
+-- Asynchronous report jobs (submitted via the report generator, run in a separate invocation)
+CREATE TABLE IF NOT EXISTS public.report_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'queued',
+    request JSONB NOT NULL,
+    rows_processed BIGINT NOT NULL DEFAULT 0,
+    sheets_completed INTEGER NOT NULL DEFAULT 0,
+    s3_bucket TEXT,
+    s3_key TEXT,
+    result JSONB,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_report_jobs_created ON public.report_jobs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_report_jobs_status ON public.report_jobs(status);
+
 -- Comments for documentation
 COMMENT ON TABLE public.resources IS 'Stores all discovered AWS resources from Resource Explorer, Config, and Cloud Control APIs';
 COMMENT ON TABLE public.resource_relationships IS 'Tracks relationships between AWS resources (e.g., EC2 instance -> VPC)';
 COMMENT ON TABLE public.discovery_runs IS 'Tracks resource discovery execution history and metrics';
+COMMENT ON TABLE public.discovery_run_errors IS 'Errors of each discovery run counted per account, region, source, operation and error code, with sample messages';
+COMMENT ON TABLE public.resource_changes IS 'Field-level old/new values for resources whose name, tags or properties changed on upsert (used by the diff report)';
+COMMENT ON TABLE public.report_jobs IS 'Asynchronous report generation jobs: request, progress (rows processed, sheets done) and resulting S3 object';
 
 COMMENT ON COLUMN public.resources.properties IS 'Full JSON representation of the resource from AWS API';
 COMMENT ON COLUMN public.resources.tags IS 'Resource tags as JSON key-value pairs';
 COMMENT ON COLUMN public.resources.last_seen_at IS 'Last time this resource was seen during discovery (for detecting deleted resources)';
+COMMENT ON COLUMN public.resources.search_vector IS 'Weighted full-text vector over name, resource_id and identifying property values (used by the search report)';
 COMMENT ON COLUMN public.resources.inserted_at IS 'Timestamp when this resource was first inserted into the database (never updated on subsequent discoveries)';
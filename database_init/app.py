@@ -2,14 +2,26 @@
 Database Initialization Lambda Function
 Automatically creates database schema when CloudFormation stack is deployed
 """
+import hashlib
 import json
 import os
+import re
 import boto3
 import psycopg
 import urllib3
 
+try:
+    from property_sql import PROPERTY_PATH_RE, RESOURCE_TYPE_RE, property_expression
+except ImportError:  # imported as a package (tests, tooling) rather than from the Lambda's code root
+    from database_init.property_sql import PROPERTY_PATH_RE, RESOURCE_TYPE_RE, property_expression
+
 http = urllib3.PoolManager()
 
+# Partial expression indexes on resources.properties, one per (resource_type, property path)
+# listed in property_indexes.json. The query layer (lib/property_indexes.py) reads the same file.
+PROPERTY_INDEX_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'property_indexes.json')
+PROPERTY_INDEX_PREFIX = 'idx_resprop_'
+
 def get_secret(secret_name, region):
     """Retrieve database credentials from Secrets Manager"""
     client = boto3.client('secretsmanager', region_name=region)
@@ -35,6 +47,69 @@ def send_response(event, context, response_status, response_data):
     except Exception as e:
         print(f"Failed to send response: {e}")
 
+def load_property_index_registry(path=None):
+    """Load the resource type -> hot property paths registry"""
+    with open(path or os.environ.get('PROPERTY_INDEX_CONFIG', PROPERTY_INDEX_CONFIG)) as f:
+        registry = json.load(f)
+    
+    for resource_type, paths in registry.items():
+        if not RESOURCE_TYPE_RE.match(resource_type):
+            raise ValueError(f"Invalid resource type in property index registry: {resource_type!r}")
+        for path in paths:
+            if not PROPERTY_PATH_RE.match(path):
+                raise ValueError(f"Invalid property path in property index registry: {path!r}")
+    return registry
+
+def property_index_name(resource_type, path):
+    """Deterministic index name for a (resource_type, property path) pair, within Postgres' 63 char limit"""
+    slug = re.sub(r'[^a-z0-9]+', '_', f"{resource_type}_{path}".lower()).strip('_')
+    name = f"{PROPERTY_INDEX_PREFIX}{slug}"
+    if len(name) > 63:
+        digest = hashlib.md5(f"{resource_type}:{path}".encode()).hexdigest()[:8]
+        name = f"{name[:54]}_{digest}"
+    return name
+
+def sync_property_indexes(cursor, registry):
+    """
+    Create and drop partial expression indexes so they match the registry.
+    Uses CREATE/DROP INDEX CONCURRENTLY, so the connection must be in autocommit mode.
+    Invalid indexes left behind by a failed concurrent build are dropped and rebuilt.
+    """
+    desired = {
+        property_index_name(resource_type, path): (resource_type, path)
+        for resource_type, paths in registry.items()
+        for path in paths
+    }
+    
+    cursor.execute("""
+        SELECT c.relname, i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public' AND c.relname LIKE %s
+    """, (PROPERTY_INDEX_PREFIX.replace('_', '\\_') + '%',))
+    existing = {name: valid for name, valid in cursor.fetchall()}
+    
+    dropped = []
+    for name, valid in existing.items():
+        if name not in desired or not valid:
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS public.{name}")
+            dropped.append(name)
+    
+    created = []
+    for name, (resource_type, path) in desired.items():
+        if existing.get(name):
+            continue
+        cursor.execute(f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS {name}
+            ON public.resources (({property_expression(path)}))
+            WHERE resource_type = '{resource_type}'
+        """)
+        created.append(name)
+    
+    print(f"Property indexes: created {created or 'none'}, dropped {dropped or 'none'}")
+    return created, dropped
+
 def initialize_database(db_host, db_name, db_user, db_password, db_port=5432):
     """Initialize database schema"""
     print(f"Connecting to database: {db_host}:{db_port}/{db_name}")
@@ -66,6 +141,31 @@ CREATE INDEX IF NOT EXISTS idx_resources_inserted ON public.resources(inserted_a
 CREATE INDEX IF NOT EXISTS idx_resources_arn ON public.resources(resource_arn);
 CREATE INDEX IF NOT EXISTS idx_resources_tags ON public.resources USING GIN (tags);
 
+-- Search: trigram indexes for partial name/ARN matches, tsvector over identifying properties
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE public.resources ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', COALESCE(name, '')), 'A') ||
+    setweight(to_tsvector('simple', COALESCE(resource_id, '')), 'B') ||
+    setweight(to_tsvector('simple',
+        COALESCE(tags->>'Name', '') || ' ' ||
+        COALESCE(properties->>'BucketName', '') || ' ' ||
+        COALESCE(properties->>'FunctionName', '') || ' ' ||
+        COALESCE(properties->>'DBInstanceIdentifier', '') || ' ' ||
+        COALESCE(properties->>'DBClusterIdentifier', '') || ' ' ||
+        COALESCE(properties->>'ClusterName', '') || ' ' ||
+        COALESCE(properties->>'TableName', '') || ' ' ||
+        COALESCE(properties->>'InstanceId', '') || ' ' ||
+        COALESCE(properties->>'InstanceType', '') || ' ' ||
+        COALESCE(properties->>'Engine', '') || ' ' ||
+        COALESCE(properties->>'VpcId', '')
+    ), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_resources_name_trgm ON public.resources USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_resources_arn_trgm ON public.resources USING GIN (resource_arn gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_resources_search ON public.resources USING GIN (search_vector);
+
 CREATE TABLE IF NOT EXISTS public.resource_relationships (
     id BIGSERIAL PRIMARY KEY,
     source_resource_id BIGINT NOT NULL REFERENCES public.resources(id) ON DELETE CASCADE,
@@ -93,6 +193,109 @@ CREATE TABLE IF NOT EXISTS public.discovery_runs (
 CREATE INDEX IF NOT EXISTS idx_discovery_runs_started ON public.discovery_runs(started_at DESC);
 CREATE INDEX IF NOT EXISTS idx_discovery_runs_status ON public.discovery_runs(status);
 
+-- One row per distinct error of a run (account, region, source, operation, error code),
+-- with its count and a few sample messages, for querying which accounts fail and why
+CREATE TABLE IF NOT EXISTS public.discovery_run_errors (
+    id BIGSERIAL PRIMARY KEY,
+    run_id TEXT NOT NULL REFERENCES public.discovery_runs(run_id) ON DELETE CASCADE,
+    account_id TEXT NOT NULL DEFAULT '',
+    region TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    operation TEXT NOT NULL DEFAULT '',
+    error_code TEXT NOT NULL,
+    error_count INTEGER NOT NULL DEFAULT 1,
+    first_seen_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_seen_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    sample_messages TEXT[] NOT NULL DEFAULT '{}',
+    UNIQUE (run_id, account_id, region, source, operation, error_code)
+);
+
+CREATE INDEX IF NOT EXISTS idx_discovery_run_errors_account ON public.discovery_run_errors(account_id, last_seen_at DESC);
+CREATE INDEX IF NOT EXISTS idx_discovery_run_errors_code ON public.discovery_run_errors(error_code, last_seen_at DESC);
+
+-- Field-level change log for the diff report. Rows are written by trigger only
+-- when an upsert actually changes name, tags or properties (one JSONB entry per
+-- changed field: {"properties.InstanceType": {"old": ..., "new": ...}}), tagged
+-- with the discovery run saving the resources (the cloudauditor.run_id setting).
+-- Additions and removals are derived from inserted_at / last_seen_at instead.
+-- Only the changes of the last few runs are kept (DatabaseClient.prune_resource_changes).
+CREATE TABLE IF NOT EXISTS public.resource_changes (
+    id BIGSERIAL PRIMARY KEY,
+    resource_pk BIGINT NOT NULL REFERENCES public.resources(id) ON DELETE CASCADE,
+    changes JSONB NOT NULL,
+    changed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    run_id TEXT
+);
+
+ALTER TABLE public.resource_changes ADD COLUMN IF NOT EXISTS run_id TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_resource_changes_changed ON public.resource_changes(changed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_resource_changes_resource ON public.resource_changes(resource_pk);
+CREATE INDEX IF NOT EXISTS idx_resource_changes_run ON public.resource_changes(run_id);
+
+CREATE OR REPLACE FUNCTION public.record_resource_change() RETURNS trigger AS $$
+DECLARE
+    diff JSONB;
+    old_tags JSONB := CASE WHEN jsonb_typeof(OLD.tags) = 'object' AND jsonb_typeof(NEW.tags) = 'object' THEN OLD.tags END;
+    new_tags JSONB := CASE WHEN jsonb_typeof(OLD.tags) = 'object' AND jsonb_typeof(NEW.tags) = 'object' THEN NEW.tags END;
+    old_props JSONB := CASE WHEN jsonb_typeof(OLD.properties) = 'object' AND jsonb_typeof(NEW.properties) = 'object' THEN OLD.properties END;
+    new_props JSONB := CASE WHEN jsonb_typeof(OLD.properties) = 'object' AND jsonb_typeof(NEW.properties) = 'object' THEN NEW.properties END;
+BEGIN
+    SELECT jsonb_object_agg(field, jsonb_build_object('old', old_value, 'new', new_value))
+    INTO diff
+    FROM (
+        SELECT 'name' AS field, to_jsonb(OLD.name) AS old_value, to_jsonb(NEW.name) AS new_value
+        UNION ALL
+        -- Non-object payloads are compared whole
+        SELECT 'tags', OLD.tags, NEW.tags WHERE old_tags IS NULL
+        UNION ALL
+        SELECT 'tags.' || key, o.value, n.value
+        FROM jsonb_each(old_tags) o FULL JOIN jsonb_each(new_tags) n USING (key)
+        UNION ALL
+        SELECT 'properties', OLD.properties, NEW.properties WHERE old_props IS NULL
+        UNION ALL
+        SELECT 'properties.' || key, o.value, n.value
+        FROM jsonb_each(old_props) o FULL JOIN jsonb_each(new_props) n USING (key)
+    ) fields
+    WHERE old_value IS DISTINCT FROM new_value;
+
+    IF diff IS NOT NULL THEN
+        INSERT INTO public.resource_changes (resource_pk, changes, run_id)
+        VALUES (NEW.id, diff, NULLIF(current_setting('cloudauditor.run_id', true), ''));
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resources_record_change ON public.resources;
+CREATE TRIGGER trg_resources_record_change
+    AFTER UPDATE ON public.resources
+    FOR EACH ROW
+    WHEN (OLD.name IS DISTINCT FROM NEW.name
+          OR OLD.tags IS DISTINCT FROM NEW.tags
+          OR OLD.properties IS DISTINCT FROM NEW.properties)
+    EXECUTE FUNCTION public.record_resource_change();
+
+-- Asynchronous report jobs (submitted via the report generator, run in a separate invocation)
+CREATE TABLE IF NOT EXISTS public.report_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'queued',
+    request JSONB NOT NULL,
+    rows_processed BIGINT NOT NULL DEFAULT 0,
+    sheets_completed INTEGER NOT NULL DEFAULT 0,
+    s3_bucket TEXT,
+    s3_key TEXT,
+    result JSONB,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_report_jobs_created ON public.report_jobs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_report_jobs_status ON public.report_jobs(status);
+
 CREATE TABLE IF NOT EXISTS public.monitored_accounts (
     account_id TEXT PRIMARY KEY,
     account_name TEXT,
@@ -145,10 +348,16 @@ CREATE INDEX IF NOT EXISTS idx_monitored_accounts_status ON public.monitored_acc
             SELECT table_name 
             FROM information_schema.tables 
             WHERE table_schema = 'public' 
-            AND table_name IN ('resources', 'resource_relationships', 'discovery_runs')
+            AND table_name IN ('resources', 'resource_relationships', 'discovery_runs', 'discovery_run_errors')
         """)
         tables = cursor.fetchall()
         
+        # Per-resource-type JSONB expression indexes (non-fatal: schema is usable without them)
+        try:
+            sync_property_indexes(cursor, load_property_index_registry())
+        except Exception as e:
+            print(f"Property index sync failed: {e}")
+        
         cursor.close()
         conn.close()
         
@@ -0,0 +1,26 @@
+"""
+Property paths and their SQL expressions, shared by the index DDL (app.py)
+and the query layer (lib/property_indexes.py)
+
+The query layer has to build the exact expression an index was created on,
+or the planner won't match its predicates to the partial expression indexes.
+This module ships with the database init Lambda, so it only uses the
+standard library.
+"""
+import re
+
+RESOURCE_TYPE_RE = re.compile(r'^[A-Za-z0-9:_.-]+$')
+PROPERTY_PATH_RE = re.compile(r'^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$')
+
+
+def property_expression(path):
+    """
+    SQL expression for a dotted property path, e.g. State.Name -> properties->'State'->>'Name'
+
+    Raises:
+        ValueError: If the path isn't dot-separated [A-Za-z0-9_] keys
+    """
+    if not PROPERTY_PATH_RE.match(path):
+        raise ValueError(f"Invalid property path: {path!r}")
+    keys = path.split('.')
+    return 'properties' + ''.join(f"->'{k}'" for k in keys[:-1]) + f"->>'{keys[-1]}'"
@@ -2,28 +2,113 @@
 Database Query Lambda Function
 Allows remote querying of the CloudAuditor database via Lambda invocation
 """
-import json
 import logging
 from lib.database import DatabaseClient
+from lib.property_indexes import build_property_filter
+from resource_discovery import codec
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+VALID_REPORT_TYPES = ['summary', 'accounts', 'by_type', 'by_account', 'resources', 'search', 'dashboard']
+
+# Bounds of the 'search' paging parameters; OFFSET still reads the skipped rows, so deep pages are capped
+MAX_LIMIT = 10000
+MAX_OFFSET = 100000
+
+# GROUPING(account_id, resource_type, region) bitmask for each dashboard grouping set
+# (a set bit means the column is aggregated away in that row)
+DASHBOARD_TOTAL = 0b111
+DASHBOARD_BY_ACCOUNT = 0b011
+DASHBOARD_BY_TYPE = 0b101
+DASHBOARD_BY_REGION = 0b110
+DASHBOARD_BY_ACCOUNT_TYPE = 0b001
+
+
+def _latest_snapshot_filter(account_ids):
+    """
+    Build the latest-run CTE and WHERE clause (optionally scoped to accounts).
+    
+    Returns:
+        (latest_cte, where_clause, params)
+    """
+    cte_filter = ""
+    cte_params = []
+    if account_ids:
+        placeholders = ", ".join(["%s"] * len(account_ids))
+        cte_filter = f"WHERE account_id IN ({placeholders})"
+        cte_params = list(account_ids)
+
+    latest_cte = f"""
+        WITH latest_date AS (
+            SELECT DATE(MAX(inserted_at)) as max_date
+            FROM resources {cte_filter}
+        )
+    """
+    latest_where = "DATE(inserted_at) = (SELECT max_date FROM latest_date)"
+    if account_ids:
+        # params: CTE filter + main WHERE filter
+        return latest_cte, f"{latest_where} AND account_id IN ({placeholders})", cte_params + list(account_ids)
+    return latest_cte, latest_where, []
+
+
+def _int_param(event, name, default, minimum, maximum):
+    """
+    An integer event parameter within [minimum, maximum].
+
+    Raises:
+        ValueError: If the value isn't an integer in range
+    """
+    value = event.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"'{name}' must be an integer")
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer") from None
+    if not minimum <= value <= maximum:
+        raise ValueError(f"'{name}' must be between {minimum} and {maximum}")
+    return value
+
+
+def _escape_like(term):
+    """Escape LIKE/ILIKE wildcards so user input is matched literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
 def lambda_handler(event, context):
     """
     Query the CloudAuditor database.
     
     Event parameters:
-    - report_type: 'summary', 'accounts', 'by_type', 'by_account', 'resources'
-    - query: Custom SQL query (optional, use with caution)
-    - limit: Result limit for list queries (default: 100)
+    - report_type: 'summary', 'accounts', 'by_type', 'by_account', 'resources', 'search', 'dashboard'
+    - query: Custom SQL query (optional, use with caution). Runs on the writer, so
+      maintenance statements (DELETE, ALTER, ...) work; pass read_only=true for the reader
+    - limit: Result limit for list queries (default: 100; for 'search' at most MAX_LIMIT)
+    - search: Name/ARN fragment or keywords (required for 'search')
+    - offset: Pagination offset for 'search' (default: 0, at most MAX_OFFSET)
+    - resource_type: Restrict 'resources' to one resource type
+    - properties: Property filters for 'resources', e.g. {"InstanceType": "t3.micro"}
+      (requires resource_type; registered paths hit the partial expression indexes)
     """
     try:
         report_type = event.get('report_type', 'summary')
         custom_query = event.get('query')
         limit = event.get('limit', 100)
+        offset = 0
+        if report_type == 'search' and not custom_query:
+            try:
+                limit = _int_param(event, 'limit', 100, 1, MAX_LIMIT)
+                offset = _int_param(event, 'offset', 0, 0, MAX_OFFSET)
+            except ValueError as e:
+                return {
+                    'statusCode': 400,
+                    'body': codec.dumps({'error': str(e)})
+                }
         
-        db = DatabaseClient()
+        # Canned reports only read, so they go to the reader endpoint; custom queries
+        # may modify data and stay on the writer unless the caller opts in
+        db = DatabaseClient(read_only=not custom_query or bool(event.get('read_only')))
         conn = db._get_connection()
         
         results = {}
@@ -34,39 +119,21 @@ def lambda_handler(event, context):
             logger.info(f"Executing custom query: {custom_query}")
             with conn.cursor() as cur:
                 cur.execute(custom_query)
-                rows = cur.fetchall()
+                # DML/DDL statements return no result set
+                rows = cur.fetchall() if cur.description else []
                 results = {
                     'query': custom_query,
                     'rows': [list(row) for row in rows],
-                    'row_count': len(rows)
+                    'row_count': len(rows) if cur.description else cur.rowcount
                 }
         
         elif report_type == 'summary':
             with conn.cursor() as cur:
-                # Build latest-only CTE + account filter (matches report generator logic)
-                cte_filter = ""
-                cte_params = []
+                # Latest-only CTE + account filter (matches report generator logic)
+                latest_cte, acct_where, query_params = _latest_snapshot_filter(account_ids)
                 if account_ids:
-                    placeholders = ", ".join(["%s"] * len(account_ids))
-                    cte_filter = f"WHERE account_id IN ({placeholders})"
-                    cte_params = list(account_ids)
                     logger.info(f"Summary filtered by {len(account_ids)} accounts")
 
-                latest_cte = f"""
-                    WITH latest_date AS (
-                        SELECT DATE(MAX(inserted_at)) as max_date
-                        FROM resources {cte_filter}
-                    )
-                """
-                latest_where = "DATE(inserted_at) = (SELECT max_date FROM latest_date)"
-                if account_ids:
-                    acct_where = f"{latest_where} AND account_id IN ({placeholders})"
-                    # params: CTE filter + main WHERE filter
-                    query_params = cte_params + list(account_ids)
-                else:
-                    acct_where = latest_where
-                    query_params = []
-
                 # Total resources (latest run only)
                 cur.execute(f"{latest_cte} SELECT COUNT(*) FROM resources WHERE {acct_where}",
                             query_params or None)
@@ -84,7 +151,9 @@ def lambda_handler(event, context):
                 
                 # Monitored accounts (scoped if account_ids provided)
                 if account_ids:
-                    cur.execute(f"SELECT COUNT(*) FROM monitored_accounts WHERE account_id IN ({placeholders})", cte_params)
+                    placeholders = ", ".join(["%s"] * len(account_ids))
+                    cur.execute(f"SELECT COUNT(*) FROM monitored_accounts WHERE account_id IN ({placeholders})",
+                                list(account_ids))
                 else:
                     cur.execute("SELECT COUNT(*) FROM monitored_accounts")
                 monitored = cur.fetchone()[0]
@@ -126,27 +195,9 @@ def lambda_handler(event, context):
         
         elif report_type == 'by_type':
             with conn.cursor() as cur:
-                # Build latest-only CTE + account filter (matches report generator logic)
-                cte_filter = ""
-                cte_params = []
-                if account_ids:
-                    placeholders = ", ".join(["%s"] * len(account_ids))
-                    cte_filter = f"WHERE account_id IN ({placeholders})"
-                    cte_params = list(account_ids)
-
-                latest_cte = f"""
-                    WITH latest_date AS (
-                        SELECT DATE(MAX(inserted_at)) as max_date
-                        FROM resources {cte_filter}
-                    )
-                """
-                latest_where = "DATE(inserted_at) = (SELECT max_date FROM latest_date)"
-                if account_ids:
-                    acct_where = f"{latest_where} AND account_id IN ({placeholders})"
-                    query_params = cte_params + list(account_ids) + [limit]
-                else:
-                    acct_where = latest_where
-                    query_params = [limit]
+                # Latest-only CTE + account filter (matches report generator logic)
+                latest_cte, acct_where, query_params = _latest_snapshot_filter(account_ids)
+                query_params = query_params + [limit]
 
                 cur.execute(f"""
                     {latest_cte}
@@ -187,13 +238,40 @@ def lambda_handler(event, context):
                 results = {'accounts': accounts, 'count': len(accounts)}
         
         elif report_type == 'resources':
+            resource_type = event.get('resource_type')
+            property_filters = event.get('properties') or {}
+            if property_filters and not resource_type:
+                return {
+                    'statusCode': 400,
+                    'body': codec.dumps({'error': "'properties' filters require a 'resource_type'"})
+                }
+
+            where_clauses = []
+            query_params = []
+            if resource_type:
+                try:
+                    type_filter, type_params = build_property_filter(resource_type, property_filters)
+                except ValueError as e:
+                    return {
+                        'statusCode': 400,
+                        'body': codec.dumps({'error': str(e)})
+                    }
+                where_clauses.append(type_filter)
+                query_params.extend(type_params)
+            if account_ids:
+                placeholders = ", ".join(["%s"] * len(account_ids))
+                where_clauses.append(f"account_id IN ({placeholders})")
+                query_params.extend(account_ids)
+            where = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+
             with conn.cursor() as cur:
-                cur.execute("""
+                cur.execute(f"""
                     SELECT account_id, region, resource_type, resource_id, name, discovered_at
                     FROM resources
+                    {where}
                     ORDER BY discovered_at DESC
                     LIMIT %s
-                """, (limit,))
+                """, query_params + [limit])
                 
                 resources = []
                 for row in cur.fetchall():
@@ -208,29 +286,147 @@ def lambda_handler(event, context):
                 
                 results = {'resources': resources, 'count': len(resources)}
         
+        elif report_type == 'dashboard':
+            latest_cte, acct_where, query_params = _latest_snapshot_filter(account_ids)
+
+            with conn.cursor() as cur:
+                # One scan of the latest snapshot produces every breakdown the SPA needs
+                cur.execute(f"""
+                    {latest_cte}
+                    SELECT account_id, resource_type, region,
+                           GROUPING(account_id, resource_type, region) AS grouping_set,
+                           COUNT(*) AS count,
+                           MAX(discovered_at) AS latest_scan
+                    FROM resources
+                    WHERE {acct_where}
+                    GROUP BY GROUPING SETS ((), (account_id), (resource_type), (region), (account_id, resource_type))
+                    ORDER BY grouping_set, count DESC
+                """, query_params or None)
+                rows = cur.fetchall()
+
+                if account_ids:
+                    placeholders = ", ".join(["%s"] * len(account_ids))
+                    cur.execute(f"SELECT COUNT(*) FROM monitored_accounts WHERE account_id IN ({placeholders})",
+                                list(account_ids))
+                else:
+                    cur.execute("SELECT COUNT(*) FROM monitored_accounts")
+                monitored = cur.fetchone()[0]
+
+            total_resources = 0
+            latest_scan = None
+            by_account, by_type, by_region, by_account_type = [], [], [], []
+            types_per_account = {}
+            for account_id, resource_type, region, grouping_set, count, scan in rows:
+                if grouping_set == DASHBOARD_TOTAL:
+                    total_resources = count
+                    latest_scan = scan
+                elif grouping_set == DASHBOARD_BY_ACCOUNT:
+                    by_account.append({'account_id': account_id, 'resource_count': count})
+                elif grouping_set == DASHBOARD_BY_TYPE:
+                    by_type.append({'resource_type': resource_type, 'count': count})
+                elif grouping_set == DASHBOARD_BY_REGION:
+                    by_region.append({'region': region, 'count': count})
+                elif grouping_set == DASHBOARD_BY_ACCOUNT_TYPE:
+                    by_account_type.append({'account_id': account_id, 'resource_type': resource_type, 'count': count})
+                    types_per_account[account_id] = types_per_account.get(account_id, 0) + 1
+
+            for entry in by_account:
+                entry['resource_types'] = types_per_account.get(entry['account_id'], 0)
+
+            results = {
+                'summary': {
+                    'total_resources': total_resources,
+                    'unique_resource_types': len(by_type),
+                    'accounts_with_resources': len(by_account),
+                    'regions': len(by_region),
+                    'monitored_accounts': monitored,
+                    'latest_scan': str(latest_scan) if latest_scan else None
+                },
+                'by_account': by_account,
+                'by_type': by_type,
+                'by_region': by_region,
+                'by_account_type': by_account_type
+            }
+
+        elif report_type == 'search':
+            term = (event.get('search') or '').strip()
+            if not term:
+                return {
+                    'statusCode': 400,
+                    'body': codec.dumps({'error': "report_type 'search' requires a 'search' term"})
+                }
+            pattern = f"%{_escape_like(term)}%"
+
+            account_filter = ""
+            account_params = []
+            if account_ids:
+                placeholders = ", ".join(["%s"] * len(account_ids))
+                account_filter = f"AND account_id IN ({placeholders})"
+                account_params = list(account_ids)
+
+            with conn.cursor() as cur:
+                # ILIKE on name/resource_arn is served by the pg_trgm GIN indexes,
+                # keyword matches by the search_vector GIN index.
+                # Fetch one extra row to report whether another page exists.
+                cur.execute(f"""
+                    SELECT account_id, region, resource_type, resource_id, resource_arn, name,
+                           GREATEST(
+                               similarity(COALESCE(name, ''), %s),
+                               similarity(COALESCE(resource_arn, ''), %s),
+                               ts_rank(search_vector, query)
+                           ) AS score
+                    FROM resources, plainto_tsquery('simple', %s) AS query
+                    WHERE (name ILIKE %s OR resource_arn ILIKE %s OR search_vector @@ query)
+                    {account_filter}
+                    ORDER BY score DESC, resource_arn
+                    LIMIT %s OFFSET %s
+                """, [term, term, term, pattern, pattern] + account_params + [limit + 1, offset])
+
+                rows = cur.fetchall()
+                matches = []
+                for row in rows[:limit]:
+                    matches.append({
+                        'account_id': row[0],
+                        'region': row[1],
+                        'resource_type': row[2],
+                        'resource_id': row[3],
+                        'arn': row[4],
+                        'name': row[5],
+                        'score': round(float(row[6]), 4)
+                    })
+
+                results = {
+                    'search': term,
+                    'resources': matches,
+                    'count': len(matches),
+                    'offset': offset,
+                    'limit': limit,
+                    'has_more': len(rows) > limit
+                }
+
         else:
             return {
                 'statusCode': 400,
-                'body': json.dumps({
+                'body': codec.dumps({
                     'error': f'Unknown report_type: {report_type}',
-                    'valid_types': ['summary', 'accounts', 'by_type', 'by_account', 'resources']
+                    'valid_types': VALID_REPORT_TYPES
                 })
             }
         
         return {
             'statusCode': 200,
-            'body': json.dumps({
+            'body': codec.dumps({
                 'success': True,
                 'report_type': report_type,
                 'results': results
-            }, default=str)
+            })
         }
         
     except Exception as e:
         logger.exception("Query failed")
         return {
             'statusCode': 500,
-            'body': json.dumps({
+            'body': codec.dumps({
                 'success': False,
                 'error': str(e)
             })
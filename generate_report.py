@@ -4,16 +4,22 @@ Generate Excel report from CloudAuditor Aurora database
 """
 import argparse
 import logging
-import json
 import sys
 import os
 from datetime import datetime
 import boto3
 import psycopg
+from itertools import chain
 from pathlib import Path
+from typing import Iterator, List
 
+from lib.database import DEFAULT_ITERSIZE, connection_kwargs, stream_query
+from lib.resource_diff import get_run_pair, iter_resource_diff
 from reporting.excel_generator import ExcelGenerator
-from resource_discovery.models import Resource, DiscoveryResult
+from reporting.columnar import write_parquet_dataset, write_arrow_file
+from reporting.ndjson import write_ndjson, FILE_SUFFIXES
+from resource_discovery import codec
+from resource_discovery.models import Resource
 
 # Configure logging
 logging.basicConfig(
@@ -37,21 +43,23 @@ def get_database_config(profile: str, region: str, stack_name: str = 'cloudaudit
     # Get credentials from Secrets Manager
     sm = session.client('secretsmanager')
     secret_response = sm.get_secret_value(SecretId=secret_arn)
-    secret = json.loads(secret_response['SecretString'])
+    secret = codec.loads(secret_response['SecretString'])
     
     return {
         'host': db_endpoint,
+        'reader_host': outputs.get('DatabaseReaderEndpoint'),
         'port': 5432,
         'dbname': secret.get('dbname', 'cloudauditor'),
         'user': secret['username'],
         'password': secret['password']
     }
 
-def fetch_resources_from_database(db_config: dict) -> list:
-    """Fetch all resources from the database"""
-    logger.info(f"Connecting to database: {db_config['host']}")
+def iter_resources_from_database(db_config: dict, itersize: int = DEFAULT_ITERSIZE) -> Iterator[List[Resource]]:
+    """Stream resources from the database in chunks of up to `itersize` via a server-side cursor"""
+    conn_kwargs = connection_kwargs(db_config, read_only=True)
+    logger.info(f"Connecting to database: {conn_kwargs['host']}")
     
-    conn = psycopg.connect(**db_config)
+    conn = psycopg.connect(**conn_kwargs)
     
     query = """
         SELECT 
@@ -69,41 +77,45 @@ def fetch_resources_from_database(db_config: dict) -> list:
         ORDER BY account_id, region, resource_type, resource_id
     """
     
+    try:
+        for rows in stream_query(conn, query, itersize=itersize, name='export_resources'):
+            yield [
+                Resource(
+                    arn=row[2] or '',
+                    resource_type=row[1],
+                    region=row[3],
+                    account_id=row[4],
+                    name=row[5],
+                    tags=row[6] if row[6] else {},
+                    configuration=row[7] if row[7] else {}
+                )
+                for row in rows
+            ]
+    finally:
+        conn.close()
+
+def fetch_resources_from_database(db_config: dict, itersize: int = DEFAULT_ITERSIZE) -> list:
+    """Fetch all resources from the database"""
     resources = []
-    with conn.cursor() as cur:
-        cur.execute(query)
-        rows = cur.fetchall()
-        
-        for row in rows:
-            resource_dict = {
-                'resource_id': row[0],
-                'resource_type': row[1],
-                'arn': row[2],
-                'region': row[3],
-                'account_id': row[4],
-                'name': row[5],
-                'tags': row[6] if row[6] else {},
-                'configuration': row[7] if row[7] else {},
-                'discovered_at': row[8].isoformat() if row[8] else None,
-                'last_seen_at': row[9].isoformat() if row[9] else None,
-            }
-            
-            # Convert to Resource object
-            resource = Resource(
-                arn=resource_dict.get('arn', ''),
-                resource_type=resource_dict['resource_type'],
-                region=resource_dict['region'],
-                account_id=resource_dict['account_id'],
-                name=resource_dict.get('name'),
-                tags=resource_dict.get('tags', {}),
-                configuration=resource_dict.get('configuration', {})
-            )
-            resources.append(resource)
+    for chunk in iter_resources_from_database(db_config, itersize=itersize):
+        resources.extend(chunk)
     
-    conn.close()
     logger.info(f"Fetched {len(resources)} resources from database")
     return resources
 
+def generate_diff_report(db_config: dict, generator: ExcelGenerator, base_run_id: str = None,
+                         target_run_id: str = None, filename: str = None,
+                         itersize: int = DEFAULT_ITERSIZE) -> str:
+    """Write the changes between two discovery runs (default: previous and latest) to Excel"""
+    conn = psycopg.connect(**connection_kwargs(db_config, read_only=True))
+    try:
+        base_run, target_run = get_run_pair(conn, base_run_id, target_run_id)
+        logger.info(f"Comparing discovery runs {base_run['run_id']} -> {target_run['run_id']}")
+        changes = chain.from_iterable(iter_resource_diff(conn, base_run, target_run, itersize=itersize))
+        return generator.generate_diff_report(changes, base_run, target_run, filename=filename)
+    finally:
+        conn.close()
+
 def main():
     parser = argparse.ArgumentParser(
         description="CloudAuditor - Generate Excel Report from Aurora Database"
@@ -115,9 +127,18 @@ def main():
     parser.add_argument("--stack-name", default="cloudauditor-dev", help="CloudFormation stack name")
     
     # Output args
-    parser.add_argument("--format", choices=["json", "excel", "both"], default="excel", help="Output format")
+    parser.add_argument("--format", choices=["json", "excel", "both", "parquet", "arrow", "ndjson"], default="excel",
+                        help="Output format (parquet/arrow require pyarrow)")
+    parser.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none",
+                        help="Compression for ndjson output")
     parser.add_argument("--output-dir", default="reports", help="Directory for reports")
     parser.add_argument("--filename", help="Custom filename for the report")
+    parser.add_argument("--diff", action="store_true",
+                        help="Report only resources added/removed/modified between two discovery runs")
+    parser.add_argument("--base-run", help="Earlier run ID for --diff (default: run before the target)")
+    parser.add_argument("--target-run", help="Later run ID for --diff (default: latest completed run)")
+    parser.add_argument("--itersize", type=int, default=DEFAULT_ITERSIZE,
+                        help="Rows fetched per server-side cursor round trip")
     
     args = parser.parse_args()
     
@@ -126,42 +147,61 @@ def main():
         logger.info("Retrieving database configuration from CloudFormation...")
         db_config = get_database_config(args.profile, args.region, args.stack_name)
         
-        # 2. Fetch resources from database
-        logger.info("Fetching resources from Aurora database...")
-        resources = fetch_resources_from_database(db_config)
+        # 2. Ensure output directory exists
+        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
         
-        if not resources:
-            logger.warning("No resources found in database")
+        if args.diff:
+            logger.info("Generating diff report...")
+            report_path = generate_diff_report(db_config, ExcelGenerator(output_dir=args.output_dir),
+                                               base_run_id=args.base_run, target_run_id=args.target_run,
+                                               filename=args.filename, itersize=args.itersize)
+            logger.info(f"✅ Diff report generated: {report_path}")
             return
         
-        # 3. Create DiscoveryResult object
-        result = DiscoveryResult(
-            resources=resources,
-            total_count=len(resources),
-            duration_seconds=0,  # Not applicable for DB query
-            errors=[]
-        )
-        
-        # 4. Ensure output directory exists
-        Path(args.output_dir).mkdir(parents=True, exist_ok=True)
-        
-        # 5. Generate Reports
-        if args.format in ["json", "both"]:
+        # 3. Fetch resources from database
+        if args.format in ["parquet", "arrow", "ndjson"]:
+            # Columnar and NDJSON exports are written straight from the server-side cursor
+            logger.info("Streaming resources from Aurora database...")
+            resources = chain.from_iterable(iter_resources_from_database(db_config, itersize=args.itersize))
+            if args.format == "ndjson":
+                compression = None if args.compression == "none" else args.compression
+                export_path = f"{args.output_dir}/{args.filename or 'database_export'}{FILE_SUFFIXES[compression]}"
+                count = write_ndjson(resources, export_path, compression=compression)
+            elif args.format == "parquet":
+                export_path = f"{args.output_dir}/{args.filename or 'database_export'}_parquet"
+                count = write_parquet_dataset(resources, export_path)
+            else:
+                export_path = f"{args.output_dir}/{args.filename or 'database_export'}.arrow"
+                count = write_arrow_file(resources, export_path)
+            logger.info(f"✅ Exported {count} resources ({args.format}) to {export_path}")
+        elif args.format == "excel":
+            # Excel-only exports stream straight from the server-side cursor into the workbook
+            logger.info("Streaming resources from Aurora database...")
+            resources = chain.from_iterable(iter_resources_from_database(db_config, itersize=args.itersize))
+        else:
+            logger.info("Fetching resources from Aurora database...")
+            resources = fetch_resources_from_database(db_config, itersize=args.itersize)
+            
+            if not resources:
+                logger.warning("No resources found in database")
+                return
+            
             json_path = f"{args.output_dir}/{args.filename or 'database_export'}.json"
             with open(json_path, 'w') as f:
-                json.dump([r.to_dict() for r in resources], f, indent=2, default=str)
+                f.write(codec.dumps([r.to_dict() for r in resources], indent=True))
             logger.info(f"✅ JSON report saved to {json_path}")
-            
+        
+        # 4. Generate Excel report (constant memory, rows are written as they arrive)
         if args.format in ["excel", "both"]:
             logger.info("Generating Excel Report...")
             generator = ExcelGenerator(output_dir=args.output_dir)
-            report_path = generator.generate_report(result, filename=args.filename)
+            report_path = generator.generate_streaming_report(resources, filename=args.filename)
             if report_path:
                 logger.info(f"✅ Excel report generated: {report_path}")
             else:
                 logger.warning("Excel report generation skipped (no data).")
         
-        logger.info(f"\n🎉 Report generation complete! {len(resources)} resources exported.")
+        logger.info("\n🎉 Report generation complete!")
         
     except Exception as e:
         logger.error(f"Error generating report: {e}")
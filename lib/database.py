@@ -1,25 +1,84 @@
 import logging
-import json
 import os
 import boto3
 import psycopg
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Optional, Sequence
+
+from resource_discovery import codec
+from resource_discovery.arn import GLOBAL_REGION, parse_arn
+from resource_discovery.error_ledger import ERROR_SAMPLES
+from resource_discovery.models import json_field_text
 
 logger = logging.getLogger(__name__)
 
+READ_ONLY_OPTIONS = '-c default_transaction_read_only=on'
+# Rows fetched per server-side cursor round trip, for every streamed query (reports, exports, diffs)
+DEFAULT_ITERSIZE = int(os.environ.get('DB_ITERSIZE', 2000))
+# Completed discovery runs whose resource_changes rows are kept
+CHANGE_RETENTION_RUNS = int(os.environ.get('CHANGE_RETENTION_RUNS', 10))
+
+# Column order of ResourceBatch.copy_rows()
+RESOURCE_COPY_COLUMNS = ('resource_id', 'resource_type', 'resource_arn', 'region',
+                         'account_id', 'name', 'tags', 'properties')
+
+def connection_kwargs(config: Dict[str, Any], read_only: bool = False) -> Dict[str, Any]:
+    """
+    Build psycopg.connect() keyword arguments from a database config dict.
+    
+    Read-only connections go to config['reader_host'] when one is configured
+    (falling back to the writer 'host') and reject writes at the session level.
+    """
+    kwargs = {
+        'host': config['host'],
+        'port': config.get('port', 5432),
+        'dbname': config['dbname'],
+        'user': config['user'],
+        'password': config.get('password'),
+    }
+    if read_only:
+        kwargs['host'] = config.get('reader_host') or config['host']
+        kwargs['options'] = READ_ONLY_OPTIONS
+    return kwargs
+
+def stream_query(conn, query: str, params: Optional[Sequence[Any]] = None,
+                 itersize: int = DEFAULT_ITERSIZE, name: str = 'cloudauditor_stream') -> Iterator[List[tuple]]:
+    """
+    Yield query results in chunks of up to `itersize` rows using a named
+    server-side cursor, so only one chunk is held client-side at a time.
+    
+    The cursor runs inside its own transaction (required for server-side
+    cursors, including on autocommit connections), which stays open until
+    the generator is exhausted or closed.
+    """
+    with conn.transaction(), conn.cursor(name=name) as cur:
+        cur.itersize = itersize
+        cur.execute(query, params)
+        rows = iter(cur)
+        while True:
+            chunk = list(islice(rows, itersize))
+            if not chunk:
+                break
+            yield chunk
+
 class DatabaseClient:
     """
     Shared client for interacting with the CloudAuditor database.
+    
+    With read_only=True the client connects to the Aurora reader endpoint
+    (DB_READER_HOST) so reporting scans don't compete with discovery writes.
     """
     
-    def __init__(self):
+    def __init__(self, read_only: bool = False):
         self._conn = None
+        self.read_only = read_only
         self._config = self._load_config()
 
     def _load_config(self) -> Dict[str, Any]:
         """Load database configuration from environment and Secrets Manager."""
         config = {
             'host': os.environ.get('DB_HOST'),
+            'reader_host': os.environ.get('DB_READER_HOST'),
             'dbname': os.environ.get('DB_NAME'),
             'user': os.environ.get('DB_USER'),
             'port': int(os.environ.get('DB_PORT', 5432)),
@@ -32,7 +91,7 @@ class DatabaseClient:
                 sts = boto3.client('sts') # Use default session
                 client = boto3.client('secretsmanager')
                 response = client.get_secret_value(SecretId=config['secret_arn'])
-                secret = json.loads(response['SecretString'])
+                secret = codec.loads(response['SecretString'])
                 config['password'] = secret.get('password')
                 config['user'] = secret.get('username') or config['user']
             except Exception as e:
@@ -43,14 +102,16 @@ class DatabaseClient:
     def _get_connection(self):
         """Get or create database connection."""
         if self._conn is None or self._conn.closed:
-            self._conn = psycopg.connect(
-                host=self._config['host'],
-                port=self._config['port'],
-                dbname=self._config['dbname'],
-                user=self._config['user'],
-                password=self._config['password'],
-                autocommit=True
-            )
+            kwargs = connection_kwargs(self._config, read_only=self.read_only)
+            try:
+                self._conn = psycopg.connect(**kwargs, autocommit=True)
+            except Exception as e:
+                if kwargs['host'] == self._config['host']:
+                    raise
+                # Reader unavailable (e.g. replica being replaced) - fall back to the writer
+                logger.warning(f"Reader endpoint {kwargs['host']} unavailable, using writer: {e}")
+                kwargs['host'] = self._config['host']
+                self._conn = psycopg.connect(**kwargs, autocommit=True)
         return self._conn
 
     def get_monitored_accounts(self) -> List[Dict[str, Any]]:
@@ -87,8 +148,10 @@ class DatabaseClient:
         conn = self._get_connection()
         with conn.cursor() as cur:
             for r in resources:
-                # Normalize empty region to 'global' for global resources
-                region = r.get('region', '') or 'global'
+                # Take a missing region/account from the ARN; global resources have no region
+                parsed = parse_arn(r.get('arn'))
+                region = r.get('region') or (parsed.region if parsed else GLOBAL_REGION)
+                account_id = r.get('account_id') or (parsed.account if parsed else None)
                 
                 cur.execute("""
                     INSERT INTO resources (
@@ -102,10 +165,50 @@ class DatabaseClient:
                         last_seen_at = NOW()
                 """, (
                     r.get('id') or r.get('arn'), r['resource_type'], r.get('arn'), 
-                    region, r['account_id'], r.get('name'), 
-                    json.dumps(r.get('tags', {})), json.dumps(r.get('properties', {}))
+                    region, account_id, r.get('name'), 
+                    json_field_text(r.get('tags', {})), json_field_text(r.get('properties', {}))
                 ))
 
+    def save_resource_batch(self, batch, account_id: Optional[str] = None, run_id: Optional[str] = None) -> None:
+        """
+        Upsert a ResourceBatch: its rows are COPYed into a staging table and
+        merged with one INSERT ... ON CONFLICT, instead of a statement per resource.
+        
+        Args:
+            batch: ResourceBatch to save
+            account_id: Account of resources whose ARN has none (see ResourceBatch.copy_rows)
+            run_id: Discovery run the resource_changes rows the upsert logs are tagged with
+        """
+        columns = ', '.join(RESOURCE_COPY_COLUMNS)
+        conn = self._get_connection()
+        with conn.transaction(), conn.cursor() as cur:
+            if run_id:
+                # Read by the record_resource_change trigger; reset when the transaction ends
+                cur.execute("SELECT set_config('cloudauditor.run_id', %s, true)", (run_id,))
+            cur.execute("""
+                CREATE TEMP TABLE resources_staging (
+                    resource_id TEXT, resource_type TEXT, resource_arn TEXT, region TEXT,
+                    account_id TEXT, name TEXT, tags JSONB, properties JSONB
+                ) ON COMMIT DROP
+            """)
+            with cur.copy(f"COPY resources_staging ({columns}) FROM STDIN") as copy:
+                for row in batch.copy_rows(account_id):
+                    copy.write_row(row)
+            # ON CONFLICT can't update the same row twice in one statement, so keep the last duplicate
+            cur.execute(f"""
+                INSERT INTO resources ({columns})
+                SELECT DISTINCT ON (resource_id, resource_type, region, account_id) {columns}
+                FROM (SELECT *, ctid FROM resources_staging) s
+                ORDER BY resource_id, resource_type, region, account_id, ctid DESC
+                ON CONFLICT (resource_id, resource_type, region, account_id) DO UPDATE SET
+                    resource_arn = EXCLUDED.resource_arn,
+                    name = EXCLUDED.name,
+                    tags = EXCLUDED.tags,
+                    properties = EXCLUDED.properties,
+                    last_seen_at = NOW()
+            """)
+        logger.info(f"Saved {len(batch)} resources via COPY")
+
     def start_discovery_run(self, run_id: str) -> None:
         """Record a discovery run starting."""
         conn = self._get_connection()
@@ -127,4 +230,132 @@ class DatabaseClient:
                     resource_types = %s, duration_seconds = %s, errors = %s::jsonb
                 WHERE run_id = %s
             """, (status, total_resources, resource_types,
-                  duration_seconds, json.dumps(errors), run_id))
+                  duration_seconds, codec.dumps(errors), run_id))
+
+    def prune_resource_changes(self, keep_runs: int = CHANGE_RETENTION_RUNS) -> int:
+        """
+        Delete resource_changes rows older than the last `keep_runs` completed
+        discovery runs, so the change log (and the diff report's scan of it)
+        doesn't grow with every run. Diffs between runs older than that show
+        no modifications.
+
+        Returns:
+            Number of rows deleted
+        """
+        conn = self._get_connection()
+        with conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM resource_changes
+                WHERE changed_at < (
+                    SELECT started_at FROM discovery_runs
+                    WHERE status = 'completed'
+                    ORDER BY started_at DESC
+                    OFFSET %s LIMIT 1
+                )
+            """, (max(keep_runs, 1) - 1,))
+            deleted = cur.rowcount
+        if deleted:
+            logger.info(f"Pruned {deleted} resource changes older than the last {keep_runs} runs")
+        return deleted
+
+    def save_run_errors(self, run_id: str, ledger) -> int:
+        """
+        Store an ErrorLedger as discovery_run_errors rows (one per error key),
+        adding to the counts of keys already stored for the run and appending
+        its sample messages to theirs, up to ERROR_SAMPLES per row.
+
+        Returns:
+            Number of rows written
+        """
+        rows = [
+            (run_id, key.account_id, key.region, key.source, key.operation, key.error_code,
+             entry.count, entry.first_seen, entry.last_seen, list(entry.samples))
+            for key, entry in ledger
+        ]
+        if not rows:
+            return 0
+        conn = self._get_connection()
+        with conn.cursor() as cur:
+            cur.executemany(f"""
+                INSERT INTO discovery_run_errors (
+                    run_id, account_id, region, source, operation, error_code,
+                    error_count, first_seen_at, last_seen_at, sample_messages
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (run_id, account_id, region, source, operation, error_code) DO UPDATE SET
+                    error_count = discovery_run_errors.error_count + EXCLUDED.error_count,
+                    first_seen_at = LEAST(discovery_run_errors.first_seen_at, EXCLUDED.first_seen_at),
+                    last_seen_at = GREATEST(discovery_run_errors.last_seen_at, EXCLUDED.last_seen_at),
+                    sample_messages = (discovery_run_errors.sample_messages
+                                       || EXCLUDED.sample_messages)[1:{int(ERROR_SAMPLES)}]
+            """, rows)
+        return len(rows)
+
+    def create_report_job(self, job_id: str, request: Dict[str, Any]) -> None:
+        """Record a queued report job."""
+        conn = self._get_connection()
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO report_jobs (job_id, status, request)
+                VALUES (%s, 'queued', %s::jsonb)
+            """, (job_id, codec.dumps(request)))
+
+    def get_report_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a report job, or None if it doesn't exist."""
+        conn = self._get_connection()
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT job_id, status, request, rows_processed, sheets_completed,
+                       s3_bucket, s3_key, result, error,
+                       created_at, started_at, updated_at, completed_at
+                FROM report_jobs WHERE job_id = %s
+            """, (job_id,))
+            row = cur.fetchone()
+        if not row:
+            return None
+        keys = ['job_id', 'status', 'request', 'rows_processed', 'sheets_completed',
+                's3_bucket', 's3_key', 'result', 'error',
+                'created_at', 'started_at', 'updated_at', 'completed_at']
+        return dict(zip(keys, row))
+
+    def start_report_job(self, job_id: str) -> bool:
+        """Claim a queued job for a worker; False if it was already claimed or doesn't exist."""
+        conn = self._get_connection()
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE report_jobs
+                SET status = 'running', started_at = NOW(), updated_at = NOW()
+                WHERE job_id = %s AND status = 'queued'
+            """, (job_id,))
+            return cur.rowcount == 1
+
+    def update_report_job_progress(self, job_id: str, rows_processed: int, sheets_completed: int) -> None:
+        """Record how far a running report job has got."""
+        conn = self._get_connection()
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE report_jobs
+                SET rows_processed = %s, sheets_completed = %s, updated_at = NOW()
+                WHERE job_id = %s
+            """, (rows_processed, sheets_completed, job_id))
+
+    def complete_report_job(self, job_id: str, s3_bucket: Optional[str], s3_key: Optional[str],
+                            result: Dict[str, Any]) -> None:
+        """Record a report job finishing successfully."""
+        conn = self._get_connection()
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE report_jobs
+                SET status = 'completed', s3_bucket = %s, s3_key = %s, result = %s::jsonb,
+                    completed_at = NOW(), updated_at = NOW()
+                WHERE job_id = %s
+            """, (s3_bucket, s3_key, codec.dumps(result), job_id))
+
+    def fail_report_job(self, job_id: str, error: str) -> None:
+        """Record a report job failing."""
+        conn = self._get_connection()
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE report_jobs
+                SET status = 'failed', error = %s, completed_at = NOW(), updated_at = NOW()
+                WHERE job_id = %s
+            """, (error, job_id))
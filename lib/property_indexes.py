@@ -0,0 +1,75 @@
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from database_init.property_sql import RESOURCE_TYPE_RE, property_expression
+from resource_discovery import codec
+
+logger = logging.getLogger(__name__)
+
+# Shared with database_init/app.py, which creates one partial expression index per entry
+DEFAULT_REGISTRY_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'database_init', 'property_indexes.json'
+)
+
+
+@lru_cache(maxsize=None)
+def load_registry(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """Load the resource type -> indexed property paths registry."""
+    path = path or os.environ.get('PROPERTY_INDEX_CONFIG', DEFAULT_REGISTRY_PATH)
+    try:
+        with open(path) as f:
+            return codec.loads(f.read())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Property index registry unavailable ({path}): {e}")
+        return {}
+
+
+def _property_text(value: Any) -> str:
+    """A value as ->> renders it: strings as-is, anything else as JSON (True -> 'true')"""
+    return value if isinstance(value, str) else codec.dumps(value)
+
+
+def build_property_filter(resource_type: str, filters: Dict[str, Any],
+                          registry: Optional[Dict[str, List[str]]] = None) -> Tuple[str, List[Any]]:
+    """
+    Build a WHERE fragment filtering one resource type on property values.
+
+    List values become IN (...), None IS NULL, everything else an equality.
+    Values are compared as the text ->> yields, so booleans and numbers are
+    bound as JSON ('true', '5'). The resource_type is inlined as a literal (it
+    is validated against a strict pattern) so the planner can prove the
+    partial index predicate even for generic plans.
+
+    Returns:
+        (sql, params) where sql has no leading AND/WHERE
+
+    Raises:
+        ValueError: For an invalid resource type or property path, or an empty list
+    """
+    if not RESOURCE_TYPE_RE.match(resource_type):
+        raise ValueError(f"Invalid resource type: {resource_type!r}")
+
+    registry = load_registry() if registry is None else registry
+    indexed = set(registry.get(resource_type, []))
+
+    clauses = [f"resource_type = '{resource_type}'"]
+    params: List[Any] = []
+    for path, value in filters.items():
+        expression = property_expression(path)
+        if path not in indexed:
+            logger.info(f"Property filter {resource_type}.{path} has no expression index")
+        if isinstance(value, (list, tuple)):
+            if not value:
+                raise ValueError(f"Property filter {path!r} has an empty list of values")
+            placeholders = ", ".join(["%s"] * len(value))
+            clauses.append(f"({expression}) IN ({placeholders})")
+            params.extend(_property_text(v) for v in value)
+        elif value is None:
+            clauses.append(f"({expression}) IS NULL")
+        else:
+            clauses.append(f"({expression}) = %s")
+            params.append(_property_text(value))
+
+    return " AND ".join(clauses), params
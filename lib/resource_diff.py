@@ -0,0 +1,189 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from lib.database import DEFAULT_ITERSIZE, stream_query
+from resource_discovery import codec
+
+logger = logging.getLogger(__name__)
+
+CHANGE_TYPES = ('added', 'removed', 'modified')
+
+# Longest rendering of a single old/new value in a change summary
+SUMMARY_VALUE_LIMIT = 120
+
+_RUN_COLUMNS = "run_id, started_at, completed_at, total_resources"
+
+
+def _run_dict(row) -> Dict[str, Any]:
+    return {'run_id': row[0], 'started_at': row[1], 'completed_at': row[2], 'total_resources': row[3]}
+
+
+def get_run_pair(conn, base_run_id: Optional[str] = None,
+                 target_run_id: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Resolve the two completed discovery runs to compare.
+
+    Defaults: target is the latest completed run, base is the completed run
+    before the target.
+
+    Raises:
+        ValueError: If a run ID is unknown/incomplete or there is no earlier run
+    """
+    with conn.cursor() as cur:
+        if target_run_id:
+            cur.execute(f"""
+                SELECT {_RUN_COLUMNS} FROM discovery_runs
+                WHERE run_id = %s AND completed_at IS NOT NULL AND status <> 'failed'
+            """, (target_run_id,))
+        else:
+            cur.execute(f"""
+                SELECT {_RUN_COLUMNS} FROM discovery_runs
+                WHERE completed_at IS NOT NULL AND status <> 'failed'
+                ORDER BY started_at DESC LIMIT 1
+            """)
+        row = cur.fetchone()
+        if not row:
+            raise ValueError(f"No completed discovery run {target_run_id or ''}".rstrip())
+        target = _run_dict(row)
+
+        if base_run_id:
+            cur.execute(f"""
+                SELECT {_RUN_COLUMNS} FROM discovery_runs
+                WHERE run_id = %s AND completed_at IS NOT NULL AND status <> 'failed'
+            """, (base_run_id,))
+        else:
+            cur.execute(f"""
+                SELECT {_RUN_COLUMNS} FROM discovery_runs
+                WHERE completed_at IS NOT NULL AND status <> 'failed' AND started_at < %s
+                ORDER BY started_at DESC LIMIT 1
+            """, (target['started_at'],))
+        row = cur.fetchone()
+        if not row:
+            raise ValueError(f"No completed discovery run {base_run_id}" if base_run_id
+                             else f"No completed discovery run before {target['run_id']}")
+        base = _run_dict(row)
+
+    if base['started_at'] >= target['started_at']:
+        raise ValueError(f"Base run {base['run_id']} must start before target run {target['run_id']}")
+    return base, target
+
+
+def build_diff_query(base: Dict[str, Any], target: Dict[str, Any],
+                     account_ids: Optional[Sequence[str]] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the query returning the changes between two discovery runs.
+
+    The resources table only holds the current state of each resource, so the
+    diff is derived rather than computed from two stored snapshots:
+      - added:    first inserted after the base run completed (up to the target run)
+      - removed:  seen by the base run but not refreshed since the target run started,
+                  in accounts the target run (or a later one) reported on
+      - modified: field changes logged in resource_changes by the completed runs after
+                  the base run up to the target run (by their run_id tag, so changes written
+                  by a failed or overlapping run are left out), collapsed to the first old /
+                  last new value per field (reverted fields drop out); only the last
+                  CHANGE_RETENTION_RUNS runs' changes are kept
+    Exact for the latest pair of runs; for older pairs, resources that later runs
+    saw again cannot be reported as removed.
+
+    Returns:
+        (query, params) - columns: change_type, account_id, region, resource_type,
+        resource_id, name, resource_arn, changed_fields, changes
+    """
+    params: Dict[str, Any] = {
+        'base_started': base['started_at'],
+        'base_completed': base['completed_at'],
+        'target_started': target['started_at'],
+        'target_completed': target['completed_at'],
+    }
+    account_filter = ""
+    if account_ids:
+        account_filter = "AND r.account_id = ANY(%(account_ids)s)"
+        params['account_ids'] = list(account_ids)
+
+    query = f"""
+        WITH field_changes AS (
+            SELECT c.resource_pk, f.key AS field,
+                   (array_agg(f.value->'old' ORDER BY c.changed_at, c.id))[1] AS old_value,
+                   (array_agg(f.value->'new' ORDER BY c.changed_at DESC, c.id DESC))[1] AS new_value
+            FROM resource_changes c
+            CROSS JOIN LATERAL jsonb_each(c.changes) f
+            WHERE c.run_id IN (
+                SELECT run_id FROM discovery_runs
+                WHERE started_at > %(base_started)s AND started_at <= %(target_started)s
+                  AND completed_at IS NOT NULL AND status <> 'failed'
+            )
+            GROUP BY c.resource_pk, f.key
+        ),
+        modified AS (
+            SELECT resource_pk,
+                   array_agg(field ORDER BY field) AS changed_fields,
+                   jsonb_object_agg(field, jsonb_build_object('old', old_value, 'new', new_value)) AS changes
+            FROM field_changes
+            WHERE old_value IS DISTINCT FROM new_value
+            GROUP BY resource_pk
+        )
+        SELECT 'added' AS change_type, r.account_id, r.region, r.resource_type, r.resource_id,
+               r.name, r.resource_arn, NULL::text[] AS changed_fields, NULL::jsonb AS changes
+        FROM resources r
+        WHERE r.inserted_at > %(base_completed)s AND r.inserted_at <= %(target_completed)s
+        {account_filter}
+        UNION ALL
+        SELECT 'removed', r.account_id, r.region, r.resource_type, r.resource_id,
+               r.name, r.resource_arn, NULL, NULL
+        FROM resources r
+        WHERE r.last_seen_at >= %(base_started)s AND r.last_seen_at < %(target_started)s
+          AND r.account_id IN (
+              SELECT DISTINCT account_id FROM resources WHERE last_seen_at >= %(target_started)s
+          )
+        {account_filter}
+        UNION ALL
+        SELECT 'modified', r.account_id, r.region, r.resource_type, r.resource_id,
+               r.name, r.resource_arn, m.changed_fields, m.changes
+        FROM modified m
+        JOIN resources r ON r.id = m.resource_pk
+        WHERE r.inserted_at <= %(base_completed)s
+        {account_filter}
+        ORDER BY 1, 2, 3, 4, 5
+    """
+    return query, params
+
+
+def _short(value: Any) -> str:
+    text = 'null' if value is None else (value if isinstance(value, str) else codec.dumps(value))
+    return text if len(text) <= SUMMARY_VALUE_LIMIT else text[:SUMMARY_VALUE_LIMIT - 3] + '...'
+
+
+def summarize_changes(changes: Optional[Dict[str, Dict[str, Any]]]) -> str:
+    """One line per changed field: 'properties.InstanceType: t3.micro -> t3.large'."""
+    if not changes:
+        return ''
+    return '\n'.join(
+        f"{field}: {_short(change.get('old'))} -> {_short(change.get('new'))}"
+        for field, change in sorted(changes.items())
+    )
+
+
+def row_to_change_dict(row) -> Dict[str, Any]:
+    """Convert a build_diff_query() row to a change dict."""
+    return {
+        'change_type': row[0],
+        'account_id': row[1],
+        'region': row[2],
+        'resource_type': row[3],
+        'resource_id': row[4],
+        'name': row[5],
+        'arn': row[6] or '',
+        'changed_fields': ', '.join(row[7]) if row[7] else '',
+        'change_summary': summarize_changes(row[8]),
+    }
+
+
+def iter_resource_diff(conn, base: Dict[str, Any], target: Dict[str, Any],
+                       account_ids: Optional[Sequence[str]] = None,
+                       itersize: int = DEFAULT_ITERSIZE) -> Iterator[List[Dict[str, Any]]]:
+    """Stream the diff between two runs in chunks of change dicts via a server-side cursor."""
+    query, params = build_diff_query(base, target, account_ids)
+    logger.info(f"Diffing discovery runs {base['run_id']} -> {target['run_id']}")
+    for rows in stream_query(conn, query, params, itersize=itersize, name='resource_diff'):
+        yield [row_to_change_dict(row) for row in rows]
@@ -0,0 +1,165 @@
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# S3 requires every part except the last to be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+
+class S3StreamingUpload:
+    """
+    Write-only, non-seekable file object that uploads to S3 while it is written.
+
+    Data is buffered until a full part is available, which is then sent with
+    UploadPart on a background thread so uploading overlaps with whatever is
+    producing the data. At most `max_concurrency` parts are in flight, so
+    memory stays at a few part buffers regardless of object size. Objects
+    smaller than one part are sent with a single PutObject.
+
+    If the multipart upload cannot be started, output is spooled to a
+    temporary file (in memory up to one part, then /tmp) and sent with
+    PutObject on close.
+
+    Use as a context manager: the upload completes on a clean exit and is
+    aborted if an exception escapes.
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, content_type: Optional[str] = None,
+                 part_size: int = DEFAULT_PART_SIZE, max_concurrency: int = 2):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.bytes_written = 0
+        self.closed = False
+        self._extra_args = {'ContentType': content_type} if content_type else {}
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._futures: List[Any] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._spool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.bytes_written
+
+    def flush(self) -> None:
+        pass
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed S3StreamingUpload")
+        if self._spool is not None:
+            self._spool.write(data)
+        else:
+            self._buffer += data
+            while len(self._buffer) >= self.part_size and self._spool is None:
+                part = bytes(self._buffer[:self.part_size])
+                del self._buffer[:self.part_size]
+                self._send_part(part)
+        self.bytes_written += len(data)
+        return len(data)
+
+    def close(self) -> None:
+        """Finish the upload (no-op if already closed or aborted)."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self._spool is not None:
+                self._spool.seek(0)
+                self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=self._spool, **self._extra_args)
+            elif self._upload_id is None:
+                self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer), **self._extra_args)
+            else:
+                if self._buffer:
+                    self._send_part(bytes(self._buffer))
+                parts = [future.result() for future in self._futures]
+                self.s3.complete_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+            logger.info(f"Uploaded s3://{self.bucket}/{self.key} ({self.bytes_written} bytes, "
+                        f"{len(self._futures) or 1} part(s))")
+        except Exception:
+            self._abort_multipart()
+            raise
+        finally:
+            self._release()
+
+    def abort(self) -> None:
+        """Discard everything written; no object is created."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._abort_multipart()
+        finally:
+            self._release()
+
+    def _send_part(self, part: bytes) -> None:
+        if self._upload_id is None:
+            try:
+                response = self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self._extra_args)
+            except ClientError as e:
+                logger.warning(f"Multipart upload unavailable for {self.key}, spooling to disk: {e}")
+                self._spool = tempfile.SpooledTemporaryFile(max_size=self.part_size)
+                self._spool.write(part)
+                self._spool.write(self._buffer)
+                self._buffer = bytearray()
+                return
+            self._upload_id = response['UploadId']
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+
+        # Bound memory: wait for the oldest in-flight part before queueing another
+        if len(self._futures) >= self.max_concurrency:
+            self._futures[-self.max_concurrency].result()
+
+        part_number = len(self._futures) + 1
+        self._futures.append(self._executor.submit(self._upload_part, part_number, part))
+
+    def _upload_part(self, part_number: int, body: bytes) -> Dict[str, Any]:
+        response = self.s3.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=body
+        )
+        return {'ETag': response['ETag'], 'PartNumber': part_number}
+
+    def _abort_multipart(self) -> None:
+        if self._upload_id is None:
+            return
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        try:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+        except ClientError as e:
+            logger.error(f"Failed to abort multipart upload for {self.key}: {e}")
+
+    def _release(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._spool is not None:
+            self._spool.close()
+        self._buffer = bytearray()
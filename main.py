@@ -1,12 +1,14 @@
 import argparse
 import logging
-import json
 import sys
 from datetime import datetime
 
 from resource_discovery.discovery_engine import ResourceDiscoveryEngine
+from resource_discovery import codec
 from resource_discovery.models import DiscoveryConfig
 from reporting.excel_generator import ExcelGenerator
+from reporting.columnar import write_parquet_dataset, write_arrow_file
+from reporting.ndjson import write_ndjson, FILE_SUFFIXES
 
 # Configure logging
 logging.basicConfig(
@@ -21,11 +23,16 @@ def main():
     # Discovery args
     parser.add_argument("--accounts", nargs="+", help="AWS Account IDs to scan")
     parser.add_argument("--regions", nargs="+", help="AWS Regions to scan (defaults to all enabled)")
-    parser.add_argument("--include", nargs="+", help="Resource types to include (e.g. ec2:instance)")
-    parser.add_argument("--exclude", nargs="+", help="Resource types to exclude")
+    parser.add_argument("--include", nargs="+", help="Resource types to include (e.g. ec2:instance, AWS::S3::Bucket, ec2:*)")
+    parser.add_argument("--exclude", nargs="+", help="Resource types to exclude (same forms as --include)")
+    parser.add_argument("--memory-budget-mb", type=int,
+                        help="Spill discovered resources to temporary files beyond this many MiB")
     
     # Storage/Output args
-    parser.add_argument("--format", choices=["json", "excel", "both"], default="excel", help="Output format")
+    parser.add_argument("--format", choices=["json", "excel", "both", "parquet", "arrow", "ndjson"], default="excel",
+                        help="Output format (parquet/arrow require pyarrow)")
+    parser.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none",
+                        help="Compression for ndjson output")
     parser.add_argument("--output-dir", default="reports", help="Directory for reports")
     parser.add_argument("--filename", help="Custom filename for the report")
     
@@ -36,7 +43,8 @@ def main():
         accounts=args.accounts,
         regions=args.regions,
         include_types=args.include,
-        exclude_types=args.exclude or []
+        exclude_types=args.exclude or [],
+        memory_budget_mb=args.memory_budget_mb
     )
     
     # 2. Run Discovery
@@ -55,9 +63,25 @@ def main():
     if args.format in ["json", "both"]:
         json_path = f"{args.output_dir}/{args.filename or 'discovery'}.json"
         with open(json_path, 'w') as f:
-            json.dump([r.to_dict() for r in result.resources], f, indent=2, default=str)
+            f.write(codec.dumps([r.to_dict() for r in result.iter_resources()], indent=True))
         logger.info(f"JSON report saved to {json_path}")
         
+    if args.format == "ndjson":
+        compression = None if args.compression == "none" else args.compression
+        ndjson_path = f"{args.output_dir}/{args.filename or 'discovery'}{FILE_SUFFIXES[compression]}"
+        write_ndjson(result.iter_resources(), ndjson_path, compression=compression)
+        logger.info(f"NDJSON export saved to {ndjson_path}")
+    
+    if args.format == "parquet":
+        parquet_dir = f"{args.output_dir}/{args.filename or 'discovery'}_parquet"
+        write_parquet_dataset(result.iter_resources(), parquet_dir)
+        logger.info(f"Parquet dataset saved to {parquet_dir}")
+    
+    if args.format == "arrow":
+        arrow_path = f"{args.output_dir}/{args.filename or 'discovery'}.arrow"
+        write_arrow_file(result.iter_resources(), arrow_path)
+        logger.info(f"Arrow IPC file saved to {arrow_path}")
+        
     if args.format in ["excel", "both"]:
         logger.info("Generating Excel Report...")
         generator = ExcelGenerator(output_dir=args.output_dir)
@@ -5,10 +5,12 @@ Simple script to query and report on discovered resources without Lambda depende
 """
 import argparse
 import sys
-import json
 import boto3
 import psycopg
 
+from lib.database import connection_kwargs
+from resource_discovery import codec
+
 def get_db_config(profile='cloudAuditor', region='us-east-1'):
     """Get database configuration from AWS."""
     session = boto3.Session(profile_name=profile, region_name=region)
@@ -29,10 +31,11 @@ def get_db_config(profile='cloudAuditor', region='us-east-1'):
         # Get credentials from Secrets Manager
         sm = session.client('secretsmanager')
         secret_response = sm.get_secret_value(SecretId=secret_arn)
-        secret = json.loads(secret_response['SecretString'])
+        secret = codec.loads(secret_response['SecretString'])
         
         return {
             'host': db_endpoint,
+            'reader_host': outputs.get('DatabaseReaderEndpoint'),
             'port': 5432,
             'dbname': secret.get('dbname', 'cloudauditor'),
             'user': secret.get('username'),
@@ -63,8 +66,9 @@ def main():
         print(f"Fetching database configuration from AWS (profile: {args.profile})...")
         db_config = get_db_config(args.profile, args.region)
         
-        print(f"Connecting to database at {db_config['host']}...")
-        conn = psycopg.connect(**db_config)
+        conn_kwargs = connection_kwargs(db_config, read_only=True)
+        print(f"Connecting to database at {conn_kwargs['host']}...")
+        conn = psycopg.connect(**conn_kwargs)
         
         if args.summary:
             print("\n=== CLOUDAUDITOR DATABASE SUMMARY ===\n")
@@ -2,18 +2,58 @@
 Lambda function to generate Excel reports from Aurora database
 Uploads the report to S3 for download
 """
+import hashlib
 import json
+import multiprocessing
 import os
 import logging
+import pickle
+import tempfile
+import time
+import uuid
 import boto3
 import psycopg
-from datetime import datetime
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta
 from io import BytesIO
+from itertools import chain, groupby, islice
 import sys
 
 # Add lib directory to path for dependencies
 sys.path.insert(0, '/var/task')
 
+from lib.database import DEFAULT_ITERSIZE, DatabaseClient, connection_kwargs, stream_query
+from lib.resource_diff import get_run_pair, iter_resource_diff
+from lib.s3_upload import S3StreamingUpload
+from resource_discovery import codec
+from reporting.ndjson import write_ndjson, COMPRESSIONS, FILE_SUFFIXES as NDJSON_SUFFIXES, \
+    CONTENT_TYPES as NDJSON_CONTENT_TYPES
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Cached report artifacts live under reports/cache/<run_id>/; bump the version
+# whenever the workbook layout changes so stale artifacts are not served.
+# Artifacts are never deleted here - completed report jobs and pre-rendered
+# reports keep pointing at them - but expire through the bucket lifecycle rule
+# on the prefix after REPORT_CACHE_TTL_DAYS (ExpireCachedReports in template.yaml)
+REPORT_CACHE_PREFIX = 'reports/cache/'
+REPORT_CACHE_VERSION = 1
+REPORT_CACHE_TTL_DAYS = 7
+
+# A discovery run that hasn't completed within this many seconds of starting is
+# treated as dead rather than in progress (above the discovery Lambda timeout)
+DISCOVERY_RUN_STALE_SECONDS = 900
+
+# Report jobs: progress is reported every PROGRESS_EVERY_ROWS rows and persisted at most
+# every PROGRESS_MIN_INTERVAL seconds; a running job not updated for longer than the
+# maximum Lambda timeout is considered dead
+PROGRESS_EVERY_ROWS = 1000
+PROGRESS_MIN_INTERVAL = 5
+REPORT_JOB_STALE_SECONDS = 960
+
+# Worker processes rendering per-account reports after a discovery run
+PRERENDER_WORKERS = int(os.environ.get('PRERENDER_WORKERS', min(4, os.cpu_count() or 1)))
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
@@ -21,29 +61,10 @@ def get_secret(secret_arn, region):
     """Retrieve database credentials from Secrets Manager"""
     client = boto3.client('secretsmanager', region_name=region)
     response = client.get_secret_value(SecretId=secret_arn)
-    return json.loads(response['SecretString'])
+    return codec.loads(response['SecretString'])
 
-def fetch_resources_from_database(db_host, db_name, db_user, db_password, latest_only=True, account_ids=None):
-    """Fetch resources from the database
-    
-    Args:
-        db_host: Database host
-        db_name: Database name
-        db_user: Database user
-        db_password: Database password
-        latest_only: If True, only fetch resources from the latest discovery run
-        account_ids: Optional list of account IDs to filter by
-    """
-    logger.info(f"Connecting to database: {db_host}")
-    
-    conn = psycopg.connect(
-        host=db_host,
-        port=5432,
-        dbname=db_name,
-        user=db_user,
-        password=db_password
-    )
-    
+def _build_resources_query(latest_only=True, account_ids=None):
+    """Build the resource extraction query and its parameters"""
     # Build account filter clause
     params = []
     account_filter = ""
@@ -105,125 +126,247 @@ def fetch_resources_from_database(db_host, db_name, db_user, db_password, latest
             ORDER BY r.account_id, r.region, r.resource_type, r.resource_id
         """
     
+    return query, params if params else None
+
+def _build_account_snapshots_query():
+    """Query for every account's latest snapshot, ordered so each account's rows are contiguous
+    
+    Each account is scoped to its own latest discovery date, exactly as a
+    report filtered to that single account would be.
+    """
+    return """
+        WITH latest_date AS (
+            SELECT account_id, DATE(MAX(inserted_at)) as max_date
+            FROM resources
+            GROUP BY account_id
+        )
+        SELECT 
+            r.resource_id,
+            r.resource_type,
+            r.resource_arn,
+            r.region,
+            r.account_id,
+            r.name,
+            r.tags,
+            r.properties,
+            r.discovered_at,
+            r.last_seen_at,
+            r.inserted_at
+        FROM resources r
+        JOIN latest_date ON r.account_id = latest_date.account_id
+        WHERE DATE(r.inserted_at) = latest_date.max_date
+        ORDER BY r.account_id, r.region, r.resource_type, r.resource_id
+    """
+
+def _row_to_resource_dict(row):
+    """Convert a resources row to the report's resource dict"""
+    return {
+        'arn': row[2] if row[2] else '',
+        'resource_type': row[1],
+        'region': row[3],
+        'account_id': row[4],
+        'name': row[5],
+        'tags': row[6] if row[6] else {},
+        'configuration': row[7] if row[7] else {},
+        'resource_id': row[0],
+        'discovered_at': row[8].isoformat() if row[8] else None,
+        'last_seen_at': row[9].isoformat() if row[9] else None,
+        'inserted_at': row[10].isoformat() if row[10] else None,
+    }
+
+def _connect_read_only(db_host, db_name, db_user, db_password, reader_host=None):
+    """Open a read-only connection (to the reader endpoint when one is configured)"""
+    db_config = {
+        'host': db_host,
+        'reader_host': reader_host,
+        'port': 5432,
+        'dbname': db_name,
+        'user': db_user,
+        'password': db_password
+    }
+    conn_kwargs = connection_kwargs(db_config, read_only=True)
+    logger.info(f"Connecting to database: {conn_kwargs['host']}")
+    return psycopg.connect(**conn_kwargs)
+
+def iter_resources_from_database(db_host, db_name, db_user, db_password, latest_only=True, account_ids=None,
+                                 reader_host=None, itersize=DEFAULT_ITERSIZE):
+    """Stream resources from the database in chunks via a server-side cursor
+    
+    Args:
+        db_host: Database host (writer endpoint)
+        db_name: Database name
+        db_user: Database user
+        db_password: Database password
+        latest_only: If True, only fetch resources from the latest discovery run
+        account_ids: Optional list of account IDs to filter by
+        reader_host: Optional reader endpoint; the read-only connection uses it when set
+        itersize: Rows fetched from the server per round trip (and per yielded chunk)
+    
+    Yields:
+        Lists of up to `itersize` resource dicts
+    """
+    conn = _connect_read_only(db_host, db_name, db_user, db_password, reader_host)
+    try:
+        query, params = _build_resources_query(latest_only, account_ids)
+        for rows in stream_query(conn, query, params, itersize=itersize, name='report_resources'):
+            yield [_row_to_resource_dict(row) for row in rows]
+    finally:
+        conn.close()
+
+def fetch_resources_from_database(db_host, db_name, db_user, db_password, latest_only=True, account_ids=None,
+                                  reader_host=None, itersize=DEFAULT_ITERSIZE):
+    """Fetch all resources from the database as a list (see iter_resources_from_database)"""
     resources = []
-    with conn.cursor() as cur:
-        cur.execute(query, params if params else None)
-        rows = cur.fetchall()
-        
-        for row in rows:
-            resource_dict = {
-                'arn': row[2] if row[2] else '',
-                'resource_type': row[1],
-                'region': row[3],
-                'account_id': row[4],
-                'name': row[5],
-                'tags': row[6] if row[6] else {},
-                'configuration': row[7] if row[7] else {},
-                'resource_id': row[0],
-                'discovered_at': row[8].isoformat() if row[8] else None,
-                'last_seen_at': row[9].isoformat() if row[9] else None,
-                'inserted_at': row[10].isoformat() if row[10] else None,
-            }
-            resources.append(resource_dict)
+    for chunk in iter_resources_from_database(db_host, db_name, db_user, db_password,
+                                              latest_only=latest_only, account_ids=account_ids,
+                                              reader_host=reader_host, itersize=itersize):
+        resources.extend(chunk)
     
-    conn.close()
     logger.info(f"Fetched {len(resources)} resources from database (latest_only={latest_only})")
     return resources
 
-def generate_excel_report(resources):
-    """Generate Excel report from resources"""
-    import pandas as pd
-    from openpyxl import Workbook
-    from openpyxl.utils.dataframe import dataframe_to_rows
+REPORT_MAIN_COLUMNS = ['account_id', 'region', 'resource_type', 'name', 'arn', 'resource_id', 'inserted_at']
+
+def write_excel_report(resources, output, progress=None):
+    """Stream resources into an Excel report with constant memory use
     
-    logger.info("Generating Excel report...")
+    Rows go straight to the 'All Resources' sheet of a write-only workbook while
+    per-type/account/region counts are accumulated; the summary sheets are
+    written from those counts once the input is exhausted.
     
-    # Create DataFrame
-    df = pd.DataFrame(resources)
+    Args:
+        resources: Iterable of resource dicts (e.g. chained database chunks)
+        output: Path or binary file object to save the workbook to
+        progress: Optional callback(rows_processed, sheets_completed)
+    
+    Returns:
+        Number of resources written (0 means nothing was saved)
+    """
+    from reporting.streaming import StreamingWorkbook, ResourceAggregator
     
-    if df.empty:
+    resources = iter(resources)
+    first = next(resources, None)
+    if first is None:
         logger.warning("No resources to report")
-        return None
+        return 0
     
-    # Create Excel file in memory
-    output = BytesIO()
+    logger.info("Generating Excel report...")
     
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # 1. Executive Summary
-        # Get discovery timestamp from first resource
-        discovery_timestamp = 'N/A'
-        if 'inserted_at' in df.columns and not df['inserted_at'].isna().all():
-            discovery_timestamp = df['inserted_at'].iloc[0] if len(df) > 0 else 'N/A'
-        
-        summary_data = {
-            'Metric': [
-                'Total Resources',
-                'Unique Resource Types',
-                'Accounts',
-                'Regions',
-                'Discovery Run',
-                'Report Generated'
-            ],
-            'Value': [
-                len(df),
-                df['resource_type'].nunique(),
-                df['account_id'].nunique(),
-                df['region'].nunique(),
-                discovery_timestamp,
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')
-            ]
-        }
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name='Executive Summary', index=False)
-        
-        # 2. All Resources
-        # Select key columns for the main view
-        main_cols = ['account_id', 'region', 'resource_type', 'name', 'arn', 'resource_id', 'inserted_at']
-        available_cols = [col for col in main_cols if col in df.columns]
-        df[available_cols].to_excel(writer, sheet_name='All Resources', index=False)
-        
-        # 3. By Resource Type
-        type_summary = df.groupby('resource_type').size().reset_index(name='count')
-        type_summary = type_summary.sort_values('count', ascending=False)
-        type_summary.to_excel(writer, sheet_name='By Type', index=False)
-        
-        # 4. By Account
-        account_summary = df.groupby('account_id').agg({
-            'resource_id': 'count',
-            'resource_type': 'nunique',
-            'region': 'nunique'
-        }).reset_index()
-        account_summary.columns = ['account_id', 'total_resources', 'unique_types', 'regions']
-        account_summary.to_excel(writer, sheet_name='By Account', index=False)
-        
-        # 5. By Region
-        region_summary = df.groupby('region').size().reset_index(name='count')
-        region_summary = region_summary.sort_values('count', ascending=False)
-        region_summary.to_excel(writer, sheet_name='By Region', index=False)
+    workbook = StreamingWorkbook()
+    stats = ResourceAggregator()
+    
+    # 1. Executive Summary (tab created first, filled in once counts are known)
+    workbook.add_sheet('Executive Summary', ['Metric', 'Value'])
     
-    output.seek(0)
-    logger.info("Excel report generated successfully")
+    # 2. All Resources
+    workbook.add_sheet('All Resources', REPORT_MAIN_COLUMNS)
+    for resource in chain([first], resources):
+        stats.add(resource)
+        workbook.append('All Resources', [resource.get(col) for col in REPORT_MAIN_COLUMNS])
+        if progress and stats.total % PROGRESS_EVERY_ROWS == 0:
+            progress(stats.total, 0)
+    
+    report_progress = progress or (lambda rows, sheets: None)
+    report_progress(stats.total, 1)
+    
+    discovery_timestamp = first.get('inserted_at') or 'N/A'
+    summary_rows = [
+        ['Total Resources', stats.total],
+        ['Unique Resource Types', len(stats.by_type)],
+        ['Accounts', len(stats.by_account)],
+        ['Regions', len(stats.by_region)],
+        ['Discovery Run', discovery_timestamp],
+        ['Report Generated', datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')],
+    ]
+    for row in summary_rows:
+        workbook.append('Executive Summary', row)
+    report_progress(stats.total, 2)
+    
+    # 3. By Resource Type
+    workbook.write_sheet('By Type', ['resource_type', 'count'], stats.ranked(stats.by_type))
+    report_progress(stats.total, 3)
+    
+    # 4. By Account
+    workbook.write_sheet('By Account', ['account_id', 'total_resources', 'unique_types', 'regions'],
+                         stats.account_rows())
+    report_progress(stats.total, 4)
+    
+    # 5. By Region
+    workbook.write_sheet('By Region', ['region', 'count'], stats.ranked(stats.by_region))
+    report_progress(stats.total, 5)
+    
+    workbook.save(output)
+    logger.info(f"Excel report generated successfully ({stats.total} resources)")
+    return stats.total
+
+def generate_excel_report(resources):
+    """Generate Excel report from resources and return it as bytes (None if there are no resources)"""
+    output = BytesIO()
+    if not write_excel_report(resources, output):
+        return None
     return output.getvalue()
 
-def upload_to_s3(file_content, bucket_name, file_key):
-    """Upload file to S3"""
+def _track_progress(rows, progress):
+    """Pass rows through, reporting the running count every PROGRESS_EVERY_ROWS rows"""
+    if progress is None:
+        yield from rows
+        return
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % PROGRESS_EVERY_ROWS == 0:
+            progress(count, 0)
+
+def write_diff_report(db_host, db_name, db_user, db_password, output, account_ids=None,
+                      base_run_id=None, target_run_id=None, reader_host=None, itersize=DEFAULT_ITERSIZE,
+                      progress=None):
+    """Stream the changes between two discovery runs into an Excel report
+    
+    The diff is computed by the database (see lib.resource_diff); only changed
+    resources are transferred, one cursor chunk at a time.
+    
+    Args:
+        output: Path or binary file object to save the workbook to
+        account_ids: Optional list of account IDs to filter by
+        base_run_id: Earlier run to compare (defaults to the run before the target)
+        target_run_id: Later run to compare (defaults to the latest completed run)
+        progress: Optional callback(rows_processed, sheets_completed)
+    
+    Returns:
+        (counts per change type, base run dict, target run dict)
+    
+    Raises:
+        ValueError: If the runs cannot be resolved
+    """
+    from reporting.excel_generator import write_diff_workbook
+    
+    conn = _connect_read_only(db_host, db_name, db_user, db_password, reader_host)
+    try:
+        base_run, target_run = get_run_pair(conn, base_run_id, target_run_id)
+        changes = chain.from_iterable(iter_resource_diff(conn, base_run, target_run,
+                                                         account_ids=account_ids, itersize=itersize))
+        counts = write_diff_workbook(_track_progress(changes, progress), output, base_run, target_run)
+    finally:
+        conn.close()
+    
+    logger.info(f"Diff report generated: {base_run['run_id']} -> {target_run['run_id']} {counts}")
+    return counts, base_run, target_run
+
+def get_s3_client():
+    """S3 client configured for SigV4 presigned URLs"""
     from botocore.config import Config
     
     # Configure S3 client with signature version 4
     s3_config = Config(signature_version='s3v4')
-    s3 = boto3.client('s3', config=s3_config)
-    
-    s3.put_object(
-        Bucket=bucket_name,
-        Key=file_key,
-        Body=file_content,
-        ContentType='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    
+    return boto3.client('s3', config=s3_config)
+
+def generate_download_url(s3, bucket_name, file_key, download_name=None):
+    """Presigned GET URL for a report object"""
     # Generate presigned URL (valid for 15 minutes to avoid clock skew issues)
     # Include Content-Disposition to force browser download with proper filename
-    download_name = file_key.split('/')[-1]  # e.g. "CloudAuditor_Report_20260218_223652.xlsx"
-    url = s3.generate_presigned_url(
+    download_name = download_name or file_key.split('/')[-1]  # e.g. "CloudAuditor_Report_20260218_223652.xlsx"
+    return s3.generate_presigned_url(
         'get_object',
         Params={
             'Bucket': bucket_name,
@@ -232,75 +375,626 @@ def upload_to_s3(file_content, bucket_name, file_key):
         },
         ExpiresIn=900  # 15 minutes
     )
+
+def upload_to_s3(file_content, bucket_name, file_key):
+    """Upload file to S3 (file_content may be bytes or a binary file object)"""
+    s3 = get_s3_client()
+    
+    s3.put_object(
+        Bucket=bucket_name,
+        Key=file_key,
+        Body=file_content,
+        ContentType=XLSX_CONTENT_TYPE
+    )
     
-    return url
+    return generate_download_url(s3, bucket_name, file_key)
 
-def lambda_handler(event, context):
+def get_latest_run_id(db_host, db_name, db_user, db_password, reader_host=None):
+    """ID of the latest completed discovery run whose snapshot reports can be cached
+    
+    Reports read the newest rows in the database, so while a later run is still
+    writing them a report is not that run's snapshot (nor the previous one's).
+    Returns None - no caching - if there is no completed run, a run is in
+    progress, or the runs can't be read.
     """
-    Generate Excel report from Aurora database and upload to S3
+    try:
+        conn = _connect_read_only(db_host, db_name, db_user, db_password, reader_host)
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT
+                        (SELECT run_id FROM discovery_runs
+                         WHERE completed_at IS NOT NULL AND status <> 'failed'
+                         ORDER BY started_at DESC LIMIT 1),
+                        EXISTS (SELECT 1 FROM discovery_runs
+                                WHERE completed_at IS NULL
+                                AND started_at > NOW() - make_interval(secs => %s))
+                """, (DISCOVERY_RUN_STALE_SECONDS,))
+                row = cur.fetchone()
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning(f"Could not determine latest discovery run, report caching disabled: {e}")
+        return None
+    if not row:
+        return None
+    run_id, in_progress = row
+    if in_progress:
+        logger.info("A discovery run is in progress, report caching disabled")
+        return None
+    return run_id
+
+def report_cache_key(run_id, report_type, account_ids=None, options=None, extension='.xlsx'):
+    """Deterministic S3 key for a report of one discovery run with the given filters/options
+    
+    Keys are grouped under the run ID, so a newer run never serves an older run's artifact.
     """
-    logger.info(f"Event: {json.dumps(event)}")
+    # json module (not the codec) so keys stay identical whichever backend is installed
+    payload = json.dumps({
+        'version': REPORT_CACHE_VERSION,
+        'report_type': report_type,
+        'account_ids': sorted(set(account_ids)) if account_ids else None,
+        'options': options or {},
+    }, sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+    return f"{REPORT_CACHE_PREFIX}{run_id}/{digest}{extension}"
+
+def _cache_manifest_key(report_key):
+    prefix, name = report_key.rsplit('/', 1)
+    return f"{prefix}/{name.split('.', 1)[0]}.json"
+
+def load_cached_report(s3, bucket_name, report_key):
+    """Response fields stored with a cached report, or None on a cache miss
     
+    The manifest is written only after the report upload completes, so its
+    presence means the report object is complete.
+    """
     try:
-        # Get configuration from environment
-        secret_arn = os.environ['DB_SECRET_ARN']
-        db_host = os.environ['DB_HOST']
-        db_name = os.environ['DB_NAME']
-        region = os.environ['AWS_REGION']
-        bucket_name = os.environ.get('REPORT_BUCKET', 'cloudauditor-reports')
-        
-        # Get database credentials
-        secret = get_secret(secret_arn, region)
-        db_user = secret['username']
-        db_password = secret['password']
+        response = s3.get_object(Bucket=bucket_name, Key=_cache_manifest_key(report_key))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', '404'):
+            return None
+        raise
+    return codec.loads(response['Body'].read())
+
+def store_cached_report(s3, bucket_name, report_key, result):
+    """Record the response fields for a completed cached report"""
+    s3.put_object(
+        Bucket=bucket_name,
+        Key=_cache_manifest_key(report_key),
+        Body=codec.dumpb(result),
+        ContentType='application/json'
+    )
+
+def _generate_inventory_report(s3, bucket_name, file_key, db_host, db_name, db_user, db_password,
+                               reader_host, account_ids, progress=None):
+    """Stream the inventory report into S3; returns response fields (None if there are no resources)"""
+    # Stream resources from the database (optionally scoped to specific accounts)
+    # straight into the workbook rather than holding them in memory
+    resource_chunks = iter_resources_from_database(db_host, db_name, db_user, db_password,
+                                                   account_ids=account_ids,
+                                                   reader_host=reader_host)
+    
+    # The workbook is uploaded in multipart chunks as it is written
+    with S3StreamingUpload(s3, bucket_name, file_key, content_type=XLSX_CONTENT_TYPE) as report_sink:
+        resource_count = write_excel_report(chain.from_iterable(resource_chunks), report_sink, progress=progress)
         
-        # Fetch resources from database (optionally scoped to specific accounts)
-        account_ids = event.get('account_ids')
-        resources = fetch_resources_from_database(db_host, db_name, db_user, db_password,
-                                                  account_ids=account_ids)
+        if not resource_count:
+            report_sink.abort()
+            return None
+    
+    return {
+        'message': f'Excel report generated with {resource_count} resources',
+        'resource_count': resource_count,
+    }
+
+def _generate_ndjson_export(s3, bucket_name, file_key, db_host, db_name, db_user, db_password,
+                            reader_host, account_ids, compression, progress=None):
+    """Stream the inventory as (optionally compressed) NDJSON into S3; returns response fields
+    (None if there are no resources)"""
+    resource_chunks = iter_resources_from_database(db_host, db_name, db_user, db_password,
+                                                   account_ids=account_ids,
+                                                   reader_host=reader_host)
+    
+    with S3StreamingUpload(s3, bucket_name, file_key, content_type=NDJSON_CONTENT_TYPES[compression]) as export_sink:
+        resource_count = write_ndjson(_track_progress(chain.from_iterable(resource_chunks), progress),
+                                      export_sink, compression=compression)
         
-        if not resources:
+        if not resource_count:
+            export_sink.abort()
+            return None
+    
+    return {
+        'message': f'NDJSON export generated with {resource_count} resources',
+        'resource_count': resource_count,
+        'export_format': 'ndjson',
+        'compression': compression,
+    }
+
+def _generate_diff_report(s3, bucket_name, file_key, db_host, db_name, db_user, db_password,
+                          reader_host, account_ids, base_run_id=None, target_run_id=None, progress=None):
+    """Stream the "what changed" report between two runs into S3; returns response fields"""
+    with S3StreamingUpload(s3, bucket_name, file_key, content_type=XLSX_CONTENT_TYPE) as report_sink:
+        counts, base_run, target_run = write_diff_report(
+            db_host, db_name, db_user, db_password, report_sink,
+            account_ids=account_ids,
+            base_run_id=base_run_id,
+            target_run_id=target_run_id,
+            reader_host=reader_host,
+            progress=progress
+        )
+    
+    change_count = sum(counts.values())
+    return {
+        'message': f'Diff report generated with {change_count} changes',
+        'report_type': 'diff',
+        'base_run_id': base_run['run_id'],
+        'target_run_id': target_run['run_id'],
+        'change_count': change_count,
+        'changes': counts,
+    }
+
+def _report_response(s3, bucket_name, file_key, result, cached):
+    """Handler response for an uploaded (or cached) report"""
+    return {
+        'statusCode': 200,
+        'body': codec.dumps({
+            'success': True,
+            **result,
+            'cached': cached,
+            'download_url': generate_download_url(s3, bucket_name, file_key, result.get('filename')),
+            's3_bucket': bucket_name,
+            's3_key': file_key,
+            'expires_in_seconds': 900  # 15 minutes
+        })
+    }
+
+def _validate_request(event):
+    """Error message for an invalid report request, or None"""
+    is_diff = event.get('report_type', 'inventory') == 'diff'
+    export_format = event.get('export_format', 'xlsx')
+    compression = event.get('compression', 'gzip')
+    compression = None if compression in (None, 'none') else compression
+    if export_format not in ('xlsx', 'ndjson') or (export_format == 'ndjson' and is_diff) \
+            or compression not in (None,) + COMPRESSIONS:
+        return ("export_format must be 'xlsx' or 'ndjson' (inventory only); "
+                f"compression must be one of {['none', *COMPRESSIONS]}")
+    return None
+
+def generate_report(event, progress=None):
+    """
+    Generate a report from the Aurora database, upload it to S3 and return the handler response
+    
+    Reports are cached per discovery run: a request with the same report type,
+    accounts and options against the same latest completed run returns a fresh
+    download URL for the existing object instead of rebuilding it.
+    
+    Args:
+        event: Report request (see lambda_handler)
+        progress: Optional callback(rows_processed, sheets_completed)
+    """
+    # Get configuration from environment
+    secret_arn = os.environ['DB_SECRET_ARN']
+    db_host = os.environ['DB_HOST']
+    db_reader_host = os.environ.get('DB_READER_HOST')
+    db_name = os.environ['DB_NAME']
+    region = os.environ['AWS_REGION']
+    bucket_name = os.environ.get('REPORT_BUCKET', 'cloudauditor-reports')
+    
+    # Get database credentials
+    secret = get_secret(secret_arn, region)
+    db_user = secret['username']
+    db_password = secret['password']
+    
+    error = _validate_request(event)
+    if error:
+        return {
+            'statusCode': 400,
+            'body': codec.dumps({'success': False, 'error': error})
+        }
+    
+    account_ids = event.get('account_ids')
+    report_type = event.get('report_type', 'inventory')
+    is_diff = report_type == 'diff'
+    is_ndjson = event.get('export_format', 'xlsx') == 'ndjson'
+    compression = event.get('compression', 'gzip')
+    compression = None if compression in (None, 'none') else compression
+    extension = NDJSON_SUFFIXES[compression] if is_ndjson else '.xlsx'
+    s3 = get_s3_client()
+    
+    # Look for a cached artifact of the same report against the same run
+    run_id = get_latest_run_id(db_host, db_name, db_user, db_password, db_reader_host)
+    cache_key = None
+    if run_id:
+        options = {}
+        if is_diff:
+            options = {'base_run_id': event.get('base_run_id'),
+                       'target_run_id': event.get('target_run_id') or run_id}
+        if is_ndjson:
+            options = {'export_format': 'ndjson', 'compression': compression}
+        cache_key = report_cache_key(run_id, report_type, account_ids, options, extension)
+        cached = None if event.get('refresh') else load_cached_report(s3, bucket_name, cache_key)
+        if cached:
+            logger.info(f"Serving cached report: {cache_key}")
+            return _report_response(s3, bucket_name, cache_key, cached, cached=True)
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    download_name = f"CloudAuditor_{'Diff' if is_diff else 'Report'}_{timestamp}{extension}"
+    file_key = cache_key or f"reports/{download_name}"
+    
+    if is_diff:
+        try:
+            result = _generate_diff_report(s3, bucket_name, file_key, db_host, db_name, db_user,
+                                           db_password, db_reader_host, account_ids,
+                                           base_run_id=event.get('base_run_id'),
+                                           target_run_id=event.get('target_run_id'),
+                                           progress=progress)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': codec.dumps({'success': False, 'error': str(e)})
+            }
+    else:
+        if is_ndjson:
+            result = _generate_ndjson_export(s3, bucket_name, file_key, db_host, db_name, db_user,
+                                             db_password, db_reader_host, account_ids, compression,
+                                             progress=progress)
+        else:
+            result = _generate_inventory_report(s3, bucket_name, file_key, db_host, db_name, db_user,
+                                                db_password, db_reader_host, account_ids,
+                                                progress=progress)
+        if result is None:
             return {
                 'statusCode': 200,
-                'body': json.dumps({
+                'body': codec.dumps({
                     'success': True,
                     'message': 'No resources found in database',
                     'resource_count': 0
                 })
             }
-        
-        # Generate Excel report
-        excel_content = generate_excel_report(resources)
-        
-        if not excel_content:
-            return {
-                'statusCode': 500,
-                'body': json.dumps({
-                    'success': False,
-                    'error': 'Failed to generate Excel report'
-                })
-            }
-        
-        # Upload to S3
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        file_key = f"reports/CloudAuditor_Report_{timestamp}.xlsx"
-        
-        download_url = upload_to_s3(excel_content, bucket_name, file_key)
-        
-        logger.info(f"Report uploaded successfully: {file_key}")
-        
-        return {
-            'statusCode': 200,
-            'body': json.dumps({
-                'success': True,
-                'message': f'Excel report generated with {len(resources)} resources',
-                'resource_count': len(resources),
-                'download_url': download_url,
-                's3_bucket': bucket_name,
-                's3_key': file_key,
+    
+    result['filename'] = download_name
+    logger.info(f"Report uploaded successfully: {file_key}")
+    
+    if cache_key:
+        store_cached_report(s3, bucket_name, cache_key, result)
+    
+    return _report_response(s3, bucket_name, file_key, result, cached=False)
+
+def _spill_rows(rows, directory):
+    """Pickle a stream of resource dicts to a temporary file in chunks; returns its path"""
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.rows')
+    with os.fdopen(fd, 'wb') as spill:
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, DEFAULT_ITERSIZE))
+            if not chunk:
+                break
+            pickle.dump(chunk, spill, protocol=pickle.HIGHEST_PROTOCOL)
+    return path
+
+def _read_spill(path):
+    """Resource dicts written by _spill_rows, one chunk in memory at a time"""
+    with open(path, 'rb') as spill:
+        while True:
+            try:
+                chunk = pickle.load(spill)
+            except EOFError:
+                return
+            yield from chunk
+
+def render_account_report(spill_path, bucket_name, file_key, result):
+    """Render one account's spilled resources as a cached Excel report; returns the resource count"""
+    s3 = get_s3_client()
+    try:
+        with S3StreamingUpload(s3, bucket_name, file_key, content_type=XLSX_CONTENT_TYPE) as report_sink:
+            resource_count = write_excel_report(_read_spill(spill_path), report_sink)
+        store_cached_report(s3, bucket_name, file_key, {
+            'message': f'Excel report generated with {resource_count} resources',
+            'resource_count': resource_count,
+            **result,
+        })
+        return resource_count
+    finally:
+        os.remove(spill_path)
+
+def _render_worker(conn, args):
+    try:
+        conn.send((True, render_account_report(*args)))
+    except Exception as e:
+        conn.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+class RenderWorkers:
+    """Run render_account_report in at most `max_workers` child processes at a time
+    
+    Uses Process and Pipe rather than a multiprocessing pool: Lambda has no
+    /dev/shm for the semaphores a pool needs. With max_workers <= 1 reports are
+    rendered in-process.
+    """
+    
+    def __init__(self, max_workers=PRERENDER_WORKERS):
+        self.max_workers = max_workers
+        self.results = {}
+        self.errors = {}
+        self._running = []
+        self._context = multiprocessing.get_context('fork')
+    
+    def submit(self, name, *args):
+        if self.max_workers <= 1:
+            try:
+                self.results[name] = render_account_report(*args)
+            except Exception as e:
+                self.errors[name] = f"{type(e).__name__}: {e}"
+            return
+        while len(self._running) >= self.max_workers:
+            self._collect_oldest()
+        parent_conn, child_conn = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_render_worker, args=(child_conn, args), daemon=True)
+        process.start()
+        child_conn.close()
+        self._running.append((name, process, parent_conn))
+    
+    def join(self):
+        while self._running:
+            self._collect_oldest()
+    
+    def _collect_oldest(self):
+        name, process, conn = self._running.pop(0)
+        try:
+            ok, value = conn.recv()
+        except EOFError:
+            ok, value = False, f"worker exited with code {process.exitcode}"
+        finally:
+            conn.close()
+            process.join()
+        if ok:
+            self.results[name] = value
+        else:
+            self.errors[name] = value
+
+def prerender_account_reports(event):
+    """
+    Render every account's inventory report for a discovery run ahead of time
+    
+    Streams the snapshot once, ordered by account. Each account's rows are spilled
+    to /tmp and rendered by a worker process while the next account streams in.
+    Each report is stored under the cache key an account-filtered request for the
+    run looks up, so those requests are served as presigned URLs.
+    """
+    secret = get_secret(os.environ['DB_SECRET_ARN'], os.environ['AWS_REGION'])
+    db_host = os.environ['DB_HOST']
+    db_reader_host = os.environ.get('DB_READER_HOST')
+    db_name = os.environ['DB_NAME']
+    bucket_name = os.environ.get('REPORT_BUCKET', 'cloudauditor-reports')
+    db_user = secret['username']
+    db_password = secret['password']
+    
+    # The snapshot streamed below is the latest run's, and only while no other run is writing
+    run_id = get_latest_run_id(db_host, db_name, db_user, db_password, db_reader_host)
+    if not run_id:
+        return _job_response(200, {'success': True,
+                                   'message': 'No completed discovery run to pre-render, or a run is in progress'})
+    if event.get('run_id') and event['run_id'] != run_id:
+        return _job_response(200, {'success': True,
+                                   'message': f"Run {event['run_id']} is no longer the latest completed run"})
+    
+    s3 = get_s3_client()
+    workers = RenderWorkers(int(event.get('workers', PRERENDER_WORKERS)))
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    skipped = 0
+    
+    conn = _connect_read_only(db_host, db_name, db_user, db_password, db_reader_host)
+    try:
+        rows = chain.from_iterable(stream_query(conn, _build_account_snapshots_query(), None,
+                                                itersize=DEFAULT_ITERSIZE, name='account_snapshots'))
+        with tempfile.TemporaryDirectory(prefix='prerender-') as spill_dir:
+            for account_id, account_rows in groupby(map(_row_to_resource_dict, rows),
+                                                    key=lambda r: r['account_id']):
+                file_key = report_cache_key(run_id, 'inventory', [account_id], {}, '.xlsx')
+                if not event.get('refresh') and load_cached_report(s3, bucket_name, file_key):
+                    skipped += 1
+                    continue
+                spill_path = _spill_rows(account_rows, spill_dir)
+                workers.submit(account_id, spill_path, bucket_name, file_key,
+                               {'filename': f"CloudAuditor_Report_{account_id}_{timestamp}.xlsx"})
+            workers.join()
+    finally:
+        conn.close()
+    
+    for account_id, error in workers.errors.items():
+        logger.error(f"Failed to pre-render report for account {account_id}: {error}")
+    logger.info(f"Pre-rendered {len(workers.results)} account reports for run {run_id} "
+                f"({skipped} already cached, {len(workers.errors)} failed)")
+    return _job_response(200, {
+        'success': not workers.errors,
+        'run_id': run_id,
+        'rendered': len(workers.results),
+        'skipped': skipped,
+        'resource_count': sum(workers.results.values()),
+        'errors': workers.errors,
+    })
+
+class ReportJobProgress:
+    """Progress callback that persists (rows processed, sheets done) to report_jobs, throttled"""
+    
+    def __init__(self, db, job_id, min_interval=PROGRESS_MIN_INTERVAL):
+        self.db = db
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self.rows_processed = 0
+        self.sheets_completed = 0
+        self._last_saved = None
+    
+    def __call__(self, rows_processed, sheets_completed):
+        self.rows_processed = rows_processed
+        sheet_finished = sheets_completed != self.sheets_completed
+        self.sheets_completed = sheets_completed
+        now = time.monotonic()
+        if sheet_finished or self._last_saved is None or now - self._last_saved >= self.min_interval:
+            self._last_saved = now
+            try:
+                self.db.update_report_job_progress(self.job_id, rows_processed, sheets_completed)
+            except Exception as e:
+                # Progress is informational - never fail the report over it
+                logger.warning(f"Failed to record progress for report job {self.job_id}: {e}")
+
+def _job_response(status_code, body):
+    return {'statusCode': status_code, 'body': codec.dumps(body)}
+
+def submit_report_job(event, context):
+    """Queue a report job and start it in a separate asynchronous invocation of this function"""
+    error = _validate_request(event)
+    if error:
+        return _job_response(400, {'success': False, 'error': error})
+    
+    request = {k: v for k, v in event.items() if k not in ('action', 'job_id')}
+    job_id = str(uuid.uuid4())
+    db = DatabaseClient()
+    db.create_report_job(job_id, request)
+    
+    try:
+        boto3.client('lambda').invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType='Event',
+            Payload=codec.dumpb({'action': 'run_job', 'job_id': job_id})
+        )
+    except Exception as e:
+        db.fail_report_job(job_id, f"Failed to start report job: {e}")
+        raise
+    
+    logger.info(f"Report job {job_id} queued")
+    return _job_response(202, {'success': True, 'job_id': job_id, 'status': 'queued'})
+
+def run_report_job(event):
+    """Worker invocation: generate the report for a queued job, recording progress and the outcome"""
+    job_id = event['job_id']
+    db = DatabaseClient()
+    job = db.get_report_job(job_id)
+    if not job:
+        return _job_response(404, {'success': False, 'error': f'Report job {job_id} not found'})
+    
+    # Claiming the job makes retried async deliveries no-ops
+    if not db.start_report_job(job_id):
+        logger.warning(f"Report job {job_id} is already {job['status']}, skipping")
+        return _job_response(409, {'success': False, 'error': f"Report job {job_id} is already {job['status']}"})
+    
+    progress = ReportJobProgress(db, job_id)
+    try:
+        response = generate_report(job['request'], progress=progress)
+    except Exception as e:
+        logger.exception(f"Report job {job_id} failed")
+        db.fail_report_job(job_id, str(e))
+        # Returning (rather than raising) stops Lambda retrying the async invocation
+        return _job_response(500, {'success': False, 'job_id': job_id, 'error': str(e)})
+    
+    body = codec.loads(response['body'])
+    if response['statusCode'] != 200:
+        db.fail_report_job(job_id, body.get('error', 'Report generation failed'))
+        return response
+    
+    rows_processed = body.get('resource_count', body.get('change_count', progress.rows_processed))
+    db.update_report_job_progress(job_id, rows_processed, progress.sheets_completed)
+    result = {k: v for k, v in body.items()
+              if k not in ('success', 'download_url', 'expires_in_seconds', 's3_bucket', 's3_key')}
+    db.complete_report_job(job_id, body.get('s3_bucket'), body.get('s3_key'), result)
+    logger.info(f"Report job {job_id} completed")
+    return response
+
+def report_expired(s3, bucket_name, report_key):
+    """Whether a report object is gone, or is a cached artifact the lifecycle rule is due to expire
+    
+    A job served from the cache points at an artifact created by an earlier
+    request, so the object's own age counts, not when the job completed.
+    """
+    try:
+        last_modified = s3.head_object(Bucket=bucket_name, Key=report_key)['LastModified']
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('NoSuchKey', 'NotFound', '404'):
+            return True
+        raise
+    return (report_key.startswith(REPORT_CACHE_PREFIX) and
+            datetime.now(last_modified.tzinfo) - last_modified > timedelta(days=REPORT_CACHE_TTL_DAYS))
+
+def get_report_job_status(event):
+    """Job status and progress; includes a fresh download URL once the report is ready"""
+    job_id = event.get('job_id')
+    if not job_id:
+        return _job_response(400, {'success': False, 'error': 'job_id is required'})
+    
+    db = DatabaseClient()
+    job = db.get_report_job(job_id)
+    if not job:
+        return _job_response(404, {'success': False, 'error': f'Report job {job_id} not found'})
+    
+    # A worker that hit the Lambda timeout never records its failure
+    if job['status'] in ('queued', 'running'):
+        last_update = job['updated_at']
+        if last_update and (datetime.now(last_update.tzinfo) - last_update).total_seconds() > REPORT_JOB_STALE_SECONDS:
+            job['status'] = 'failed'
+            job['error'] = 'Report job stopped responding (timed out)'
+            db.fail_report_job(job_id, job['error'])
+    
+    body = {
+        'success': True,
+        'job_id': job_id,
+        'status': job['status'],
+        'rows_processed': job['rows_processed'],
+        'sheets_completed': job['sheets_completed'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'completed_at': job['completed_at'],
+    }
+    s3 = get_s3_client() if job['status'] == 'completed' and job['s3_key'] else None
+    if s3 and report_expired(s3, job['s3_bucket'], job['s3_key']):
+        job['status'] = 'expired'
+        body['status'] = 'expired'
+    if job['status'] == 'failed':
+        body['error'] = job['error']
+    if job['status'] == 'completed':
+        body.update(job['result'] or {})
+        if s3:
+            body.update({
+                'download_url': generate_download_url(s3, job['s3_bucket'], job['s3_key'],
+                                                      (job['result'] or {}).get('filename')),
+                's3_bucket': job['s3_bucket'],
+                's3_key': job['s3_key'],
                 'expires_in_seconds': 900  # 15 minutes
             })
-        }
+    return _job_response(200, body)
+
+def lambda_handler(event, context):
+    """
+    Generate Excel report from Aurora database and upload to S3
+    
+    Event parameters:
+        action: 'generate' (default, synchronous), 'submit' (queue a report job and return its
+                job_id immediately), 'status' (job progress / download URL), 'prerender' (render
+                every account's report for a discovery run into the cache) or 'run_job' (internal)
+        job_id: Report job for 'status'
+        run_id: Discovery run for 'prerender' (default: latest completed run; skipped if it is no longer
+                the latest or another run is in progress)
+        account_ids: Optional list of account IDs to report on
+        report_type: 'inventory' (default) or 'diff' (changes between two discovery runs)
+        base_run_id / target_run_id: Runs to compare for 'diff' (default: previous and latest)
+        export_format: 'xlsx' (default) or 'ndjson' (inventory only, one JSON object per line)
+        compression: 'gzip' (default for ndjson), 'zstd' or 'none'
+        refresh: If true, rebuild the report even if a cached copy exists
+    """
+    logger.info(f"Event: {codec.dumps(event)}")
+    
+    try:
+        action = event.get('action', 'generate')
+        if action == 'submit':
+            return submit_report_job(event, context)
+        if action == 'status':
+            return get_report_job_status(event)
+        if action == 'run_job':
+            return run_report_job(event)
+        if action == 'prerender':
+            return prerender_account_reports(event)
+        return generate_report(event)
         
     except Exception as e:
         logger.error(f"Error generating report: {e}")
@@ -309,7 +1003,7 @@ def lambda_handler(event, context):
         
         return {
             'statusCode': 500,
-            'body': json.dumps({
+            'body': codec.dumps({
                 'success': False,
                 'error': str(e)
             })
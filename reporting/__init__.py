@@ -1,3 +1,9 @@
 from .excel_generator import ExcelGenerator
+from .streaming import StreamingWorkbook, ResourceAggregator
+from .columnar import write_parquet_dataset, write_arrow_file, open_parquet_dataset
+from .ndjson import write_ndjson
 
-__all__ = ['ExcelGenerator']
+__all__ = [
+    'ExcelGenerator', 'StreamingWorkbook', 'ResourceAggregator',
+    'write_parquet_dataset', 'write_arrow_file', 'open_parquet_dataset', 'write_ndjson',
+]
@@ -0,0 +1,191 @@
+import logging
+import os
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Union
+
+from resource_discovery.models import RawJson, Resource, json_field_text
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # pragma: no cover - exercised only without the optional dependency
+    pa = None
+    ds = None
+
+logger = logging.getLogger(__name__)
+
+# Rows per record batch, and the most rows per Parquet row group (unless min_rows_per_group is larger)
+DEFAULT_BATCH_SIZE = 50000
+# Rows a partition's writer buffers before it writes a row group, so a partition
+# fed a few rows per batch still gets row groups of useful size. Buffered rows
+# are held per open partition file.
+DEFAULT_MIN_ROWS_PER_GROUP = 10000
+PARTITION_COLUMNS = ('account_id', 'resource_type')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Columnar export requires pyarrow (pip install pyarrow)")
+
+
+def resource_schema():
+    """
+    Arrow schema for Resource.to_dict() rows.
+
+    Tags are a native map column. Configuration payloads differ per resource
+    type, so they are kept as a JSON string column rather than a union of
+    every shape ever seen. Timestamps are stored in UTC.
+    """
+    _require_pyarrow()
+    return pa.schema([
+        pa.field('arn', pa.string(), nullable=False),
+        pa.field('resource_type', pa.string(), nullable=False),
+        pa.field('region', pa.string()),
+        pa.field('account_id', pa.string(), nullable=False),
+        pa.field('name', pa.string()),
+        pa.field('tags', pa.map_(pa.string(), pa.string())),
+        pa.field('configuration', pa.string()),
+        pa.field('relationships', pa.list_(pa.string())),
+        pa.field('created_at', pa.timestamp('us', tz='UTC')),
+        pa.field('last_modified', pa.timestamp('us', tz='UTC')),
+        pa.field('discovery_source', pa.string()),
+    ])
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        # Naive timestamps throughout the codebase are UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def iter_record_batches(resources: Iterable[Union[Resource, Dict[str, Any]]],
+                        batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Any]:
+    """
+    Convert a stream of Resource objects (or their to_dict() form) to Arrow
+    record batches of up to `batch_size` rows, holding one batch at a time.
+    """
+    schema = resource_schema()
+    iterator = iter(resources)
+    while True:
+        chunk = list(islice(iterator, batch_size))
+        if not chunk:
+            return
+        columns: Dict[str, list] = {name: [] for name in schema.names}
+        for resource in chunk:
+            row = resource.to_dict() if isinstance(resource, Resource) else resource
+            columns['arn'].append(row.get('arn') or '')
+            columns['resource_type'].append(row.get('resource_type'))
+            columns['region'].append(row.get('region'))
+            columns['account_id'].append(row.get('account_id'))
+            columns['name'].append(row.get('name'))
+            columns['tags'].append([(str(k), None if v is None else str(v))
+                                    for k, v in (row.get('tags') or {}).items()])
+            configuration = row.get('configuration')
+            columns['configuration'].append(
+                json_field_text(configuration) if isinstance(configuration, RawJson) or configuration else None
+            )
+            columns['relationships'].append([str(r) for r in row.get('relationships') or []])
+            columns['created_at'].append(_timestamp(row.get('created_at')))
+            columns['last_modified'].append(_timestamp(row.get('last_modified')))
+            columns['discovery_source'].append(row.get('discovery_source'))
+        yield pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+class _CountingBatches:
+    """Iterator wrapper that counts rows as they are consumed by a writer."""
+
+    def __init__(self, batches: Iterator[Any]):
+        self._batches = batches
+        self.rows = 0
+
+    def __iter__(self):
+        for batch in self._batches:
+            self.rows += batch.num_rows
+            yield batch
+
+
+def write_parquet_dataset(resources: Iterable[Union[Resource, Dict[str, Any]]], base_dir: str,
+                          partition_cols: Sequence[str] = PARTITION_COLUMNS,
+                          batch_size: int = DEFAULT_BATCH_SIZE,
+                          compression: str = 'zstd',
+                          min_rows_per_group: int = DEFAULT_MIN_ROWS_PER_GROUP) -> int:
+    """
+    Write resources as a Hive-partitioned Parquet dataset
+    (<base_dir>/account_id=.../resource_type=.../part-N.parquet).
+
+    Rows are streamed through in batches, so memory is bounded by the batch
+    size (plus up to `min_rows_per_group` buffered rows per partition) rather
+    than the number of resources. Partition values are URI-encoded in
+    directory names (AWS::EC2::Instance -> AWS%3A%3AEC2%3A%3AInstance) and
+    decoded again by any Hive-aware reader.
+
+    Rewriting a dataset replaces every partition the new rows fall into, so
+    files a previous, larger export left there are not read back as
+    duplicates. Partitions without new rows (e.g. a removed account) are left
+    as they are; write each export to its own base_dir to drop those too.
+
+    Returns:
+        Number of rows written
+    """
+    schema = resource_schema()
+    batches = _CountingBatches(iter_record_batches(resources, batch_size))
+    ds.write_dataset(
+        batches,
+        base_dir,
+        schema=schema,
+        format='parquet',
+        partitioning=ds.partitioning(
+            pa.schema([schema.field(col) for col in partition_cols]), flavor='hive'
+        ),
+        basename_template='part-{i}.parquet',
+        existing_data_behavior='delete_matching',
+        min_rows_per_group=min_rows_per_group,
+        max_rows_per_group=max(batch_size, min_rows_per_group),
+        file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+    )
+    logger.info(f"Parquet dataset written to {base_dir} ({batches.rows} rows)")
+    return batches.rows
+
+
+def open_parquet_dataset(base_dir: str, partition_cols: Sequence[str] = PARTITION_COLUMNS):
+    """
+    Open a dataset written by write_parquet_dataset() with its partition
+    columns typed as strings (inference would turn account IDs into integers).
+    Filters on partition columns prune whole directories.
+    """
+    schema = resource_schema()
+    return ds.dataset(
+        base_dir,
+        format='parquet',
+        partitioning=ds.partitioning(
+            pa.schema([schema.field(col) for col in partition_cols]), flavor='hive'
+        ),
+    )
+
+
+def write_arrow_file(resources: Iterable[Union[Resource, Dict[str, Any]]], path: str,
+                     batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Write resources to a single Arrow IPC (Feather v2) file, one record batch
+    at a time. Suited to memory-mapped loading with pyarrow/pandas/polars.
+
+    Returns:
+        Number of rows written
+    """
+    schema = resource_schema()
+    rows = 0
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in iter_record_batches(resources, batch_size):
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    logger.info(f"Arrow IPC file written to {path} ({rows} rows)")
+    return rows
@@ -1,13 +1,24 @@
 import logging
 import os
-from typing import List, Dict, Any
+from bisect import bisect, insort
+from itertools import chain
+from typing import List, Dict, Any, Iterable
 from datetime import datetime
 
 import pandas as pd
-from resource_discovery.models import Resource, DiscoveryResult
+from resource_discovery.models import (
+    Resource, ResourceBatch, DiscoveryResult, json_field_text,
+    RESOURCE_TIMESTAMP_FIELDS, RESOURCE_CATEGORICAL_FIELDS, RESOURCE_NESTED_FIELDS,
+)
+from .streaming import StreamingWorkbook, ResourceAggregator
 
 logger = logging.getLogger(__name__)
 
+SUMMARY_SHEET = 'Executive Summary'
+DIFF_SUMMARY_SHEET = 'Change Summary'
+DIFF_SHEETS = {'added': 'Added', 'removed': 'Removed', 'modified': 'Modified'}
+DIFF_COLUMNS = ['account_id', 'region', 'resource_type', 'resource_id', 'name', 'arn']
+
 class ExcelGenerator:
     """
     Generates high-quality Excel reports from discovery results.
@@ -23,83 +34,192 @@ class ExcelGenerator:
         """
         Produce a multi-tab Excel spreadsheet from discovery resources.
         
+        The resources (spilled ones included) are streamed through
+        generate_streaming_report(), so memory use doesn't grow with the
+        inventory.
+        
         Args:
             result: The discovery result containing all resources
             filename: Output filename (defaults to timestamped name)
             
         Returns:
-            Path to the generated report
+            Path to the generated report ("" if there were no resources)
+        """
+        return self.generate_streaming_report(result.iter_resources(), filename=filename)
+
+    def generate_streaming_report(self, resources: Iterable[Resource], filename: str = None) -> str:
+        """
+        Produce the multi-tab report from a resource iterator, in constant memory.
+        
+        Each resource is appended to its service tab of a write-only workbook as it
+        arrives and the summary counts are accumulated on the fly, so nothing is
+        materialized beyond one row.
+        
+        Args:
+            resources: Iterable of Resource objects (e.g. a database cursor stream)
+            filename: Output filename (defaults to timestamped name)
+            
+        Returns:
+            Path to the generated report ("" if there were no resources)
         """
+        resources = iter(resources)
+        first = next(resources, None)
+        if first is None:
+            logger.warning("No resources found to report.")
+            return ""
+        
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"CloudAuditor_Report_{timestamp}.xlsx"
-            
         output_path = os.path.join(self.output_dir, filename)
         
-        # Convert resources to a Flat DataFrame for processing
-        data = [r.to_dict() for r in result.resources]
-        df = pd.DataFrame(data)
+        workbook = StreamingWorkbook()
+        stats = ResourceAggregator()
+        columns = None
+        services: List[str] = []
         
-        if df.empty:
-            logger.warning("No resources found to report.")
-            return ""
-
-        # Strip timezone info from datetime columns (Excel doesn't support tz-aware datetimes)
-        for col in df.columns:
-            if pd.api.types.is_datetime64_any_dtype(df[col]):
-                df[col] = df[col].dt.tz_localize(None) if df[col].dt.tz is not None else df[col]
-            else:
-                # Handle object columns that may contain mixed datetime objects
-                try:
-                    converted = pd.to_datetime(df[col], errors='coerce', utc=True)
-                    if converted.notna().any():
-                        df[col] = converted.dt.tz_localize(None)
-                except (ValueError, TypeError):
-                    pass
-
-        # Create the Excel writer
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-            
-            # 1. Executive Summary Tab
-            summary_stats = self._create_summary_stats(df)
-            summary_stats.to_excel(writer, sheet_name='Executive Summary', index=False)
-            
-            # 2. Per-Service Tabs
-            # Group by Service (extracted from resource_type prefix e.g., 'ec2' from 'ec2:instance')
-            df['service'] = df['resource_type'].apply(lambda x: x.split(':')[0] if ':' in x else x)
+        # 1. Executive Summary Tab (filled in after all rows are streamed)
+        workbook.add_sheet(SUMMARY_SHEET, ['account_id', 'resource_type', 'count'])
+        
+        # 2. Per-Service Tabs, created as services are first seen and placed
+        #    alphabetically after the summary
+        for resource in chain([first], resources):
+            record = resource.to_dict()
+            if columns is None:
+                columns = list(record)
+            stats.add(record)
             
-            services = sorted(df['service'].unique())
-            for service in services:
-                service_df = df[df['service'] == service].copy()
-                
-                # Drop internal helper columns before writing
-                cols_to_drop = ['service']
-                service_df.drop(columns=cols_to_drop, inplace=True, errors='ignore')
-                
-                # Sanitize sheet name (Excel limit 31 chars)
-                sheet_name = service.upper()[:31]
-                service_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                # Formatting (optional but recommended for 'wow' factor)
-                # Note: Minimal formatting for now, can be expanded with openpyxl
-                
-        logger.info(f"Report generated successfully: {output_path}")
+            sheet_name = service_name(record['resource_type']).upper()[:31]
+            if not workbook.has_sheet(sheet_name):
+                position = bisect(services, sheet_name)
+                workbook.add_sheet(sheet_name, columns,
+                                   before=services[position] if position < len(services) else None)
+                insort(services, sheet_name)
+            workbook.append(sheet_name, [record[col] for col in columns])
+        
+        summary_rows = [
+            ['REPORT SUMMARY', 'Total Accounts', len(stats.by_account)],
+            ['REPORT SUMMARY', 'Total Resources', stats.total],
+            ['', '', None],  # Spacer
+        ]
+        summary_rows += [
+            [account_id, resource_type, count]
+            for (account_id, resource_type), count in sorted(stats.by_account_type.items())
+        ]
+        for row in summary_rows:
+            workbook.append(SUMMARY_SHEET, row)
+        workbook.save(output_path)
+        
+        logger.info(f"Report generated successfully: {output_path} ({stats.total} resources)")
         return output_path
 
-    def _create_summary_stats(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Create high-level asset counts for the summary tab."""
-        summary = df.groupby(['account_id', 'resource_type']).size().reset_index(name='count')
+    def generate_diff_report(self, changes: Iterable[Dict[str, Any]], base_run: Dict[str, Any],
+                             target_run: Dict[str, Any], filename: str = None) -> str:
+        """
+        Produce a "what changed" report between two discovery runs.
         
-        # Add a grand total row
-        total_resources = df.shape[0]
-        total_accounts = df['account_id'].nunique()
+        Args:
+            changes: Iterable of change dicts (see lib.resource_diff.iter_resource_diff)
+            base_run: Earlier discovery run (run_id, started_at, completed_at)
+            target_run: Later discovery run
+            filename: Output filename (defaults to timestamped name)
+            
+        Returns:
+            Path to the generated report
+        """
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"CloudAuditor_Diff_{timestamp}.xlsx"
+        output_path = os.path.join(self.output_dir, filename)
         
-        # Create a nice header for the summary
-        header_data = [
-            {'account_id': 'REPORT SUMMARY', 'resource_type': 'Total Accounts', 'count': total_accounts},
-            {'account_id': 'REPORT SUMMARY', 'resource_type': 'Total Resources', 'count': total_resources},
-            {'account_id': '', 'resource_type': '', 'count': None} # Spacer
-        ]
+        counts = write_diff_workbook(changes, output_path, base_run, target_run)
+        logger.info(f"Diff report generated successfully: {output_path} ({counts})")
+        return output_path
+
+
+def resources_frame(resources: Iterable[Resource]) -> pd.DataFrame:
+    """
+    Build a DataFrame of Resource.to_dict() rows with dtypes taken from the
+    declared field types rather than inferred per column:
+    timestamps become naive UTC datetimes (Excel has no timezone support),
+    low-cardinality fields become categoricals and nested fields are
+    serialized to JSON text. Other fields are left as-is.
+    A ResourceBatch is converted column by column without building Resources.
+    """
+    if isinstance(resources, ResourceBatch):
+        return resources.to_pandas()
+    
+    columns: Dict[str, list] = {}
+    for resource in resources:
+        record = resource.to_dict()
+        if not columns:
+            columns = {name: [] for name in record}
+        for name, value in record.items():
+            columns[name].append(value)
+    
+    data = {}
+    for name, values in columns.items():
+        if name in RESOURCE_TIMESTAMP_FIELDS:
+            timestamps = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', utc=True)
+            data[name] = timestamps.dt.tz_localize(None)
+        elif name in RESOURCE_CATEGORICAL_FIELDS:
+            data[name] = pd.Categorical(values)
+        elif name in RESOURCE_NESTED_FIELDS:
+            data[name] = [json_field_text(v) for v in values]
+        else:
+            data[name] = values
+    return pd.DataFrame(data)
+
+
+def service_name(resource_type: str) -> str:
+    """Service prefix used to group resources into tabs (e.g. 'ec2' from 'ec2:instance')."""
+    return resource_type.split(':')[0] if ':' in resource_type else resource_type
+
+
+def write_diff_workbook(changes: Iterable[Dict[str, Any]], output, base_run: Dict[str, Any],
+                        target_run: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Stream change dicts into a workbook with Added / Removed / Modified tabs
+    (modified rows carry the changed fields and their old -> new values)
+    behind a Change Summary tab.
+    
+    Args:
+        changes: Iterable of change dicts with a 'change_type' key
+        output: Path or binary file object to save the workbook to
+        base_run: Earlier discovery run
+        target_run: Later discovery run
         
-        header_df = pd.DataFrame(header_data)
-        return pd.concat([header_df, summary], ignore_index=True)
+    Returns:
+        Number of changes written per change type
+    """
+    workbook = StreamingWorkbook()
+    counts = {change_type: 0 for change_type in DIFF_SHEETS}
+    
+    workbook.add_sheet(DIFF_SUMMARY_SHEET, ['Metric', 'Value'])
+    workbook.add_sheet(DIFF_SHEETS['added'], DIFF_COLUMNS)
+    workbook.add_sheet(DIFF_SHEETS['removed'], DIFF_COLUMNS)
+    workbook.add_sheet(DIFF_SHEETS['modified'], DIFF_COLUMNS + ['changed_fields', 'change_summary'])
+    
+    for change in changes:
+        change_type = change['change_type']
+        row = [change.get(col) for col in DIFF_COLUMNS]
+        if change_type == 'modified':
+            row += [change.get('changed_fields'), change.get('change_summary')]
+        workbook.append(DIFF_SHEETS[change_type], row)
+        counts[change_type] += 1
+    
+    summary_rows = [
+        ['Base Run', base_run['run_id']],
+        ['Base Run Completed', base_run.get('completed_at')],
+        ['Target Run', target_run['run_id']],
+        ['Target Run Completed', target_run.get('completed_at')],
+        ['Added', counts['added']],
+        ['Removed', counts['removed']],
+        ['Modified', counts['modified']],
+        ['Report Generated', datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')],
+    ]
+    for row in summary_rows:
+        workbook.append(DIFF_SUMMARY_SHEET, row)
+    
+    workbook.save(output)
+    return counts
@@ -0,0 +1,91 @@
+import gzip
+import logging
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+from resource_discovery import codec
+from resource_discovery.models import Resource
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = ('gzip', 'zstd')
+FILE_SUFFIXES = {None: '.ndjson', 'gzip': '.ndjson.gz', 'zstd': '.ndjson.zst'}
+CONTENT_TYPES = {None: 'application/x-ndjson', 'gzip': 'application/gzip', 'zstd': 'application/zstd'}
+
+# Compression levels tuned for throughput on large exports rather than maximum ratio
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """
+    Encode one record as a single compact JSON line (including the trailing
+    newline) with the shared codec, so every installed backend writes the
+    same line (datetimes as ISO 8601, raw configuration text unchanged).
+    """
+    return codec.dumpb(record, newline=True)
+
+
+@contextmanager
+def open_output(output: Union[str, Any], compression: Optional[str] = None) -> Iterator[Any]:
+    """
+    Open a path or wrap a binary file object for writing, optionally compressed.
+    Closing the compressor flushes its trailer but leaves a caller-supplied
+    file object open.
+    """
+    if compression not in (None,) + COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression!r}")
+
+    owns_file = isinstance(output, (str, os.PathLike))
+    raw = open(output, 'wb') if owns_file else output
+    try:
+        if compression == 'gzip':
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_LEVEL) as stream:
+                yield stream
+        elif compression == 'zstd':
+            with _zstd_writer(raw) as stream:
+                yield stream
+        else:
+            yield raw
+    finally:
+        if owns_file:
+            raw.close()
+
+
+def _zstd_writer(raw):
+    try:
+        from compression import zstd  # Python 3.14+
+        return zstd.ZstdFile(raw, 'wb', level=ZSTD_LEVEL)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires Python 3.14+ or the zstandard package")
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=False)
+
+
+def write_ndjson(records: Iterable[Union[Resource, Dict[str, Any]]], output: Union[str, Any],
+                 compression: Optional[str] = None) -> int:
+    """
+    Write records as newline-delimited JSON, one line per record, as they are
+    consumed from the iterable - nothing beyond the current record is held.
+
+    Args:
+        records: Resource objects or dicts (e.g. a discovery result or database cursor stream)
+        output: Path or binary file object (e.g. an S3StreamingUpload)
+        compression: None, 'gzip' or 'zstd'
+
+    Returns:
+        Number of records written
+    """
+    count = 0
+    with open_output(output, compression) as stream:
+        for record in records:
+            if isinstance(record, Resource):
+                record = record.to_dict()
+            stream.write(encode_record(record))
+            count += 1
+    logger.info(f"NDJSON export complete ({count} records, compression={compression or 'none'})")
+    return count
@@ -0,0 +1,143 @@
+import logging
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from openpyxl import Workbook
+
+from resource_discovery import codec
+from resource_discovery.models import RawJson
+
+logger = logging.getLogger(__name__)
+
+# Excel's hard limit per worksheet (including the header row)
+EXCEL_MAX_ROWS = 1048576
+
+
+def cell_value(value: Any) -> Any:
+    """Convert a resource field to something openpyxl can write."""
+    if isinstance(value, RawJson):
+        return value.raw
+    if isinstance(value, (dict, list, tuple)):
+        return codec.dumps(value)
+    if isinstance(value, datetime):
+        # Excel has no timezone support - store UTC wall-clock time
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+class StreamingWorkbook:
+    """
+    Excel workbook writer with constant memory use.
+
+    Wraps an openpyxl write-only workbook: rows are appended to per-sheet
+    temporary files instead of being held as cell objects, so workbook size is
+    bounded by disk rather than RAM. Sheets may be appended to in any order;
+    tabs are in creation order unless a sheet is created before an existing
+    one. Sheets that exceed Excel's row limit continue on "<title> (2)",
+    "<title> (3)", ... right after the previous part.
+    """
+
+    def __init__(self):
+        self._workbook = Workbook(write_only=True)
+        self._sheets: Dict[str, Any] = {}
+        self._headers: Dict[str, Sequence[str]] = {}
+        self._row_counts: Dict[str, int] = {}
+        self._parts: Dict[str, int] = {}
+
+    def add_sheet(self, title: str, header: Sequence[str], before: Optional[str] = None) -> None:
+        """
+        Create a sheet (Excel limits titles to 31 characters) and write its header.
+        
+        The tab is added last, or in front of the existing sheet titled `before`.
+        """
+        title = title[:31]
+        index = self._workbook.index(self._workbook[before[:31]]) if before is not None else None
+        sheet = self._workbook.create_sheet(title=title, index=index)
+        sheet.append(list(header))
+        self._sheets[title] = sheet
+        self._headers[title] = header
+        self._row_counts[title] = 1
+        self._parts.setdefault(title, 1)
+
+    def has_sheet(self, title: str) -> bool:
+        return title[:31] in self._sheets
+
+    def append(self, title: str, row: Sequence[Any]) -> None:
+        """Append one data row to a sheet created with add_sheet()."""
+        title = title[:31]
+        if self._row_counts[title] >= EXCEL_MAX_ROWS:
+            self._roll_over(title)
+        self._sheets[title].append([cell_value(v) for v in row])
+        self._row_counts[title] += 1
+
+    def write_sheet(self, title: str, header: Sequence[str], rows: Iterable[Sequence[Any]]) -> int:
+        """Create a sheet and stream all rows from an iterator into it. Returns the data row count."""
+        self.add_sheet(title, header)
+        count = 0
+        for row in rows:
+            self.append(title, row)
+            count += 1
+        return count
+
+    def save(self, output) -> None:
+        """Write the workbook to a path or binary file object."""
+        self._workbook.save(output)
+
+    def _roll_over(self, title: str) -> None:
+        """Continue a full sheet on a new "<title> (n)" sheet, still addressed by the original title."""
+        self._parts[title] += 1
+        suffix = f" ({self._parts[title]})"
+        index = self._workbook.index(self._sheets[title]) + 1
+        sheet = self._workbook.create_sheet(title=title[:31 - len(suffix)] + suffix, index=index)
+        sheet.append(list(self._headers[title]))
+        self._sheets[title] = sheet
+        self._row_counts[title] = 1
+        logger.info(f"Sheet {title} reached Excel's row limit, continuing on {sheet.title}")
+
+
+class ResourceAggregator:
+    """
+    Running per-dimension counts over a stream of resource dicts, so summary
+    sheets can be produced without keeping the resources themselves.
+    Memory is proportional to the number of distinct accounts/types/regions.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.by_type: Dict[str, int] = {}
+        self.by_region: Dict[str, int] = {}
+        self.by_account: Dict[str, int] = {}
+        self.by_account_type: Dict[tuple, int] = {}
+        self._account_regions: Dict[str, set] = {}
+
+    def add(self, resource: Dict[str, Any]) -> None:
+        self.total += 1
+        account_id = resource.get('account_id')
+        resource_type = resource.get('resource_type')
+        region = resource.get('region')
+        self.by_type[resource_type] = self.by_type.get(resource_type, 0) + 1
+        self.by_region[region] = self.by_region.get(region, 0) + 1
+        self.by_account[account_id] = self.by_account.get(account_id, 0) + 1
+        key = (account_id, resource_type)
+        self.by_account_type[key] = self.by_account_type.get(key, 0) + 1
+        self._account_regions.setdefault(account_id, set()).add(region)
+
+    def account_rows(self) -> List[list]:
+        """[account_id, total_resources, unique_types, regions] per account, in account order."""
+        types_per_account: Dict[str, int] = {}
+        for account_id, _ in self.by_account_type:
+            types_per_account[account_id] = types_per_account.get(account_id, 0) + 1
+        return [
+            [account_id, count, types_per_account[account_id], len(self._account_regions[account_id])]
+            for account_id, count in sorted(self.by_account.items(), key=lambda item: str(item[0]))
+        ]
+
+    @staticmethod
+    def ranked(counts: Dict[Any, int]) -> List[list]:
+        """[key, count] rows sorted by count descending."""
+        return [[key, count] for key, count in sorted(counts.items(), key=lambda item: item[1], reverse=True)]
@@ -7,10 +7,11 @@ __version__ = "0.1.0"
 __author__ = "CloudAuditor Team"
 
 from .discovery_engine import ResourceDiscoveryEngine
-from .models import Resource, DiscoveryConfig
+from .models import Resource, ResourceBatch, DiscoveryConfig
 
 __all__ = [
     'ResourceDiscoveryEngine',
     'Resource',
+    'ResourceBatch',
     'DiscoveryConfig',
 ]
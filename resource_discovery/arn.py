@@ -0,0 +1,87 @@
+"""
+ARN parsing shared by the discovery clients and the database layer
+"""
+from typing import NamedTuple, Optional
+
+# Region used for resources whose ARN has an empty region field (IAM, S3, CloudFront, ...)
+GLOBAL_REGION = 'global'
+
+
+class ParsedArn(NamedTuple):
+    """
+    Components of an ARN (an immutable tuple without per-instance __dict__):
+    arn:<partition>:<service>:<region>:<account>:<resource>
+
+    region is GLOBAL_REGION when the ARN has none. account is '' when the ARN
+    has none (e.g. S3 buckets). The resource part is split into resource_type
+    and resource_id on the first '/' or ':' ('instance/i-123' ->
+    'instance', 'i-123'); S3 resources are typed 'bucket' or 'object'. Other
+    resources without a type keep the whole resource as resource_id.
+    """
+    partition: str
+    service: str
+    region: str
+    account: str
+    resource_type: str
+    resource_id: str
+
+    @property
+    def is_global(self) -> bool:
+        return self.region == GLOBAL_REGION
+
+
+_new = tuple.__new__
+
+
+def parse_arn(arn: Optional[str]) -> Optional[ParsedArn]:
+    """Parse an ARN; None if the value isn't one."""
+    if not arn:
+        return None
+    parts = arn.split(':', 5)
+    if len(parts) != 6:
+        return None
+    head, partition, service, region, account, resource = parts
+    if head != 'arn' or not partition or not service:
+        return None
+    # tuple.__new__ directly skips the keyword-capable NamedTuple constructor (the hot path)
+    if service == 's3' and not account:
+        return _new(ParsedArn, (partition, service, region or GLOBAL_REGION, account,
+                                'object' if '/' in resource else 'bucket', resource))
+    resource_type, slash, resource_id = resource.partition('/')
+    colon = resource_type.find(':')
+    if colon >= 0:
+        resource_type, resource_id = resource[:colon], resource[colon + 1:]
+    elif not slash:
+        resource_type, resource_id = '', resource
+    return _new(ParsedArn, (partition, service, region or GLOBAL_REGION, account, resource_type, resource_id))
+
+
+def normalize_arn(arn: str) -> str:
+    """
+    Key under which different sources' ARNs for the same resource compare
+    equal: surrounding whitespace and trailing '/' dropped, partition, service
+    and region lowercased. The account and resource parts are case-sensitive
+    and kept as they are.
+    """
+    arn = arn.strip().rstrip('/')
+    parts = arn.split(':', 4)
+    if len(parts) != 5 or parts[0].lower() != 'arn':
+        return arn
+    prefix = arn[:len(arn) - len(parts[4])]
+    lowered = prefix.lower()
+    return arn if lowered == prefix else lowered + parts[4]
+
+
+def partition_for_region(region: Optional[str]) -> str:
+    """Partition that a region belongs to, for building ARNs"""
+    if region:
+        if region.startswith('cn-'):
+            return 'aws-cn'
+        if region.startswith('us-gov-'):
+            return 'aws-us-gov'
+        if region.startswith('us-isob-'):
+            return 'aws-iso-b'
+        if region.startswith('us-iso-'):
+            return 'aws-iso'
+    return 'aws'
+
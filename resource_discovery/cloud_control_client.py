@@ -3,12 +3,12 @@ AWS Cloud Control API client wrapper
 """
 import logging
 from typing import List, Dict, Optional, Iterator
-import json
 
 import boto3
 from botocore.exceptions import ClientError
 
-from .models import Resource, DiscoverySource
+from .arn import parse_arn, partition_for_region
+from .models import Resource, DiscoverySource, RawJson
 
 logger = logging.getLogger(__name__)
 
@@ -152,11 +152,12 @@ class CloudControlClient:
         """
         identifier = resource_desc.get('Identifier', '')
         
-        # Parse properties (JSON string)
-        properties_str = resource_desc.get('Properties', '{}')
+        # Properties arrive as a JSON string; keep that text as the configuration so it is
+        # written out without re-encoding, decoding it here only for the fields needed below
+        properties = RawJson(resource_desc.get('Properties') or '{}')
         try:
-            properties = json.loads(properties_str)
-        except json.JSONDecodeError:
+            properties.decoded()
+        except ValueError:
             logger.error(f"Failed to parse properties for {identifier}")
             properties = {}
         
@@ -181,18 +182,17 @@ class CloudControlClient:
             if len(parts) >= 3:
                 service = parts[1].lower()
                 resource_type_short = parts[2].lower()
-                arn = f"arn:aws:{service}:{self.region}:unknown:{resource_type_short}/{identifier}"
+                arn = (f"arn:{partition_for_region(self.region)}:{service}:{self.region}:unknown:"
+                       f"{resource_type_short}/{identifier}")
         
         # Extract region and account from ARN
         region = self.region
         account_id = 'unknown'
         
-        if arn:
-            arn_parts = arn.split(':')
-            if len(arn_parts) > 4:
-                # Global resources have empty region field
-                region = arn_parts[3] if arn_parts[3] else 'global'
-                account_id = arn_parts[4]
+        parsed = parse_arn(arn)
+        if parsed:
+            region = parsed.region
+            account_id = parsed.account
         
         # Get resource name
         resource_name = (
@@ -203,6 +203,8 @@ class CloudControlClient:
             properties.get('ClusterName') or
             identifier
         )
+        if isinstance(properties, RawJson):
+            properties.release()
         
         return Resource(
             arn=arn,
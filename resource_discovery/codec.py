@@ -0,0 +1,218 @@
+"""
+JSON encoding and decoding shared by discovery, the database layer, reports and Lambda responses
+
+Uses orjson when installed, then msgspec, then the json module. Every backend
+writes the same JSON for the types found in this codebase:
+  - datetime/date: ISO 8601, with UTC written as 'Z' (naive values have no offset)
+  - Decimal: a number (integral values as integers)
+  - Enum (e.g. DiscoverySource): its value
+  - RawJson: its text embedded as-is where the backend supports it, otherwise decoded
+  - anything else: str(), as json.dumps(default=str) did
+Integers beyond 64 bits, which orjson can't encode, go through the json module.
+"""
+import json
+from collections.abc import Mapping
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without the optional dependency
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - exercised only without the optional dependency
+    msgspec = None
+
+
+class RawJson(Mapping):
+    """
+    Read-only mapping over a JSON object kept as the text it arrived in
+
+    The text is decoded on first access to a key and the result cached until
+    release(). Encoders write `raw` as-is (see json_field_text() in models),
+    so a payload that is only passed through to the database or an export is
+    never decoded and re-encoded.
+    """
+    __slots__ = ('raw', '_decoded')
+
+    def __init__(self, raw: Union[str, bytes]):
+        self.raw = raw.decode('utf-8') if isinstance(raw, (bytes, bytearray)) else raw
+        self._decoded: Optional[Dict[str, Any]] = None
+
+    def decoded(self) -> Dict[str, Any]:
+        """The decoded object (ValueError if the text isn't a JSON object)"""
+        if self._decoded is None:
+            value = loads(self.raw)
+            if not isinstance(value, dict):
+                raise ValueError(f"Expected a JSON object, got {type(value).__name__}")
+            self._decoded = value
+        return self._decoded
+
+    def release(self) -> None:
+        """Drop the decoded copy; the next access decodes again"""
+        self._decoded = None
+
+    def __getitem__(self, key):
+        return self.decoded()[key]
+
+    def __iter__(self):
+        return iter(self.decoded())
+
+    def __len__(self) -> int:
+        return len(self.decoded())
+
+    def __repr__(self) -> str:
+        return f"RawJson({self.raw!r})"
+
+
+def default(value: Any) -> Any:
+    """Encoder hook for values JSON has no type for (also usable as json.dumps(default=...))"""
+    if isinstance(value, RawJson):
+        return value.decoded()
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        if value.is_finite() and value == value.to_integral_value():
+            return int(value)
+        return float(value)
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+# --- json module (always available) -----------------------------------------
+
+def _json_encode(value: Any, indent: bool, newline: bool) -> bytes:
+    if indent:
+        text = json.dumps(value, default=default, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(value, default=default, ensure_ascii=False, separators=(',', ':'))
+    return (text + '\n' if newline else text).encode('utf-8')
+
+
+# --- orjson ------------------------------------------------------------------
+
+def _orjson_default(value: Any) -> Any:
+    # Fragment (orjson 3.9+) embeds pre-encoded JSON without decoding it
+    if isinstance(value, RawJson) and hasattr(orjson, 'Fragment'):
+        return orjson.Fragment(value.raw)
+    return default(value)
+
+
+if orjson is not None:
+    # Dataclasses go through default() like they do with the json module
+    _ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS
+    _ORJSON_INDENT = {False: 0, True: orjson.OPT_INDENT_2}
+    _ORJSON_NEWLINE = {False: 0, True: orjson.OPT_APPEND_NEWLINE}
+
+
+def _orjson_encode(value: Any, indent: bool, newline: bool) -> bytes:
+    try:
+        return orjson.dumps(value, default=_orjson_default,
+                            option=_ORJSON_OPTIONS | _ORJSON_INDENT[indent] | _ORJSON_NEWLINE[newline])
+    except TypeError:
+        return _json_encode(value, indent, newline)
+
+
+# --- msgspec -----------------------------------------------------------------
+
+def _msgspec_default(value: Any) -> Any:
+    if isinstance(value, RawJson):
+        return msgspec.Raw(value.raw)
+    return default(value)
+
+
+if msgspec is not None:
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=_msgspec_default, decimal_format='number')
+    _msgspec_decoder = msgspec.json.Decoder()
+
+
+def _msgspec_encode(value: Any, indent: bool, newline: bool) -> bytes:
+    try:
+        data = _msgspec_encoder.encode(value)
+    except (msgspec.EncodeError, TypeError, OverflowError):
+        return _json_encode(value, indent, newline)
+    if indent:
+        data = msgspec.json.format(data, indent=2)
+    return data + b'\n' if newline else data
+
+
+def _msgspec_loads(data: Union[str, bytes]) -> Any:
+    try:
+        return _msgspec_decoder.decode(data)
+    except msgspec.DecodeError as e:
+        raise ValueError(str(e)) from e
+
+
+# --- backend selection -------------------------------------------------------
+
+_BACKENDS = {'json': (_json_encode, json.loads)}
+if orjson is not None:
+    _BACKENDS['orjson'] = (_orjson_encode, orjson.loads)
+if msgspec is not None:
+    _BACKENDS['msgspec'] = (_msgspec_encode, _msgspec_loads)
+
+# Installed backends, fastest first
+BACKENDS = tuple(name for name in ('orjson', 'msgspec', 'json') if name in _BACKENDS)
+
+_backend = BACKENDS[0]
+_encode, _loads = _BACKENDS[_backend]
+
+
+def backend() -> str:
+    """Name of the backend in use"""
+    return _backend
+
+
+def use_backend(name: Optional[str] = None) -> str:
+    """
+    Switch to another installed backend (None for the fastest installed one).
+
+    Returns:
+        Name of the backend used until now, to switch back to
+
+    Raises:
+        ValueError: If the backend isn't installed
+    """
+    global _backend, _encode, _loads
+    name = name or BACKENDS[0]
+    if name not in _BACKENDS:
+        raise ValueError(f"JSON backend {name!r} is not installed (available: {', '.join(BACKENDS)})")
+    previous = _backend
+    _backend = name
+    _encode, _loads = _BACKENDS[name]
+    return previous
+
+
+def dumpb(value: Any, indent: bool = False, newline: bool = False) -> bytes:
+    """
+    Encode as UTF-8 JSON bytes.
+
+    Args:
+        value: Value to encode
+        indent: Indent nested values by two spaces instead of writing compact JSON
+        newline: Append '\\n' (one NDJSON line)
+    """
+    return _encode(value, indent, newline)
+
+
+def dumps(value: Any, indent: bool = False) -> str:
+    """Encode as JSON text (see dumpb())"""
+    return _encode(value, indent, False).decode('utf-8')
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    Decode JSON text or UTF-8 bytes.
+
+    Raises:
+        ValueError: If the data isn't valid JSON
+    """
+    return _loads(data)
@@ -2,16 +2,27 @@
 AWS Config client wrapper
 """
 import logging
-from typing import List, Dict, Optional
+import re
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime
 
 import boto3
 from botocore.exceptions import ClientError
 
+from . import codec
+from .arn import parse_arn, partition_for_region
 from .models import Resource, DiscoverySource
 
 logger = logging.getLogger(__name__)
 
+# Configuration item properties select_resources() fetches (everything convert_to_resource() reads)
+SELECT_PROPERTIES = ('arn', 'resourceType', 'resourceId', 'resourceName', 'awsRegion', 'accountId',
+                     'resourceCreationTime', 'configurationItemCaptureTime', 'configuration',
+                     'relationships', 'tags')
+
+# Resource types are interpolated into the advanced query, so only CloudFormation-style names are accepted
+_RESOURCE_TYPE = re.compile(r'^[A-Za-z0-9]+(::[A-Za-z0-9]+)+$')
+
 
 class ConfigClient:
     """Wrapper for AWS Config API"""
@@ -98,6 +109,24 @@ class ConfigClient:
                 logger.error(f"Error listing resources for {resource_type}: {e}")
             return []
     
+    def select_resources(self, resource_type: str) -> Iterator[Dict]:
+        """
+        Current configuration items of a type via an advanced query: ARN,
+        configuration, relationships and tags for every resource in one
+        paginated call, instead of a history lookup per resource.
+        
+        Raises:
+            ValueError: If resource_type isn't a CloudFormation type name
+            ClientError: If the query fails (e.g. no config:SelectResourceConfig permission)
+        """
+        if not _RESOURCE_TYPE.match(resource_type):
+            raise ValueError(f"Invalid resource type: {resource_type!r}")
+        expression = f"SELECT {', '.join(SELECT_PROPERTIES)} WHERE resourceType = '{resource_type}'"
+        paginator = self.client.get_paginator('select_resource_config')
+        for page in paginator.paginate(Expression=expression):
+            for result in page.get('Results', []):
+                yield codec.loads(result)
+    
     def get_resource_config(
         self,
         resource_type: str,
@@ -213,7 +242,10 @@ class ConfigClient:
         if config_item:
             arn = config_item.get('arn') or config_item.get('ARN')
             configuration = config_item.get('configuration', {})
-            tags_dict = config_item.get('tags', {})
+            tags_dict = config_item.get('tags') or {}
+            if isinstance(tags_dict, list):
+                # Advanced queries return tags as [{"key": ..., "value": ...}]
+                tags_dict = {tag.get('key'): tag.get('value') for tag in tags_dict}
             relationships = [
                 rel.get('resourceId', '') 
                 for rel in config_item.get('relationships', [])
@@ -230,16 +262,18 @@ class ConfigClient:
         # Parse region and account from resource type or ARN
         region = self.region
         account_id = 'unknown'
+        if config_item:
+            region = config_item.get('awsRegion') or region
+            account_id = config_item.get('accountId') or account_id
         
-        if arn:
-            arn_parts = arn.split(':')
-            if len(arn_parts) > 4:
-                # Global resources have empty region field
-                region = arn_parts[3] if arn_parts[3] else 'global'
-                account_id = arn_parts[4]
+        parsed = parse_arn(arn)
+        if parsed:
+            region = parsed.region
+            # S3 ARNs carry no account
+            account_id = parsed.account or account_id
         
         return Resource(
-            arn=arn or f"arn:aws:{resource_type}:{region}:{account_id}:{resource_id}",
+            arn=arn or f"arn:{partition_for_region(region)}:{resource_type}:{region}:{account_id}:{resource_id}",
             resource_type=resource_type,
             region=region,
             account_id=account_id,
@@ -4,19 +4,41 @@ Orchestrates discovery using Resource Explorer, Config, and Cloud Control API
 """
 import logging
 import time
-from typing import List, Optional, Dict
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import boto3
 from botocore.exceptions import ClientError
 
-from .models import Resource, DiscoveryConfig, DiscoveryResult, DiscoverySource
+from .models import Resource, ResourceBatch, DiscoveryConfig, DiscoveryResult, DiscoverySource
+from .error_ledger import ACCOUNT_OPERATION, ErrorLedger, error_code
+from .filters import FilterPlan
+from .merge import ResourceMergeStore
 from .resource_explorer_client import ResourceExplorerClient
 from .config_client import ConfigClient
 from .cloud_control_client import CloudControlClient
 
 logger = logging.getLogger(__name__)
 
+# Without DiscoveryConfig.config_enrichment, Config only runs when Resource Explorer found fewer resources
+CONFIG_FALLBACK_THRESHOLD = 10
+
+
+def _merge_source(store: ResourceMergeStore, resources: Iterable[Resource], account_id: str) -> Tuple[int, int]:
+    """
+    Add a source's resources to the store as they arrive; returns (found, new).
+    Resources whose account isn't known (S3 ARNs carry none) get the account being discovered.
+    """
+    found = new = 0
+    add = store.add
+    for resource in resources:
+        if not resource.account_id or resource.account_id == 'unknown':
+            resource.account_id = account_id
+        found += 1
+        new += add(resource)
+    return found, new
+
 
 class ResourceDiscoveryEngine:
     """
@@ -112,6 +134,16 @@ class ResourceDiscoveryEngine:
                 'eu-west-1', 'eu-central-1', 'ap-southeast-1', 'ap-northeast-1'
             ]
     
+    def _memory_budget(self) -> Optional[int]:
+        """DiscoveryConfig.memory_budget_mb in bytes"""
+        if self.config.memory_budget_mb is None:
+            return None
+        return self.config.memory_budget_mb * 1024 * 1024
+    
+    def _filter_plan(self) -> FilterPlan:
+        """Filters for each source, from the current configuration"""
+        return FilterPlan(self.config)
+    
     def _get_assumed_role_session(
         self, 
         account_id: str, 
@@ -154,7 +186,8 @@ class ResourceDiscoveryEngine:
         Returns:
             Aggregate DiscoveryResult
         """
-        total_result = DiscoveryResult(resources=[], total_count=0, success=True)
+        total_result = DiscoveryResult(resources=ResourceBatch() if self.config.columnar else [],
+                                       total_count=0, success=True, memory_budget=self._memory_budget())
         start_time = time.time()
         
         for account_id in accounts:
@@ -172,15 +205,14 @@ class ResourceDiscoveryEngine:
                     engine = ResourceDiscoveryEngine(session=target_session, config=self.config)
                 
                 result = engine.discover_all_resources(account_id=account_id)
-                total_result.resources.extend(result.resources)
-                total_result.errors.extend(result.errors)
+                total_result.add_result(result)
                 
             except Exception as e:
                 error_msg = f"Failed to discover account {account_id}: {str(e)}"
                 logger.error(error_msg)
-                total_result.add_error(error_msg)
+                total_result.add_error(error_msg, e, account_id=account_id, operation=ACCOUNT_OPERATION)
         
-        total_result.total_count = len(total_result.resources)
+        total_result.total_count = total_result.resource_count
         total_result.duration_seconds = time.time() - start_time
         total_result.success = len(total_result.errors) == 0
         
@@ -213,86 +245,91 @@ class ResourceDiscoveryEngine:
                 logger.info(f"Auto-detected account ID: {account_id}")
             except Exception as e:
                 logger.error(f"Failed to detect account ID: {e}")
-                return DiscoveryResult(
-                    resources=[],
-                    total_count=0,
-                    success=False,
-                    errors=[f"Failed to detect account ID: {str(e)}"]
-                )
+                result = DiscoveryResult(resources=[], total_count=0, success=False)
+                result.add_error(f"Failed to detect account ID: {str(e)}", e, source='sts',
+                                 operation='get_caller_identity')
+                return result
         
         result = DiscoveryResult(
             resources=[],
             total_count=0,
-            success=True
+            success=True,
+            memory_budget=self._memory_budget()
         )
+        # Every source's results are merged per ARN as they arrive, the store
+        # spilling to disk past the memory budget
+        store = ResourceMergeStore(self.config.field_precedence, memory_budget=self._memory_budget())
         
         # Try Resource Explorer first (fastest and most comprehensive)
         if self.resource_explorer:
             logger.info("Attempting discovery via Resource Explorer...")
             try:
-                resources = self._discover_via_resource_explorer(account_id)
-                result.resources.extend(resources)
-                logger.info(f"Resource Explorer found {len(resources)} resources")
+                found, _ = _merge_source(
+                    store, self._discover_via_resource_explorer(account_id, result.error_ledger), account_id
+                )
+                logger.info(f"Resource Explorer found {found} resources")
             except Exception as e:
                 error_msg = f"Resource Explorer discovery failed: {str(e)}"
                 logger.error(error_msg)
-                result.add_error(error_msg)
+                result.add_error(error_msg, e, account_id=account_id, source=DiscoverySource.RESOURCE_EXPLORER,
+                                 operation='discover')
         
-        # Fall back to Config if Resource Explorer didn't work or found nothing
-        if self.config_client and (not result.resources or len(result.resources) < 10):
+        # Fall back to Config if Resource Explorer didn't work or found little; with
+        # config_enrichment it always runs, enriching what Resource Explorer found
+        # (relationships, configuration, creation time - see merge.DEFAULT_FIELD_PRECEDENCE)
+        if self.config_client and (self.config.config_enrichment or len(store) < CONFIG_FALLBACK_THRESHOLD):
             logger.info("Attempting discovery via AWS Config...")
             try:
-                resources = self._discover_via_config(account_id)
-                # Merge with existing resources (avoid duplicates by ARN)
-                existing_arns = {r.arn for r in result.resources}
-                new_resources = [r for r in resources if r.arn not in existing_arns]
-                result.resources.extend(new_resources)
-                logger.info(f"Config found {len(resources)} resources ({len(new_resources)} new)")
+                found, new_count = _merge_source(
+                    store, self._discover_via_config(account_id, result.error_ledger), account_id
+                )
+                logger.info(f"Config found {found} resources ({new_count} new, {found - new_count} merged)")
             except Exception as e:
                 error_msg = f"Config discovery failed: {str(e)}"
                 logger.error(error_msg)
-                result.add_error(error_msg)
+                result.add_error(error_msg, e, account_id=account_id, source=DiscoverySource.CONFIG,
+                                 operation='discover')
         
-        # Use Cloud Control API as last resort for specific types
+        # Cloud Control, where enabled, adds the full resource model of the types it supports
         if self.cloud_control and self.config.use_cloud_control:
             logger.info("Attempting discovery via Cloud Control API...")
             try:
-                resources = self._discover_via_cloud_control(account_id)
-                # Merge with existing resources
-                existing_arns = {r.arn for r in result.resources}
-                new_resources = [r for r in resources if r.arn not in existing_arns]
-                result.resources.extend(new_resources)
-                logger.info(f"Cloud Control found {len(resources)} resources ({len(new_resources)} new)")
+                found, new_count = _merge_source(
+                    store, self._discover_via_cloud_control(account_id, result.error_ledger), account_id
+                )
+                logger.info(f"Cloud Control found {found} resources ({new_count} new, {found - new_count} merged)")
             except Exception as e:
                 error_msg = f"Cloud Control discovery failed: {str(e)}"
                 logger.error(error_msg)
-                result.add_error(error_msg)
+                result.add_error(error_msg, e, account_id=account_id, source=DiscoverySource.CLOUD_CONTROL,
+                                 operation='discover')
         
         # Always attempt custom Bedrock detection to enrich resources
         try:
             logger.info("Attempting custom Bedrock discovery...")
-            bedrock_resources = self._discover_bedrock_resources(account_id)
-            existing_arns = {r.arn for r in result.resources}
-            new_bedrock_resources = [r for r in bedrock_resources if r.arn not in existing_arns]
-            result.resources.extend(new_bedrock_resources)
-            logger.info(f"Custom Bedrock discovery found {len(bedrock_resources)} resources ({len(new_bedrock_resources)} new)")
+            bedrock_resources = self._discover_bedrock_resources(account_id, result.error_ledger)
+            _, new_count = _merge_source(store, bedrock_resources, account_id)
+            logger.info(f"Custom Bedrock discovery found {len(bedrock_resources)} resources ({new_count} new)")
         except Exception as e:
             logger.error(f"Failed to run custom Bedrock discovery: {e}")
-            result.add_error(f"Custom Bedrock discovery failed: {str(e)}")
-
-        # Filter by resource types if configured
-        if self.config.include_types or self.config.exclude_types:
-            original_count = len(result.resources)
-            result.resources = [
-                r for r in result.resources
-                if self.config.should_include_type(r.resource_type)
-            ]
-            filtered_count = original_count - len(result.resources)
-            if filtered_count > 0:
-                logger.info(f"Filtered out {filtered_count} resources based on type filters")
-        
-        result.total_count = len(result.resources)
+            result.add_error(f"Custom Bedrock discovery failed: {str(e)}", e, account_id=account_id,
+                             source='bedrock', operation='discover')
+        
+        # Move the merged resources into the result (spilling to disk past the memory budget),
+        # filtered by resource types if configured
+        resources = store.drain()
+        plan = self._filter_plan()
+        if plan.filters_types:
+            resources = (r for r in resources if plan.includes(r.resource_type))
+        result.add_resources(resources)
+        filtered_count = store.drained - result.resource_count
+        if filtered_count > 0:
+            logger.info(f"Filtered out {filtered_count} resources based on type filters")
+        
+        result.total_count = result.resource_count
         result.duration_seconds = time.time() - start_time
+        if self.config.columnar:
+            result.to_batch()
         
         logger.info(f"Discovery complete: {result.total_count} resources in "
                    f"{result.duration_seconds:.2f} seconds")
@@ -300,47 +337,54 @@ class ResourceDiscoveryEngine:
         return result
     
     
-    def _discover_via_resource_explorer(self, account_id: str) -> List[Resource]:
+    def _discover_via_resource_explorer(self, account_id: str,
+                                        errors: Optional[ErrorLedger] = None) -> Iterator[Resource]:
         """
         Discover resources using Resource Explorer.
         Automatically handles multi-region discovery if LOCAL index detected.
         
         Args:
             account_id: AWS account ID
+            errors: Ledger counting regions that fail (LOCAL indexes)
             
-        Returns:
-            List of discovered resources
+        Yields:
+            Discovered resources, page by page as the searches return them
         """
         if not self.resource_explorer:
-            return []
+            return
+        if errors is None:
+            errors = ErrorLedger()
+        
+        plan = self._filter_plan()
+        if plan.selects_nothing:
+            return
+        # Type and region filters go into the search queries
+        queries = plan.resource_explorer_queries()
         
         # If aggregator index, query once and get all regions
         if self.is_aggregator:
             logger.info("Using AGGREGATOR index for global discovery")
-            resources = []
-            
-            # Build filters
-            filters = {}
-            if self.config.include_types:
-                filters['resource_types'] = self.config.include_types
             
             # Query Resource Explorer
-            for raw_resource in self.resource_explorer.list_all_resources(filters=filters):
+            for raw_resource in chain.from_iterable(
+                self.resource_explorer.list_all_resources(filters=filters) for filters in queries
+            ):
                 try:
                     resource = self.resource_explorer.convert_to_resource(raw_resource)
-                    if resource.account_id == account_id or resource.account_id == 'unknown':
-                        resources.append(resource)
                 except Exception as e:
                     logger.warning(f"Failed to convert resource: {e}")
                     continue
+                if resource.account_id in (account_id, 'unknown', ''):
+                    yield resource
             
-            return resources
+            return
         
         # If LOCAL index, query each region individually
         logger.info(f"Using LOCAL index - querying {len(self.enabled_regions)} regions individually")
-        all_resources = []
+        total = 0
         
         for region in self.enabled_regions:
+            found = 0
             try:
                 logger.info(f"Discovering resources in {region}...")
                 # Create region-specific Resource Explorer client
@@ -351,43 +395,38 @@ class ResourceDiscoveryEngine:
                     logger.debug(f"No Resource Explorer index in {region}, skipping")
                     continue
                 
-                # Build filters
-                filters = {}
-                if self.config.include_types:
-                    filters['resource_types'] = self.config.include_types
-                
                 # Query Resource Explorer for this region
-                for raw_resource in regional_client.list_all_resources(filters=filters):
+                for raw_resource in chain.from_iterable(
+                    regional_client.list_all_resources(filters=filters) for filters in queries
+                ):
                     try:
                         resource = regional_client.convert_to_resource(raw_resource)
-                        if resource.account_id == account_id or resource.account_id == 'unknown':
-                            all_resources.append(resource)
                     except Exception as e:
                         logger.warning(f"Failed to convert resource in {region}: {e}")
                         continue
+                    if resource.account_id in (account_id, 'unknown', ''):
+                        found += 1
+                        yield resource
                 
-                logger.info(f"Found {len(all_resources) - len([r for r in all_resources if r.region != region])} resources in {region}")
+                logger.info(f"Found {found} resources in {region}")
                 
             except Exception as e:
                 logger.warning(f"Failed to discover resources in {region}: {e}")
+                errors.record(e, account_id=account_id, region=region,
+                              source=DiscoverySource.RESOURCE_EXPLORER, operation='search')
                 continue
+            finally:
+                total += found
         
-        logger.info(f"Multi-region discovery complete: {len(all_resources)} total resources")
-        return all_resources
+        logger.info(f"Multi-region discovery complete: {total} total resources")
     
-    def _discover_via_config(self, account_id: str) -> List[Resource]:
-        """Discover resources using AWS Config"""
-        resources = []
+    def _discover_via_config(self, account_id: str, errors: Optional[ErrorLedger] = None) -> Iterator[Resource]:
+        """Discover resources using AWS Config, yielding each type as it completes (failures are counted in `errors`)"""
+        if errors is None:
+            errors = ErrorLedger()
         
-        # Get supported resource types
-        resource_types = self.config_client.list_supported_resource_types()
-        
-        # Filter by configured types
-        if self.config.include_types:
-            resource_types = [
-                rt for rt in resource_types
-                if rt in self.config.include_types
-            ]
+        # Included types, or the recorded types minus exclusions
+        resource_types = self._filter_plan().source_types(self.config_client.list_supported_resource_types)
         
         logger.info(f"Discovering {len(resource_types)} resource types via Config")
         
@@ -406,53 +445,53 @@ class ResourceDiscoveryEngine:
                 resource_type = futures[future]
                 try:
                     type_resources = future.result()
-                    resources.extend(type_resources)
                 except Exception as e:
                     logger.error(f"Failed to discover {resource_type}: {e}")
-        
-        return resources
+                    errors.record(f"{resource_type}: {e}", account_id=account_id, region=self.config_client.region,
+                                  source=DiscoverySource.CONFIG, operation='list_discovered_resources',
+                                  code=error_code(e))
+                    continue
+                # Released as soon as it's merged, rather than held until every type is done
+                del futures[future]
+                yield from type_resources
     
     def _discover_config_resource_type(
         self,
         resource_type: str,
         account_id: str
     ) -> List[Resource]:
-        """Discover resources of a specific type using Config"""
-        resources = []
-        
-        # List resource identifiers
-        identifiers = self.config_client.list_discovered_resources(resource_type)
+        """
+        Discover resources of a specific type using Config.
         
-        # Get detailed config for each (sample only to avoid rate limits)
-        sample_size = min(len(identifiers), 100)  # Limit to 100 per type
+        Current configuration items carry the real ARN, relationships, tags and
+        creation time, so they merge into (and enrich) the Resource Explorer
+        entries for the same resources.
+        """
+        try:
+            return [self.config_client.convert_to_resource(item, item)
+                    for item in self.config_client.select_resources(resource_type)]
+        except (ClientError, ValueError) as e:
+            # Advanced queries need config:SelectResourceConfig; identifiers alone don't merge
+            logger.warning(f"Config advanced query for {resource_type} failed, listing identifiers: {e}")
         
-        for identifier in identifiers[:sample_size]:
+        resources = []
+        for identifier in self.config_client.list_discovered_resources(resource_type):
+            resource_id = identifier.get('resourceId')
             try:
-                resource_id = identifier.get('resourceId')
-                
-                # For POC, we'll use basic info without fetching full config
-                # to avoid rate limits
-                resource = self.config_client.convert_to_resource(identifier)
-                resources.append(resource)
-                
+                resources.append(self.config_client.convert_to_resource(identifier))
             except Exception as e:
                 logger.error(f"Failed to process {resource_type}/{resource_id}: {e}")
         
         return resources
     
-    def _discover_via_cloud_control(self, account_id: str) -> List[Resource]:
-        """Discover resources using Cloud Control API"""
-        resources = []
-        
-        # Get supported resource types
-        resource_types = self.cloud_control.list_supported_resource_types()
+    def _discover_via_cloud_control(self, account_id: str,
+                                    errors: Optional[ErrorLedger] = None) -> Iterator[Resource]:
+        """Discover resources using Cloud Control API, page by page (types that fail are counted in `errors`)"""
+        if errors is None:
+            errors = ErrorLedger()
         
-        # Filter by configured types
-        if self.config.include_types:
-            resource_types = [
-                rt for rt in resource_types
-                if rt in self.config.include_types
-            ]
+        # Included types, or the supported types minus exclusions
+        resource_types = self._filter_plan().source_types(self.cloud_control.list_supported_resource_types)
         
         logger.info(f"Discovering {len(resource_types)} resource types via Cloud Control")
         
@@ -464,13 +503,15 @@ class ResourceDiscoveryEngine:
                             raw_resource,
                             resource_type
                         )
-                        resources.append(resource)
                     except Exception as e:
                         logger.error(f"Failed to convert {resource_type} resource: {e}")
+                        continue
+                    yield resource
             except Exception as e:
                 logger.error(f"Failed to list {resource_type}: {e}")
-        
-        return resources
+                errors.record(f"{resource_type}: {e}", account_id=account_id, region=self.cloud_control.region,
+                              source=DiscoverySource.CLOUD_CONTROL, operation='list_resources',
+                              code=error_code(e))
     
     def get_resource_summary(self, result: DiscoveryResult) -> Dict[str, int]:
         """
@@ -482,21 +523,32 @@ class ResourceDiscoveryEngine:
         Returns:
             Dictionary mapping resource type to count
         """
-        summary = {}
-        for resource in result.resources:
-            resource_type = resource.resource_type
-            summary[resource_type] = summary.get(resource_type, 0) + 1
+        if result.spill_files or isinstance(result.resources, ResourceBatch):
+            summary = {}
+            for batch in result.iter_batches():
+                for resource_type, count in batch.type_counts().items():
+                    summary[resource_type] = summary.get(resource_type, 0) + count
+        else:
+            summary = {}
+            for resource in result.resources:
+                resource_type = resource.resource_type
+                summary[resource_type] = summary.get(resource_type, 0) + 1
         
         return dict(sorted(summary.items(), key=lambda x: x[1], reverse=True))
 
-    def _discover_bedrock_resources(self, account_id: str) -> List[Resource]:
+    def _discover_bedrock_resources(self, account_id: str, errors: Optional[ErrorLedger] = None) -> List[Resource]:
         """Discover Amazon Bedrock resources and custom compliance configurations"""
         resources = []
+        if errors is None:
+            errors = ErrorLedger()
+        plan = self._filter_plan()
         
         session_region = self.session.region_name
         if not isinstance(session_region, str):
             session_region = 'us-east-1'
         regions_to_check = self.config.regions or [session_region]
+        if not plan.includes_any(("AWS::Bedrock::ModelInvocationLogging", "AWS::Bedrock::Guardrail")):
+            regions_to_check = []
         
         for region in regions_to_check:
             try:
@@ -522,6 +574,8 @@ class ResourceDiscoveryEngine:
                     code = e.response['Error']['Code']
                     if code != 'AccessDeniedException':
                         logger.warning(f"Error fetching Bedrock logging configuration in {region}: {e}")
+                        errors.record(e, account_id=account_id, region=region, source='bedrock',
+                                      operation='get_model_invocation_logging_configuration')
                 
                 # 2. Guardrails
                 try:
@@ -556,11 +610,16 @@ class ResourceDiscoveryEngine:
                     code = e.response['Error']['Code']
                     if code != 'AccessDeniedException':
                         logger.warning(f"Error listing Bedrock guardrails in {region}: {e}")
+                        errors.record(e, account_id=account_id, region=region, source='bedrock',
+                                      operation='list_guardrails')
                         
             except Exception as e:
                 logger.warning(f"Could not initialize Bedrock client for region {region}: {e}")
+                errors.record(e, account_id=account_id, region=region, source='bedrock', operation='discover')
 
         # 3. AWS Organizations Governance (BEDROCK_POLICY / SCPs)
+        if not plan.includes("AWS::Bedrock::OrgGovernance"):
+            return resources
         try:
             org_client = self.session.client('organizations')
             roots = org_client.list_roots().get('Roots', [])
@@ -609,8 +668,10 @@ class ResourceDiscoveryEngine:
             code = e.response['Error']['Code']
             if code not in ('AWSOrganizationsNotInUseException', 'AccessDeniedException'):
                 logger.warning(f"Error checking Organizations policies: {e}")
+                errors.record(e, account_id=account_id, source='organizations', operation='list_policies')
         except Exception as e:
             logger.warning(f"Error checking Organizations governance: {e}")
+            errors.record(e, account_id=account_id, source='organizations', operation='list_policies')
 
         return resources
 
@@ -0,0 +1,144 @@
+"""
+Structured record of the errors a discovery run hits
+
+Errors are counted per (account, region, source, operation, error code), so
+an AccessDenied repeated for every resource type or region of an account is
+one entry with a count, a few sample messages and first/last timestamps
+rather than thousands of strings.
+"""
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from botocore.exceptions import ClientError
+
+# Messages kept per key, and the length each is cut to
+ERROR_SAMPLES = 3
+MAX_SAMPLE_LENGTH = 1000
+
+# Distinct keys kept; errors for further keys are counted under OVERFLOW_CODE per account
+MAX_ERROR_KEYS = 1000
+OVERFLOW_CODE = 'TooManyDistinctErrors'
+
+# Operation of errors that stopped a whole account from being discovered
+ACCOUNT_OPERATION = 'discover_account'
+
+
+class ErrorKey(NamedTuple):
+    """What failed: '' where a part doesn't apply (e.g. region for a global call)"""
+    account_id: str
+    region: str
+    source: str
+    operation: str
+    error_code: str
+
+
+@dataclass(slots=True)
+class ErrorEntry:
+    """How often an error happened, when, the first few messages and the latest one"""
+    count: int
+    first_seen: datetime
+    last_seen: datetime
+    samples: List[str] = field(default_factory=list)
+    last_message: str = ''
+
+
+def error_code(error: Union[BaseException, str]) -> str:
+    """AWS error code of a ClientError, otherwise the exception class name ('Error' for a message)"""
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') or type(error).__name__
+    if isinstance(error, BaseException):
+        return type(error).__name__
+    return 'Error'
+
+
+class ErrorLedger:
+    """
+    Error counters and samples keyed by ErrorKey, with bounded memory
+
+    Each key keeps a count and at most `max_samples` messages; at most
+    `max_keys` keys are kept, after which new keys are folded into one
+    OVERFLOW_CODE entry per account. Safe to record into from several threads.
+    """
+
+    def __init__(self, max_samples: int = ERROR_SAMPLES, max_keys: int = MAX_ERROR_KEYS):
+        self.max_samples = max_samples
+        self.max_keys = max_keys
+        self._entries: Dict[ErrorKey, ErrorEntry] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Tuple[ErrorKey, ErrorEntry]]:
+        return iter(list(self._entries.items()))
+
+    @property
+    def total(self) -> int:
+        """Errors recorded, repeats included"""
+        return sum(entry.count for entry in self._entries.values())
+
+    def record(self, error: Union[BaseException, str], account_id: str = '', region: str = '',
+               source: str = '', operation: str = '', code: Optional[str] = None) -> ErrorKey:
+        """
+        Count an error.
+
+        Args:
+            error: The exception, or a message
+            code: Error code (default: error_code(error))
+
+        Returns:
+            The key it was counted under
+        """
+        key = ErrorKey(account_id or '', region or '', str(getattr(source, 'value', source) or ''),
+                       operation or '', code or error_code(error))
+        now = datetime.now(timezone.utc)
+        message = str(error)[:MAX_SAMPLE_LENGTH]
+        with self._lock:
+            return self._add(key, 1, now, now, [message], message)
+
+    def merge(self, other: 'ErrorLedger') -> None:
+        """Add another ledger's entries"""
+        for key, entry in other:
+            with self._lock:
+                self._add(key, entry.count, entry.first_seen, entry.last_seen, entry.samples, entry.last_message)
+
+    def _add(self, key: ErrorKey, count: int, first_seen: datetime, last_seen: datetime,
+             samples: List[str], last_message: str) -> ErrorKey:
+        entry = self._entries.get(key)
+        if entry is None and len(self._entries) >= self.max_keys:
+            key = ErrorKey(key.account_id, '', '', '', OVERFLOW_CODE)
+            entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = ErrorEntry(count, first_seen, last_seen, samples[:self.max_samples], last_message)
+            return key
+        entry.count += count
+        entry.first_seen = min(entry.first_seen, first_seen)
+        if last_seen >= entry.last_seen:
+            entry.last_seen = last_seen
+            entry.last_message = last_message
+        room = self.max_samples - len(entry.samples)
+        if room > 0:
+            entry.samples.extend(samples[:room])
+        return key
+
+    def by_account(self) -> Dict[str, int]:
+        """Error count per account ('' for errors not tied to one)"""
+        counts: Dict[str, int] = {}
+        for key, entry in self:
+            counts[key.account_id] = counts.get(key.account_id, 0) + entry.count
+        return counts
+
+    def failed_accounts(self) -> Dict[str, str]:
+        """Accounts that couldn't be discovered at all, with the last message recorded for each"""
+        return {key.account_id: entry.last_message for key, entry in self
+                if key.operation == ACCOUNT_OPERATION and key.account_id and entry.last_message}
+
+    def summary(self) -> List[Dict[str, object]]:
+        """Entries as JSON-friendly dicts, most frequent first"""
+        return [
+            {**key._asdict(), 'count': entry.count, 'first_seen': entry.first_seen,
+             'last_seen': entry.last_seen, 'samples': list(entry.samples)}
+            for key, entry in sorted(self, key=lambda item: item[1].count, reverse=True)
+        ]
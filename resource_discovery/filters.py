@@ -0,0 +1,112 @@
+"""
+Pushing DiscoveryConfig filters down into each discovery source, so resources
+that would be filtered out afterwards are never fetched
+"""
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .arn import GLOBAL_REGION
+from .models import DiscoveryConfig
+from .resource_types import TypeFilter, resource_explorer_types
+
+
+class FilterPlan:
+    """
+    Per-source filters derived from a DiscoveryConfig
+
+    - Resource Explorer: type or service terms (or exclusions when only those
+      are configured) and region terms in the search queries, in its own type
+      names
+    - Config and Cloud Control, which list one type at a time: only the
+      included types are listed, and the source's supported types are only
+      looked up when the include list has globs or types without a known
+      CloudFormation name
+    - Custom Bedrock discovery: skipped for types that aren't included
+
+    The engine still checks every merged resource with includes(): a source
+    may ignore part of its filter (e.g. a glob Resource Explorer can't
+    express), and resources merged in from another source aren't filtered.
+    """
+
+    def __init__(self, config: DiscoveryConfig):
+        self.config = config
+        self.types: TypeFilter = config.type_filter()
+        self.regions: Optional[List[str]] = list(dict.fromkeys(config.regions)) if config.regions else None
+
+    @property
+    def selects_nothing(self) -> bool:
+        """True if every type is filtered out (an empty include list, or all included types excluded)"""
+        return self.types.selects_nothing
+
+    @property
+    def filters_types(self) -> bool:
+        return self.types.filters
+
+    def includes(self, resource_type: str) -> bool:
+        """Whether resources of a type (in either naming scheme) are kept"""
+        return self.types.includes(resource_type)
+
+    def includes_any(self, resource_types: Iterable[str]) -> bool:
+        return any(self.includes(t) for t in resource_types)
+
+    def resource_explorer_queries(self) -> List[Dict[str, List[str]]]:
+        """
+        Filters for ResourceExplorerClient.list_all_resources(), one per search.
+
+        Resource Explorer ANDs different filter prefixes, so included services
+        ('ec2:*') are searched separately from included types. Types it has no
+        known name for are searched by service; with any other glob the
+        include list isn't pushed down at all.
+        """
+        common: Dict[str, List[str]] = {}
+        if self.regions:
+            # Global resources are indexed under 'global', not a configured region
+            common['regions'] = self.regions + [GLOBAL_REGION] * (GLOBAL_REGION not in self.regions)
+
+        include, exclude = self.types.include, self.types.exclude
+        if include is None:
+            exclusions = {}
+            names = [name for canonical in exclude.exact for name in resource_explorer_types(canonical)]
+            if names:
+                exclusions['exclude_types'] = sorted(names)
+            if exclude.services:
+                exclusions['exclude_services'] = sorted(exclude.services)
+            return [{**exclusions, **common}]
+        if self.selects_nothing:
+            return []
+        if include.has_type_globs:
+            # Not expressible as types or services: search everything and filter afterwards
+            return [common]
+        services = set(include.services)
+        types: List[str] = []
+        for canonical in sorted(include.exact):
+            service = canonical.partition(':')[0]
+            if canonical in exclude or service in services:
+                continue
+            names = resource_explorer_types(canonical)
+            if names:
+                types.extend(names)
+            else:
+                services.add(service)
+        queries = []
+        if types:
+            queries.append({'resource_types': types, **common})
+        if services:
+            queries.append({'services': sorted(services), **common})
+        return queries
+
+    def source_types(self, supported: Callable[[], List[str]]) -> List[str]:
+        """
+        CloudFormation types a per-type source should list.
+
+        Args:
+            supported: Returns the source's supported types; only called when the
+                include list can't be listed as is
+
+        Returns:
+            The included types, or the supported types that are included
+        """
+        include = self.types.include
+        candidates = list(include.cloudformation_types) if include is not None else []
+        if include is None or not include.resolved:
+            candidates += supported()
+        return [t for t in dict.fromkeys(candidates) if self.includes(t)]
@@ -0,0 +1,242 @@
+"""
+Merging of the resources several discovery sources report for the same ARN
+"""
+import gzip
+import os
+import pickle
+import tempfile
+import weakref
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .arn import normalize_arn
+from .models import SPILL_CHECK_ROWS, SPILL_COMPRESSLEVEL, DiscoverySource, Resource, ResourceBatch, _remove_files
+
+# Resource fields filled from whichever source ranks highest for them
+MERGED_FIELDS = ('name', 'tags', 'configuration', 'relationships', 'created_at', 'last_modified')
+
+# Per field, the sources whose value wins, best first. A source's value only
+# replaces another's if it isn't empty; sources not listed rank last.
+DEFAULT_FIELD_PRECEDENCE: Dict[str, Sequence[DiscoverySource]] = {
+    # Resource Explorer indexes tags for every resource it returns
+    'tags': (DiscoverySource.RESOURCE_EXPLORER, DiscoverySource.CONFIG, DiscoverySource.CLOUD_CONTROL),
+    # Cloud Control returns the full resource model, Config a recorded configuration item,
+    # Resource Explorer a handful of indexed properties
+    'configuration': (DiscoverySource.CLOUD_CONTROL, DiscoverySource.CONFIG, DiscoverySource.RESOURCE_EXPLORER),
+    # Only Config records relationships and creation times
+    'relationships': (DiscoverySource.CONFIG, DiscoverySource.CLOUD_CONTROL, DiscoverySource.RESOURCE_EXPLORER),
+    'created_at': (DiscoverySource.CONFIG, DiscoverySource.CLOUD_CONTROL, DiscoverySource.RESOURCE_EXPLORER),
+    'name': (DiscoverySource.CONFIG, DiscoverySource.CLOUD_CONTROL, DiscoverySource.RESOURCE_EXPLORER),
+    'last_modified': (DiscoverySource.CONFIG, DiscoverySource.RESOURCE_EXPLORER, DiscoverySource.CLOUD_CONTROL),
+}
+
+
+# Files the store is hash-partitioned into by ARN when it spills; draining reads one at a time
+SPILL_PARTITIONS = 16
+# New resources encoded as a ResourceBatch to estimate the size of each SPILL_CHECK_ROWS added
+SIZE_SAMPLE = 100
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == '' or (isinstance(value, (dict, list)) and not value)
+
+
+class ResourceMergeStore:
+    """
+    Resources keyed by normalized ARN (see arn.normalize_arn), merged as each
+    source's results are added
+
+    A resource seen again - from another source or repeated by the same one -
+    is merged into the stored one in O(1): each field in MERGED_FIELDS takes
+    the value of the highest-precedence source that has one, so e.g. a
+    Resource Explorer entry gains Config's relationships and Cloud Control's
+    full configuration. The stored resource keeps its identity fields (ARN,
+    type, region, account) and the source that reported it first.
+
+    Resources without an ARN can't be matched and are all kept.
+
+    With a memory budget, the store estimates its size every SPILL_CHECK_ROWS
+    new resources and, past the budget, appends everything it holds (with the
+    source of each field) to SPILL_PARTITIONS compressed files in the
+    temporary directory, partitioned by ARN, and starts over empty. drain()
+    then merges and yields one partition at a time, so a resource seen before
+    and after a spill still comes out once, merged by the same precedence.
+    Until then len(), iteration and lookups only cover the in-memory part.
+    """
+
+    def __init__(self, field_precedence: Optional[Mapping[str, Sequence[Union[DiscoverySource, str]]]] = None,
+                 memory_budget: Optional[int] = None):
+        """
+        Args:
+            field_precedence: Source order (DiscoverySource or its value) per field,
+                overriding DEFAULT_FIELD_PRECEDENCE for the fields given
+            memory_budget: Approximate bytes of resources held before spilling (None = unbounded)
+
+        Raises:
+            ValueError: If a field isn't in MERGED_FIELDS or a source is unknown
+        """
+        precedence = dict(DEFAULT_FIELD_PRECEDENCE)
+        for field_name, sources in (field_precedence or {}).items():
+            if field_name not in MERGED_FIELDS:
+                raise ValueError(f"Unknown merge field {field_name!r} (expected one of {', '.join(MERGED_FIELDS)})")
+            precedence[field_name] = [DiscoverySource(source) for source in sources]
+        # Rank of each source per field, in MERGED_FIELDS order (lower wins)
+        self._ranks = tuple(
+            {source: rank for rank, source in enumerate(precedence[field_name])} for field_name in MERGED_FIELDS
+        )
+        self._resources: Dict[Any, Resource] = {}
+        # Source of each field, only for resources whose fields came from more than one source
+        self._origins: Dict[Any, List[DiscoverySource]] = {}
+        self.merged = 0
+        self.memory_budget = memory_budget
+        self.resident_bytes = 0
+        self._unmeasured: List[Resource] = []
+        self.spill_files: List[str] = []
+        # Resources written to spill files, an ARN spilled more than once counted each time
+        self.spilled_count = 0
+        # Resources drain() has yielded
+        self.drained = 0
+
+    def __len__(self) -> int:
+        """Resources held in memory"""
+        return len(self._resources)
+
+    def __iter__(self) -> Iterator[Resource]:
+        return iter(self._resources.values())
+
+    def __contains__(self, arn: str) -> bool:
+        return bool(arn) and normalize_arn(arn) in self._resources
+
+    def get(self, arn: str) -> Optional[Resource]:
+        """The stored (merged) resource for an ARN"""
+        return self._resources.get(normalize_arn(arn)) if arn else None
+
+    def add(self, resource: Resource) -> bool:
+        """
+        Store a resource, or merge it into the one stored for its ARN.
+
+        Returns:
+            True if the ARN wasn't seen before (or, once spilled, since the last spill)
+        """
+        # A fresh object never matches, so ARN-less resources are never merged
+        key = normalize_arn(resource.arn) if resource.arn else object()
+        current = self._resources.get(key)
+        if current is None:
+            self._resources[key] = resource
+            if self.memory_budget is not None:
+                self._unmeasured.append(resource)
+                if len(self._unmeasured) >= SPILL_CHECK_ROWS:
+                    self._measure()
+            return True
+        self._merge(key, current, resource)
+        self.merged += 1
+        return False
+
+    def extend(self, resources: Iterable[Resource]) -> int:
+        """Add resources; returns how many had an ARN not seen before"""
+        add = self.add
+        return sum(1 for resource in resources if add(resource))
+
+    def resources(self) -> List[Resource]:
+        """Stored resources in the order their ARNs were first seen"""
+        return list(self._resources.values())
+
+    def drain(self) -> Iterator[Resource]:
+        """
+        Remove and yield every resource, releasing each as it goes: in
+        resources() order, or partition by partition if the store spilled
+        """
+        if not self.spill_files:
+            for key in list(self._resources):
+                self._origins.pop(key, None)
+                self.drained += 1
+                yield self._resources.pop(key)
+            return
+        self.spill()
+        paths = list(self.spill_files)
+        for path in paths:
+            partition = ResourceMergeStore()
+            partition._ranks = self._ranks
+            with gzip.open(path, 'rb') as spill:
+                while True:
+                    try:
+                        records = pickle.load(spill)
+                    except EOFError:
+                        break
+                    for resource, origins in records:
+                        partition._add_merged(resource, origins)
+            os.remove(path)
+            self.spill_files.remove(path)
+            self.merged += partition.merged
+            for resource in partition.drain():
+                self.drained += 1
+                yield resource
+        self.spilled_count = 0
+
+    def spill(self) -> None:
+        """Append the in-memory resources to the partition files and release them"""
+        if not self._resources:
+            return
+        if not self.spill_files:
+            for _ in range(SPILL_PARTITIONS):
+                fd, path = tempfile.mkstemp(prefix='discovery-merge-', suffix='.pickle.gz')
+                os.close(fd)
+                self.spill_files.append(path)
+            # The list itself is handed over, so files still there are removed with the store
+            weakref.finalize(self, _remove_files, self.spill_files)
+        partitions: List[List[Tuple[Resource, Optional[List[DiscoverySource]]]]] = [
+            [] for _ in range(SPILL_PARTITIONS)
+        ]
+        for key, resource in self._resources.items():
+            # ARN-less resources never merge, so any partition will do
+            index = hash(key) % SPILL_PARTITIONS if type(key) is str else 0
+            partitions[index].append((resource, self._origins.get(key)))
+        for path, records in zip(self.spill_files, partitions):
+            if records:
+                with gzip.open(path, 'ab', compresslevel=SPILL_COMPRESSLEVEL) as spill:
+                    pickle.dump(records, spill, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled_count += len(self._resources)
+        self._resources = {}
+        self._origins = {}
+        self._unmeasured = []
+        self.resident_bytes = 0
+
+    def _measure(self) -> None:
+        # Size a sample of the resources added since the last check as a batch would hold them
+        added = self._unmeasured
+        sample = added[::max(1, len(added) // SIZE_SAMPLE)]
+        self.resident_bytes += ResourceBatch.from_resources(sample).nbytes * len(added) // len(sample)
+        self._unmeasured = []
+        if self.resident_bytes > self.memory_budget:
+            self.spill()
+
+    def _add_merged(self, resource: Resource, origins: Optional[List[DiscoverySource]]) -> None:
+        """Add a spilled resource whose fields came from `origins` (None = all from its source)"""
+        key = normalize_arn(resource.arn) if resource.arn else object()
+        current = self._resources.get(key)
+        if current is None:
+            self._resources[key] = resource
+            if origins is not None:
+                self._origins[key] = origins
+            return
+        self._merge(key, current, resource, origins)
+        self.merged += 1
+
+    def _merge(self, key: Any, current: Resource, incoming: Resource,
+               incoming_origins: Optional[List[DiscoverySource]] = None) -> None:
+        origins = self._origins.get(key)
+        for index, field_name in enumerate(MERGED_FIELDS):
+            value = getattr(incoming, field_name)
+            if _is_empty(value):
+                continue
+            source = incoming_origins[index] if incoming_origins else incoming.source
+            existing = getattr(current, field_name)
+            origin = origins[index] if origins else current.source
+            if _is_empty(existing) or self._rank(index, source) < self._rank(index, origin):
+                if origins is None:
+                    origins = self._origins[key] = [current.source] * len(MERGED_FIELDS)
+                setattr(current, field_name, value)
+                origins[index] = source
+
+    def _rank(self, index: int, source: DiscoverySource) -> int:
+        ranks = self._ranks[index]
+        return ranks.get(source, len(ranks))
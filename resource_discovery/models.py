@@ -1,11 +1,25 @@
 """
 Data models for resource discovery
 """
+import gzip
+import os
+import pickle
+import sys
+import tempfile
+import weakref
+from array import array
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Union
 from enum import Enum
 
+from . import codec
+from .arn import GLOBAL_REGION, parse_arn
+from .codec import RawJson
+from .error_ledger import ErrorLedger, error_code
+from .resource_types import TypeFilter, compile_type_filter
+
 
 class DiscoverySource(Enum):
     """Source of resource discovery"""
@@ -14,21 +28,93 @@ class DiscoverySource(Enum):
     CLOUD_CONTROL = "cloud_control"
 
 
-@dataclass
+# Memory-bounded DiscoveryResults: resources added between budget checks, and the gzip
+# level of spill files (fast; the JSON blobs still shrink several-fold)
+SPILL_CHECK_ROWS = 1000
+SPILL_COMPRESSLEVEL = 1
+
+# Column types of Resource.to_dict() output, for building typed tables from it.
+# Fields not listed here are plain text.
+RESOURCE_TIMESTAMP_FIELDS = ('created_at', 'last_modified')
+RESOURCE_CATEGORICAL_FIELDS = ('resource_type', 'region', 'account_id', 'discovery_source')
+RESOURCE_NESTED_FIELDS = ('tags', 'configuration', 'relationships')
+
+
+def json_field_text(value: Any) -> Optional[str]:
+    """JSON text of a tags/configuration/relationships value: RawJson as-is, anything else encoded"""
+    if value is None:
+        return None
+    if isinstance(value, RawJson):
+        return value.raw
+    return codec.dumps(value)
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Shared empty Resource container is read-only; assign a new one instead")
+
+
+class _EmptyDict(dict):
+    """Empty dict shared by every Resource without tags/configuration"""
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # Unpickle (e.g. from a spill file) as the shared instance
+        return 'EMPTY_DICT'
+
+
+class _EmptyList(list):
+    """Empty list shared by every Resource without relationships"""
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return 'EMPTY_LIST'
+
+
+EMPTY_DICT = _EmptyDict()
+EMPTY_LIST = _EmptyList()
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+@dataclass(slots=True)
 class Resource:
-    """Standardized AWS resource representation"""
+    """
+    Standardized AWS resource representation
+    
+    Slotted (no per-instance __dict__) because discovery holds hundreds of
+    thousands of these. Region, account ID and resource type are interned so
+    every resource shares one copy of each, and empty tags/configuration/
+    relationships are shared read-only containers.
+    """
     arn: str
     resource_type: str
     region: str
     account_id: str
     name: Optional[str] = None
-    tags: Dict[str, str] = field(default_factory=dict)
-    configuration: Dict[str, Any] = field(default_factory=dict)
-    relationships: List[str] = field(default_factory=list)
+    tags: Dict[str, str] = field(default_factory=lambda: EMPTY_DICT)
+    configuration: Union[Dict[str, Any], RawJson] = field(default_factory=lambda: EMPTY_DICT)
+    relationships: List[str] = field(default_factory=lambda: EMPTY_LIST)
     created_at: Optional[datetime] = None
     last_modified: Optional[datetime] = None
     source: DiscoverySource = DiscoverySource.RESOURCE_EXPLORER
     
+    def __post_init__(self):
+        self.resource_type = _intern(self.resource_type)
+        self.region = _intern(self.region)
+        self.account_id = _intern(self.account_id)
+        if type(self.tags) is dict and not self.tags:
+            self.tags = EMPTY_DICT
+        if type(self.configuration) is dict and not self.configuration:
+            self.configuration = EMPTY_DICT
+        if type(self.relationships) is list and not self.relationships:
+            self.relationships = EMPTY_LIST
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for database insertion"""
         return {
@@ -37,15 +123,282 @@ class Resource:
             'region': self.region,
             'account_id': self.account_id,
             'name': self.name,
-            'tags': self.tags,
-            'configuration': self.configuration,
-            'relationships': self.relationships,
+            # Callers may modify the returned containers, so never hand out the shared empties
+            'tags': {} if self.tags is EMPTY_DICT else self.tags,
+            'configuration': {} if self.configuration is EMPTY_DICT else self.configuration,
+            'relationships': [] if self.relationships is EMPTY_LIST else self.relationships,
             'created_at': self.created_at,
             'last_modified': self.last_modified,
             'discovery_source': self.source.value
         }
 
 
+class _Dictionary:
+    """Distinct values of a column, in first-seen order, with a value -> code index"""
+    __slots__ = ('values', 'index')
+    
+    def __init__(self):
+        self.values: List[Any] = []
+        self.index: Dict[Any, int] = {}
+    
+    def encode(self, value) -> int:
+        if value is None:
+            return -1
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _blob(value) -> Optional[bytes]:
+    if value is None:
+        return None
+    if isinstance(value, RawJson):
+        return value.raw.encode('utf-8')
+    if not value:
+        return b'[]' if isinstance(value, list) else b'{}'
+    return codec.dumpb(value)
+
+
+def _unblob(blob: Optional[bytes]):
+    return None if blob is None else codec.loads(blob)
+
+
+# str/bytes headers of a row's ARN, name and blobs, plus its list and array slots
+_ROW_OVERHEAD = 2 * 49 + 3 * 33 + 7 * 8 + 4 * 4
+
+
+class ResourceBatch:
+    """
+    Columnar store of resources
+    
+    Resource type, region, account ID and discovery source are dictionary
+    encoded (int32 codes into a list of distinct values), ARNs and names are
+    plain lists, and tags/configuration/relationships are JSON blobs, so a
+    batch costs a few bytes per dimension per resource rather than a Python
+    object graph. Codes convert to pandas categoricals and Arrow dictionary
+    arrays without copying, and the JSON blobs are written to the database
+    as-is (copy_rows()).
+    
+    Iterating yields Resource objects decoded on the fly, so code written
+    against a list of resources works unchanged. Datetimes nested inside
+    configuration come back as ISO strings.
+    """
+    DIMENSIONS = ('resource_type', 'region', 'account_id', 'discovery_source')
+    BLOBS = ('tags', 'configuration', 'relationships')
+    
+    def __init__(self):
+        self.arns: List[str] = []
+        self.names: List[Optional[str]] = []
+        self.created_at: List[Optional[datetime]] = []
+        self.last_modified: List[Optional[datetime]] = []
+        self.codes: Dict[str, array] = {name: array('i') for name in self.DIMENSIONS}
+        self.dictionaries: Dict[str, _Dictionary] = {name: _Dictionary() for name in self.DIMENSIONS}
+        self.blobs: Dict[str, List[Optional[bytes]]] = {name: [] for name in self.BLOBS}
+    
+    @classmethod
+    def from_resources(cls, resources: Iterable[Resource]) -> 'ResourceBatch':
+        batch = cls()
+        batch.extend(resources)
+        return batch
+    
+    def __len__(self) -> int:
+        return len(self.arns)
+    
+    def append(self, resource: Resource) -> None:
+        self.arns.append(resource.arn)
+        self.names.append(resource.name)
+        self.created_at.append(resource.created_at)
+        self.last_modified.append(resource.last_modified)
+        for name, value in (('resource_type', resource.resource_type), ('region', resource.region),
+                            ('account_id', resource.account_id), ('discovery_source', resource.source.value)):
+            self.codes[name].append(self.dictionaries[name].encode(value))
+        self.blobs['tags'].append(_blob(resource.tags))
+        self.blobs['configuration'].append(_blob(resource.configuration))
+        self.blobs['relationships'].append(_blob(resource.relationships))
+    
+    def extend(self, resources: Union[Iterable[Resource], 'ResourceBatch']) -> None:
+        if not isinstance(resources, ResourceBatch):
+            for resource in resources:
+                self.append(resource)
+            return
+        # Batch to batch: re-map codes rather than decoding every resource
+        self.arns.extend(resources.arns)
+        self.names.extend(resources.names)
+        self.created_at.extend(resources.created_at)
+        self.last_modified.extend(resources.last_modified)
+        for name in self.DIMENSIONS:
+            mapping = [self.dictionaries[name].encode(value) for value in resources.dictionaries[name].values]
+            self.codes[name].extend(-1 if code < 0 else mapping[code] for code in resources.codes[name])
+        for name in self.BLOBS:
+            self.blobs[name].extend(resources.blobs[name])
+    
+    def column(self, name: str) -> List[Any]:
+        """Decoded values of a dimension column"""
+        values = self.dictionaries[name].values
+        return [None if code < 0 else values[code] for code in self.codes[name]]
+    
+    def __getitem__(self, i: int) -> Resource:
+        def dimension(name):
+            code = self.codes[name][i]
+            return None if code < 0 else self.dictionaries[name].values[code]
+        
+        return Resource(
+            arn=self.arns[i],
+            resource_type=dimension('resource_type'),
+            region=dimension('region'),
+            account_id=dimension('account_id'),
+            name=self.names[i],
+            tags=_unblob(self.blobs['tags'][i]),
+            configuration=_unblob(self.blobs['configuration'][i]),
+            relationships=_unblob(self.blobs['relationships'][i]),
+            created_at=self.created_at[i],
+            last_modified=self.last_modified[i],
+            source=DiscoverySource(dimension('discovery_source')),
+        )
+    
+    def __iter__(self) -> Iterator[Resource]:
+        for i in range(len(self)):
+            yield self[i]
+    
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held: string and blob payloads plus per-row object/slot overhead"""
+        payload = sum(map(len, self.arns)) + sum(len(name) for name in self.names if name)
+        for blobs in self.blobs.values():
+            payload += sum(len(blob) for blob in blobs if blob)
+        return payload + len(self) * _ROW_OVERHEAD
+    
+    def type_counts(self) -> Dict[str, int]:
+        """Resource count per type, counted over the codes"""
+        counts = [0] * len(self.dictionaries['resource_type'].values)
+        for code in self.codes['resource_type']:
+            counts[code] += 1
+        return dict(zip(self.dictionaries['resource_type'].values, counts))
+    
+    def select(self, mask: Iterable[bool]) -> 'ResourceBatch':
+        """New batch with the rows where mask is true; codes are kept as they are, not re-encoded"""
+        rows = [i for i, keep in enumerate(mask) if keep]
+        batch = ResourceBatch()
+        batch.dictionaries = {name: self._copy_dictionary(name) for name in self.DIMENSIONS}
+        batch.arns = [self.arns[i] for i in rows]
+        batch.names = [self.names[i] for i in rows]
+        batch.created_at = [self.created_at[i] for i in rows]
+        batch.last_modified = [self.last_modified[i] for i in rows]
+        batch.codes = {name: array('i', (codes[i] for i in rows)) for name, codes in self.codes.items()}
+        batch.blobs = {name: [blobs[i] for i in rows] for name, blobs in self.blobs.items()}
+        return batch
+    
+    def filter_types(self, include) -> 'ResourceBatch':
+        """Rows whose resource type passes include(type); evaluated once per distinct type"""
+        keep = [include(value) for value in self.dictionaries['resource_type'].values]
+        return self.select(code >= 0 and keep[code] for code in self.codes['resource_type'])
+    
+    def _copy_dictionary(self, name: str) -> _Dictionary:
+        dictionary = _Dictionary()
+        dictionary.values = list(self.dictionaries[name].values)
+        dictionary.index = dict(self.dictionaries[name].index)
+        return dictionary
+    
+    def copy_rows(self, account_id: Optional[str] = None) -> Iterator[tuple]:
+        """
+        Rows for COPY into the resources table, in lib.database.RESOURCE_COPY_COLUMNS order
+        (resource_id, resource_type, resource_arn, region, account_id, name, tags, properties).
+        
+        A missing region or account is taken from the ARN (global resources get
+        GLOBAL_REGION), and an account neither has - S3 ARNs carry none - from
+        `account_id`. The JSON blobs are passed through as text without re-serializing.
+        """
+        types = self.dictionaries['resource_type'].values
+        regions = self.dictionaries['region'].values
+        accounts = self.dictionaries['account_id'].values
+        region_codes = self.codes['region']
+        account_codes = self.codes['account_id']
+        tags = self.blobs['tags']
+        configuration = self.blobs['configuration']
+        for i, (arn, type_code) in enumerate(zip(self.arns, self.codes['resource_type'])):
+            region_code = region_codes[i]
+            account_code = account_codes[i]
+            region = regions[region_code] if region_code >= 0 else None
+            account = accounts[account_code] if account_code >= 0 else None
+            if not region or not account or account == 'unknown':
+                parsed = parse_arn(arn)
+                region = region or (parsed.region if parsed else GLOBAL_REGION)
+                if not account or account == 'unknown':
+                    account = (parsed.account if parsed else None) or account_id or account
+            yield (
+                arn, types[type_code], arn, region, account, self.names[i],
+                (tags[i] or b'{}').decode('utf-8'), (configuration[i] or b'{}').decode('utf-8'),
+            )
+    
+    def to_pandas(self):
+        """
+        DataFrame with the same columns and dtypes as reporting.excel_generator.resources_frame():
+        dimension columns are categoricals built directly on the codes, nested fields JSON text
+        """
+        import numpy as np
+        import pandas as pd
+        
+        def timestamps(values):
+            return pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', utc=True).dt.tz_localize(None)
+        
+        def categorical(name):
+            codes = np.frombuffer(self.codes[name], dtype=np.int32) if len(self) else np.empty(0, dtype=np.int32)
+            return pd.Categorical.from_codes(codes, categories=self.dictionaries[name].values, validate=False)
+        
+        def text(name):
+            return [None if blob is None else blob.decode('utf-8') for blob in self.blobs[name]]
+        
+        return pd.DataFrame({
+            'arn': self.arns,
+            'resource_type': categorical('resource_type'),
+            'region': categorical('region'),
+            'account_id': categorical('account_id'),
+            'name': self.names,
+            'tags': text('tags'),
+            'configuration': text('configuration'),
+            'relationships': text('relationships'),
+            'created_at': timestamps(self.created_at),
+            'last_modified': timestamps(self.last_modified),
+            'discovery_source': categorical('discovery_source'),
+        })
+    
+    def to_arrow(self):
+        """Arrow RecordBatch; dimension columns are dictionary arrays over the codes, nested fields JSON text"""
+        import numpy as np
+        import pyarrow as pa
+        
+        def dictionary(name):
+            codes = np.frombuffer(self.codes[name], dtype=np.int32) if len(self) else np.empty(0, dtype=np.int32)
+            missing = codes < 0
+            return pa.DictionaryArray.from_arrays(
+                pa.array(np.where(missing, 0, codes) if missing.any() else codes),
+                pa.array(self.dictionaries[name].values, type=pa.string()),
+                mask=missing if missing.any() else None,
+            )
+        
+        def text(name):
+            return pa.array(self.blobs[name], type=pa.binary()).cast(pa.string())
+        
+        def timestamps(values):
+            return pa.array(values, type=pa.timestamp('us', tz='UTC'))
+        
+        return pa.RecordBatch.from_pydict({
+            'arn': pa.array(self.arns, type=pa.string()),
+            'resource_type': dictionary('resource_type'),
+            'region': dictionary('region'),
+            'account_id': dictionary('account_id'),
+            'name': pa.array(self.names, type=pa.string()),
+            'tags': text('tags'),
+            'configuration': text('configuration'),
+            'relationships': text('relationships'),
+            'created_at': timestamps(self.created_at),
+            'last_modified': timestamps(self.last_modified),
+            'discovery_source': dictionary('discovery_source'),
+        })
+
+
 @dataclass
 class DiscoveryConfig:
     """Configuration for resource discovery"""
@@ -53,8 +406,12 @@ class DiscoveryConfig:
     use_resource_explorer: bool = True
     use_config: bool = True
     use_cloud_control: bool = False  # Fallback only
+    # Query Config for every included type to enrich Resource Explorer's results, rather
+    # than only as a fallback when Resource Explorer finds little (one query per type per account)
+    config_enrichment: bool = False
     
-    # Resource type filters
+    # Resource type filters: CloudFormation ('AWS::EC2::Instance') or Resource Explorer
+    # ('ec2:instance') names, or globs ('ec2:*', 'AWS::RDS::*')
     include_types: Optional[List[str]] = None  # None = all types
     exclude_types: List[str] = field(default_factory=list)
     
@@ -64,33 +421,147 @@ class DiscoveryConfig:
     # Account configuration
     accounts: Optional[List[str]] = None  # None = only local account
     
+    # Source order per field when several sources report the same resource
+    # (e.g. {'tags': ['config', 'resource_explorer']}); see merge.DEFAULT_FIELD_PRECEDENCE
+    field_precedence: Optional[Dict[str, List[Union[DiscoverySource, str]]]] = None
+    
     # Performance tuning
     batch_size: int = 100
     max_workers: int = 10
+    columnar: bool = False  # Return resources as a ResourceBatch instead of a list
+    
+    # In-memory resources (MiB) above which DiscoveryResult spills them to /tmp (None = unbounded)
+    memory_budget_mb: Optional[int] = None
     
     # Retry configuration
     max_retries: int = 3
     retry_delay: int = 2
     
+    def type_filter(self) -> TypeFilter:
+        """include_types/exclude_types compiled (see resource_types.TypeMatcher for the syntax)"""
+        return compile_type_filter(self.include_types, self.exclude_types)
+    
     def should_include_type(self, resource_type: str) -> bool:
-        """Check if resource type should be included"""
-        if resource_type in self.exclude_types:
-            return False
-        if self.include_types is None:
-            return True
-        return resource_type in self.include_types
+        """Check if resource type should be included (either naming scheme; globs allowed)"""
+        return self.type_filter().includes(resource_type)
+
+
+def _remove_files(paths: List[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    paths.clear()
 
 
 @dataclass
 class DiscoveryResult:
-    """Result of a discovery operation"""
-    resources: List[Resource]
+    """
+    Result of a discovery operation (resources as a list or a columnar ResourceBatch)
+    
+    With a memory budget, resources added through add_resources() are held as
+    a ResourceBatch, and once its size passes the budget it is written to a
+    gzip-compressed file in the temporary directory (/tmp on Lambda) and
+    replaced by an empty one. `resources` then holds only the latest, unspilled
+    part; iter_resources()/iter_batches() cover everything. Spill files are
+    deleted by discard_spill() or when the result is garbage collected.
+    """
+    resources: Union[List[Resource], ResourceBatch]
     total_count: int
     success: bool
-    errors: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)  # One message per failure that made the run unsuccessful
     duration_seconds: float = 0.0
+    memory_budget: Optional[int] = None  # Bytes of in-memory resources before spilling (None = unbounded)
+    spill_files: List[str] = field(default_factory=list, init=False, repr=False)
+    spilled_count: int = field(default=0, init=False)
+    resident_bytes: int = field(default=0, init=False, repr=False)
+    # Every error by account/region/source/operation/code, including ones that don't fail the run
+    error_ledger: ErrorLedger = field(default_factory=ErrorLedger, repr=False)
     
-    def add_error(self, error: str):
-        """Add an error message"""
+    def add_error(self, error: str, cause: Optional[BaseException] = None, account_id: str = '',
+                  region: str = '', source: str = '', operation: str = ''):
+        """Add an error message (and count it in error_ledger, coded by the exception that caused it)"""
         self.errors.append(error)
+        self.error_ledger.record(error, account_id=account_id, region=region, source=source, operation=operation,
+                                 code=error_code(cause) if cause is not None else None)
         self.success = False
+    
+    def to_batch(self) -> ResourceBatch:
+        """Switch the in-memory resources to a ResourceBatch (no-op if they already are one)"""
+        if not isinstance(self.resources, ResourceBatch):
+            self.resources = ResourceBatch.from_resources(self.resources)
+        return self.resources
+    
+    @property
+    def resource_count(self) -> int:
+        """Resources held, spilled ones included"""
+        return self.spilled_count + len(self.resources)
+    
+    def add_resources(self, resources: Union[Iterable[Resource], ResourceBatch]) -> None:
+        """Add resources, spilling to disk whenever the in-memory part passes memory_budget"""
+        if self.memory_budget is None:
+            self.resources.extend(resources)
+            return
+        if isinstance(resources, ResourceBatch):
+            self._add_batch(resources)
+            return
+        iterator = iter(resources)
+        while True:
+            chunk = ResourceBatch.from_resources(islice(iterator, SPILL_CHECK_ROWS))
+            if not chunk:
+                return
+            self._add_batch(chunk)
+    
+    def add_result(self, other: 'DiscoveryResult') -> None:
+        """Add another result's resources (batch by batch if it spilled) and errors; its spill files are removed"""
+        for chunk in (other.iter_batches() if other.spill_files else [other.resources]):
+            self.add_resources(chunk)
+        self.errors.extend(other.errors)
+        self.error_ledger.merge(other.error_ledger)
+        other.discard_spill()
+    
+    def _add_batch(self, batch: ResourceBatch) -> None:
+        self.to_batch().extend(batch)
+        self.resident_bytes += batch.nbytes
+        if self.resident_bytes > self.memory_budget:
+            self.spill()
+    
+    def spill(self) -> None:
+        """Write the in-memory resources to a compressed temporary file and release them"""
+        if not self.resources:
+            return
+        batch = self.to_batch()
+        fd, path = tempfile.mkstemp(prefix='discovery-', suffix='.batch.gz')
+        if not self.spill_files:
+            # The list itself is handed over, so files spilled later are removed too
+            weakref.finalize(self, _remove_files, self.spill_files)
+        self.spill_files.append(path)
+        with os.fdopen(fd, 'wb') as raw, \
+                gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=SPILL_COMPRESSLEVEL) as spill:
+            pickle.dump(batch, spill, protocol=pickle.HIGHEST_PROTOCOL)
+        self.spilled_count += len(batch)
+        self.resources = ResourceBatch()
+        self.resident_bytes = 0
+    
+    def iter_batches(self) -> Iterator[ResourceBatch]:
+        """Spilled batches in the order they were written, one in memory at a time, then the in-memory part"""
+        for path in list(self.spill_files):
+            with gzip.open(path, 'rb') as spill:
+                batch = pickle.load(spill)
+            yield batch
+        if self.resources:
+            yield self.to_batch()
+    
+    def iter_resources(self) -> Iterator[Resource]:
+        """Every resource, spilled ones first"""
+        for path in list(self.spill_files):
+            with gzip.open(path, 'rb') as spill:
+                batch = pickle.load(spill)
+            yield from batch
+        yield from self.resources
+    
+    def discard_spill(self) -> None:
+        """Delete the spill files (the spilled resources are gone afterwards)"""
+        _remove_files(self.spill_files)
+        self.spilled_count = 0
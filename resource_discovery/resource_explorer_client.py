@@ -8,10 +8,20 @@ from datetime import datetime
 import boto3
 from botocore.exceptions import ClientError
 
+from .arn import GLOBAL_REGION, parse_arn
 from .models import Resource, DiscoverySource
 
 logger = logging.getLogger(__name__)
 
+# Longest QueryString the Search API accepts
+MAX_QUERY_LENGTH = 1011
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
 
 class ResourceExplorerClient:
     """Wrapper for AWS Resource Explorer API"""
@@ -81,26 +91,25 @@ class ResourceExplorerClient:
         try:
             paginator = self.client.get_paginator('search')
             
-            # Build query string
-            query_string = self._build_query_string(filters)
-            
-            logger.info(f"Searching resources with query: {query_string}")
-            
-            page_iterator = paginator.paginate(
-                QueryString=query_string,
-                PaginationConfig={
-                    'MaxItems': None,  # Get all results
-                    'PageSize': max_results
-                }
-            )
-            
             total_count = 0
-            for page in page_iterator:
-                resources = page.get('Resources', [])
-                total_count += len(resources)
+            # More than one query only when the type terms don't fit in one
+            for query_string in self._build_query_strings(filters):
+                logger.info(f"Searching resources with query: {query_string}")
                 
-                for resource in resources:
-                    yield resource
+                page_iterator = paginator.paginate(
+                    QueryString=query_string,
+                    PaginationConfig={
+                        'MaxItems': None,  # Get all results
+                        'PageSize': max_results
+                    }
+                )
+                
+                for page in page_iterator:
+                    resources = page.get('Resources', [])
+                    total_count += len(resources)
+                    
+                    for resource in resources:
+                        yield resource
             
             logger.info(f"Found {total_count} total resources")
             
@@ -114,10 +123,16 @@ class ResourceExplorerClient:
     
     def _build_query_string(self, filters: Optional[Dict] = None) -> str:
         """
-        Build Resource Explorer query string.
+        Build a Resource Explorer query string.
+        
+        Filters with the same prefix are ORed and different prefixes ANDed by
+        Resource Explorer itself, so terms are just space-separated; a leading
+        '-' excludes. Exclusions are dropped if the query would exceed
+        MAX_QUERY_LENGTH - callers filter results by type afterwards anyway.
         
         Args:
-            filters: Optional filters
+            filters: Optional filters: resource_types, services, exclude_types,
+                exclude_services, regions (lists or single values) and tags (key -> value)
             
         Returns:
             Query string
@@ -125,32 +140,29 @@ class ResourceExplorerClient:
         if not filters:
             return "*"  # Match all resources
         
-        query_parts = []
-        
-        # Resource type filter
-        if 'resource_types' in filters:
-            types = filters['resource_types']
-            if isinstance(types, list):
-                type_queries = [f"resourcetype:{t}" for t in types]
-                query_parts.append(f"({' OR '.join(type_queries)})")
-            else:
-                query_parts.append(f"resourcetype:{types}")
-        
-        # Tag filters
-        if 'tags' in filters:
-            for key, value in filters['tags'].items():
-                query_parts.append(f"tag:{key}={value}")
-        
-        # Region filter
-        if 'regions' in filters:
-            regions = filters['regions']
-            if isinstance(regions, list):
-                region_queries = [f"region:{r}" for r in regions]
-                query_parts.append(f"({' OR '.join(region_queries)})")
-            else:
-                query_parts.append(f"region:{regions}")
+        terms = [f"resourcetype:{t}" for t in _as_list(filters.get('resource_types'))]
+        terms += [f"service:{s}" for s in _as_list(filters.get('services'))]
+        terms += [f"tag:{key}={value}" for key, value in (filters.get('tags') or {}).items()]
+        terms += [f"region:{r}" for r in _as_list(filters.get('regions'))]
+        exclusions = [f"-resourcetype:{t}" for t in _as_list(filters.get('exclude_types'))]
+        exclusions += [f"-service:{s}" for s in _as_list(filters.get('exclude_services'))]
         
-        return " AND ".join(query_parts) if query_parts else "*"
+        query = " ".join(terms + exclusions)
+        if len(query) > MAX_QUERY_LENGTH and exclusions:
+            logger.warning(f"{len(exclusions)} type exclusions don't fit in a Resource Explorer query, "
+                           f"filtering them from the results instead")
+            query = " ".join(terms)
+        return query or "*"
+    
+    def _build_query_strings(self, filters: Optional[Dict] = None) -> List[str]:
+        """Query strings covering the filters, splitting the resource types over several queries if needed"""
+        query = self._build_query_string(filters)
+        types = _as_list((filters or {}).get('resource_types'))
+        if len(query) <= MAX_QUERY_LENGTH or len(types) < 2:
+            return [query]
+        half = len(types) // 2
+        return (self._build_query_strings({**filters, 'resource_types': types[:half]}) +
+                self._build_query_strings({**filters, 'resource_types': types[half:]}))
     
     def get_resource_details(self, arn: str) -> Optional[Dict]:
         """
@@ -206,12 +218,11 @@ class ResourceExplorerClient:
         """
         arn = raw_resource.get('Arn', '')
         
-        # Parse ARN to extract account and region
-        # ARN format: arn:aws:service:region:account-id:resource-type/resource-id
-        # Global resources (IAM, S3, CloudFront, etc.) have empty region field
-        arn_parts = arn.split(':')
-        region = arn_parts[3] if len(arn_parts) > 3 and arn_parts[3] else 'global'
-        account_id = arn_parts[4] if len(arn_parts) > 4 else 'unknown'
+        # Parse ARN to extract account and region (global resources have no region);
+        # S3 ARNs carry no account, the owning account is reported separately
+        parsed = parse_arn(arn)
+        region = parsed.region if parsed else GLOBAL_REGION
+        account_id = (parsed.account if parsed else '') or raw_resource.get('OwningAccountId') or 'unknown'
         
         # Extract properties
         properties = raw_resource.get('Properties', [])
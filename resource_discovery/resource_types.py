@@ -0,0 +1,213 @@
+"""
+Resource type names across discovery sources, and compiled type filters
+
+Config and Cloud Control name types the CloudFormation way
+(AWS::EC2::SecurityGroup), Resource Explorer the IAM way (ec2:security-group).
+Both map to one canonical ID - lowercase 'service:type' without separators,
+e.g. 'ec2:securitygroup' - so a filter written in either scheme matches
+resources from every source.
+"""
+import re
+from fnmatch import translate
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Distinct type names (and filter pattern sets) cached; accounts have a few hundred types
+TYPE_CACHE_SIZE = 4096
+
+# CloudFormation type -> Resource Explorer type(s), for the types discovery lists
+# or users commonly filter on. Types missing here still match each other when
+# their names only differ in case and separators.
+KNOWN_TYPES: Dict[str, Tuple[str, ...]] = {
+    'AWS::ApiGateway::RestApi': ('apigateway:restapis',),
+    'AWS::Bedrock::Guardrail': ('bedrock:guardrail',),
+    'AWS::CloudFormation::Stack': ('cloudformation:stack',),
+    'AWS::CloudFront::Distribution': ('cloudfront:distribution',),
+    'AWS::CloudWatch::Alarm': ('cloudwatch:alarm',),
+    'AWS::DynamoDB::Table': ('dynamodb:table',),
+    'AWS::EC2::Instance': ('ec2:instance',),
+    'AWS::EC2::InternetGateway': ('ec2:internet-gateway',),
+    'AWS::EC2::NatGateway': ('ec2:natgateway',),
+    'AWS::EC2::NetworkInterface': ('ec2:network-interface',),
+    'AWS::EC2::RouteTable': ('ec2:route-table',),
+    'AWS::EC2::SecurityGroup': ('ec2:security-group',),
+    'AWS::EC2::Subnet': ('ec2:subnet',),
+    'AWS::EC2::VPC': ('ec2:vpc',),
+    'AWS::EC2::Volume': ('ec2:volume',),
+    'AWS::ECS::Cluster': ('ecs:cluster',),
+    'AWS::ECS::Service': ('ecs:service',),
+    'AWS::ECS::TaskDefinition': ('ecs:task-definition',),
+    'AWS::EKS::Cluster': ('eks:cluster',),
+    'AWS::ElasticLoadBalancingV2::LoadBalancer': ('elasticloadbalancing:loadbalancer/app',
+                                                  'elasticloadbalancing:loadbalancer/net'),
+    'AWS::Events::Rule': ('events:rule',),
+    'AWS::IAM::Policy': ('iam:policy',),
+    'AWS::IAM::Role': ('iam:role',),
+    'AWS::IAM::User': ('iam:user',),
+    'AWS::KMS::Key': ('kms:key',),
+    'AWS::Lambda::Function': ('lambda:function',),
+    'AWS::Logs::LogGroup': ('logs:log-group',),
+    'AWS::RDS::DBCluster': ('rds:cluster',),
+    'AWS::RDS::DBInstance': ('rds:db',),
+    'AWS::S3::Bucket': ('s3:bucket',),
+    'AWS::SecretsManager::Secret': ('secretsmanager:secret',),
+    'AWS::SNS::Topic': ('sns:topic',),
+    'AWS::SQS::Queue': ('sqs:queue',),
+}
+
+_GLOB_CHARS = frozenset('*?[')
+
+
+def _key(name: str) -> str:
+    key = name.strip().lower()
+    if key.startswith('aws::'):
+        key = key[5:]
+    return key.replace('::', ':').replace('-', '').replace('_', '')
+
+
+_CLOUDFORMATION: Dict[str, str] = {_key(cfn): cfn for cfn in KNOWN_TYPES}
+_RESOURCE_EXPLORER: Dict[str, Tuple[str, ...]] = {_key(cfn): names for cfn, names in KNOWN_TYPES.items()}
+# Resource Explorer names that don't reduce to the CloudFormation one
+_ALIASES: Dict[str, str] = {
+    _key(name): _key(cfn)
+    for cfn, names in KNOWN_TYPES.items() for name in names if _key(name) != _key(cfn)
+}
+
+
+@lru_cache(maxsize=TYPE_CACHE_SIZE)
+def canonical_type(resource_type: str) -> str:
+    """
+    Canonical ID of a type in either naming scheme
+    ('AWS::RDS::DBInstance' and 'rds:db' -> 'rds:dbinstance')
+    """
+    key = _key(resource_type)
+    return _ALIASES.get(key, key)
+
+
+def cloudformation_type(canonical: str) -> Optional[str]:
+    """CloudFormation name of a canonical ID, if it is a known type"""
+    return _CLOUDFORMATION.get(canonical)
+
+
+def resource_explorer_types(canonical: str) -> Tuple[str, ...]:
+    """Resource Explorer name(s) of a canonical ID; empty if it isn't a known type"""
+    return _RESOURCE_EXPLORER.get(canonical, ())
+
+
+def is_pattern(resource_type: str) -> bool:
+    """True if a type filter entry is a glob ('ec2:*', 'AWS::RDS::*')"""
+    return not _GLOB_CHARS.isdisjoint(resource_type)
+
+
+class TypeMatcher:
+    """
+    A list of types and globs in either naming scheme, compiled for O(1) checks
+
+    Entries are reduced to canonical IDs once: exact types go into a set,
+    whole-service globs ('ec2:*', 'AWS::RDS::*') into a set of services and
+    any other glob into one regular expression. Each distinct type checked is
+    then answered from a cache.
+    """
+    __slots__ = ('patterns', 'exact', 'services', 'cloudformation_types', 'resolved', '_regex', '_cache')
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: Tuple[str, ...] = tuple(dict.fromkeys(patterns))
+        exact = set()
+        services = set()
+        globs = []
+        # CloudFormation names of the exact types, for sources that list by type
+        self.cloudformation_types: List[str] = []
+        # False if an entry is a glob or has no known CloudFormation name
+        self.resolved = True
+        for pattern in self.patterns:
+            canonical = canonical_type(pattern)
+            if not is_pattern(canonical):
+                exact.add(canonical)
+                cfn = pattern.strip() if '::' in pattern else cloudformation_type(canonical)
+                if cfn:
+                    self.cloudformation_types.append(cfn)
+                else:
+                    self.resolved = False
+                continue
+            self.resolved = False
+            service, _, rest = canonical.partition(':')
+            if rest == '*' and not is_pattern(service):
+                services.add(service)
+            else:
+                globs.append(translate(canonical))
+        self.exact: FrozenSet[str] = frozenset(exact)
+        self.services: FrozenSet[str] = frozenset(services)
+        self._regex = re.compile('|'.join(globs)) if globs else None
+        self._cache: Dict[str, bool] = {}
+
+    @property
+    def has_globs(self) -> bool:
+        return bool(self.services) or self._regex is not None
+
+    @property
+    def has_type_globs(self) -> bool:
+        """True if there are globs other than whole services ('ec2:*')"""
+        return self._regex is not None
+
+    def matches(self, resource_type: str) -> bool:
+        """Whether a type (in either naming scheme) matches any entry"""
+        try:
+            return self._cache[resource_type]
+        except KeyError:
+            pass
+        canonical = canonical_type(resource_type)
+        matched = (canonical in self.exact or canonical.partition(':')[0] in self.services or
+                   (self._regex is not None and self._regex.match(canonical) is not None))
+        self._cache[resource_type] = matched
+        return matched
+
+    __contains__ = matches
+
+
+class TypeFilter:
+    """
+    DiscoveryConfig's include/exclude type lists, compiled
+
+    A type is included if it matches no exclusion and, when there is an
+    include list, matches an entry of it.
+    """
+    __slots__ = ('include', 'exclude', '_cache')
+
+    def __init__(self, include: Optional[Iterable[str]] = None, exclude: Iterable[str] = ()):
+        # None = all types
+        self.include: Optional[TypeMatcher] = None if include is None else TypeMatcher(include)
+        self.exclude = TypeMatcher(exclude)
+        self._cache: Dict[str, bool] = {}
+
+    @property
+    def filters(self) -> bool:
+        """True if some types are filtered out"""
+        return self.include is not None or bool(self.exclude.patterns)
+
+    @property
+    def selects_nothing(self) -> bool:
+        """True if every type is filtered out (an empty include list, or all included types excluded)"""
+        include = self.include
+        return (include is not None and not include.has_globs and
+                all(canonical in self.exclude for canonical in include.exact))
+
+    def includes(self, resource_type: str) -> bool:
+        """Whether resources of a type (in either naming scheme) are kept"""
+        try:
+            return self._cache[resource_type]
+        except KeyError:
+            pass
+        included = (not self.exclude.matches(resource_type) and
+                    (self.include is None or self.include.matches(resource_type)))
+        self._cache[resource_type] = included
+        return included
+
+
+@lru_cache(maxsize=TYPE_CACHE_SIZE)
+def _compiled_filter(include: Optional[Tuple[str, ...]], exclude: Tuple[str, ...]) -> TypeFilter:
+    return TypeFilter(include, exclude)
+
+
+def compile_type_filter(include: Optional[Iterable[str]] = None, exclude: Iterable[str] = ()) -> TypeFilter:
+    """TypeFilter for include/exclude lists, shared by every caller passing the same lists"""
+    return _compiled_filter(None if include is None else tuple(include), tuple(exclude or ()))
@@ -2,14 +2,13 @@
 Lambda handler for resource discovery
 Triggered by CloudWatch Events (scheduled)
 """
-import json
 import logging
 import os
 import uuid
 from typing import Dict, Any
 
 import boto3
-from resource_discovery import ResourceDiscoveryEngine, DiscoveryConfig
+from resource_discovery import ResourceDiscoveryEngine, DiscoveryConfig, codec
 from lib.database import DatabaseClient
 from lib.organizations import OrganizationsClient
 
@@ -17,6 +16,9 @@ from lib.organizations import OrganizationsClient
 logger = logging.getLogger()
 logger.setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
 
+# Resources held in memory (MiB) before discovery spills them to /tmp; headroom within the 1 GB function
+MEMORY_BUDGET_MB = int(os.environ.get('DISCOVERY_MEMORY_BUDGET_MB', 256))
+
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
@@ -30,7 +32,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         Response with discovery results
     """
     logger.info("Starting resource discovery")
-    logger.info(f"Event: {json.dumps(event)}")
+    logger.info(f"Event: {codec.dumps(event)}")
     
     run_id = str(uuid.uuid4())
     db = None
@@ -105,42 +107,41 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             use_resource_explorer=True,
             use_config=True,
             use_cloud_control=False,
-            max_workers=10
+            max_workers=10,
+            columnar=True,
+            memory_budget_mb=MEMORY_BUDGET_MB
         )
         
         # 3. Run discovery
         engine = ResourceDiscoveryEngine(config=config)
         result = engine.discover_all_resources()
         
-        # 4. Save results to Database
-        resources_to_save = []
-        for r in result.resources:
-            r_dict = r.to_dict()
-            # Map source value for DB
-            r_dict['properties'] = r_dict.get('configuration', {})
-            resources_to_save.append(r_dict)
-            
-        if resources_to_save:
-            logger.info(f"Saving {len(resources_to_save)} resources to database...")
-            db.save_resources(resources_to_save)
+        # 4. Save results to Database (configuration is stored as properties),
+        # one batch at a time when part of the result was spilled to /tmp
+        if result.total_count:
+            logger.info(f"Saving {result.total_count} resources to database "
+                        f"({len(result.spill_files)} spilled batch(es))...")
+        for batch in result.iter_batches():
+            db.save_resource_batch(batch, run_id=run_id)
             
-        # 5. Update account status based on scan
-        # (Simplified: if we got here, mark active accounts as active)
+        # 5. Update account status based on scan: accounts the ledger records as
+        # not discovered at all (e.g. role not assumable) are in error, the rest active
+        failed_accounts = result.error_ledger.failed_accounts()
         for account_id in account_ids:
-            db.update_account_status(account_id, 'active')
+            if account_id in failed_accounts:
+                db.update_account_status(account_id, 'error', last_error=failed_accounts[account_id])
+            else:
+                db.update_account_status(account_id, 'active')
 
         # Log summary
         logger.info(f"Discovery complete: {result.total_count} resources in {result.duration_seconds:.2f}s")
         
-        if result.errors:
-            logger.warning(f"Errors encountered: {result.errors}")
-            # Update specific account if it failed (heuristic: check error string)
-            for err in result.errors:
-                for account_id in account_ids:
-                    if account_id in err:
-                        db.update_account_status(account_id, 'error', last_error=err)
+        if result.error_ledger:
+            logger.warning(f"Errors encountered: {result.error_ledger.total} "
+                           f"({len(result.error_ledger)} distinct): {result.errors}")
         
         summary = engine.get_resource_summary(result)
+        result.discard_spill()
         
         # Record run completion
         try:
@@ -150,15 +151,36 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             )
         except Exception as run_err:
             logger.warning(f"Failed to record run completion: {run_err}")
+        try:
+            db.save_run_errors(run_id, result.error_ledger)
+        except Exception as run_err:
+            logger.warning(f"Failed to record run errors: {run_err}")
+        try:
+            db.prune_resource_changes()
+        except Exception as prune_err:
+            logger.warning(f"Failed to prune resource changes: {prune_err}")
+        
+        # 6. Pre-render per-account reports for the new snapshot (asynchronously)
+        report_function = os.environ.get('REPORT_FUNCTION_NAME')
+        if report_function:
+            try:
+                boto3.client('lambda').invoke(
+                    FunctionName=report_function,
+                    InvocationType='Event',
+                    Payload=codec.dumpb({'action': 'prerender', 'run_id': run_id})
+                )
+            except Exception as invoke_err:
+                logger.warning(f"Failed to start report pre-rendering: {invoke_err}")
         
         return {
             'statusCode': 200,
-            'body': json.dumps({
+            'body': codec.dumps({
                 'success': result.success,
                 'total_resources': result.total_count,
                 'duration_seconds': result.duration_seconds,
                 'resource_types': len(summary),
-                'errors': result.errors
+                'errors': result.errors,
+                'errors_by_account': result.error_ledger.by_account()
             })
         }
         
@@ -172,7 +194,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 logger.warning(f"Failed to record run failure: {run_err}")
         return {
             'statusCode': 500,
-            'body': json.dumps({
+            'body': codec.dumps({
                 'success': False,
                 'error': str(e)
             })
@@ -0,0 +1,77 @@
+"""
+Unit tests for resource_discovery.arn
+"""
+import pytest
+
+from resource_discovery.arn import GLOBAL_REGION, ParsedArn, normalize_arn, parse_arn, partition_for_region
+
+
+class TestParseArn:
+
+    def test_regional_resource(self):
+        parsed = parse_arn("arn:aws:ec2:us-east-1:123456789012:instance/i-0abc")
+        assert parsed == ParsedArn("aws", "ec2", "us-east-1", "123456789012", "instance", "i-0abc")
+        assert not parsed.is_global
+
+    def test_global_resource(self):
+        parsed = parse_arn("arn:aws:iam::123456789012:role/path/Admin")
+        assert parsed.region == GLOBAL_REGION
+        assert parsed.is_global
+        assert (parsed.resource_type, parsed.resource_id) == ("role", "path/Admin")
+
+    def test_s3_without_account(self):
+        bucket = parse_arn("arn:aws:s3:::my-bucket")
+        assert (bucket.account, bucket.region) == ("", GLOBAL_REGION)
+        assert (bucket.resource_type, bucket.resource_id) == ("bucket", "my-bucket")
+        assert parse_arn("arn:aws:s3:::my-bucket/a/b.txt").resource_type == "object"
+
+    @pytest.mark.parametrize("arn,partition,region", [
+        ("arn:aws-us-gov:ec2:us-gov-west-1:123456789012:volume/vol-1", "aws-us-gov", "us-gov-west-1"),
+        ("arn:aws-cn:s3:::cn-bucket", "aws-cn", GLOBAL_REGION),
+    ])
+    def test_other_partitions(self, arn, partition, region):
+        parsed = parse_arn(arn)
+        assert (parsed.partition, parsed.region) == (partition, region)
+
+    def test_colon_separated_resource(self):
+        parsed = parse_arn("arn:aws:lambda:us-east-1:123456789012:function:my-fn:prod")
+        assert (parsed.resource_type, parsed.resource_id) == ("function", "my-fn:prod")
+
+    def test_untyped_resource(self):
+        parsed = parse_arn("arn:aws:sns:us-east-1:123456789012:alerts")
+        assert (parsed.resource_type, parsed.resource_id) == ("", "alerts")
+
+    @pytest.mark.parametrize("value", [None, "", "i-0abc", "arn:aws:ec2", "urn:aws:ec2:us-east-1:1:x"])
+    def test_not_an_arn(self, value):
+        assert parse_arn(value) is None
+
+    def test_colon_in_path_resource(self):
+        parsed = parse_arn("arn:aws:logs:us-east-1:123456789012:log-group:/aws/lambda/fn:*")
+        assert (parsed.resource_type, parsed.resource_id) == ("log-group", "/aws/lambda/fn:*")
+        parsed = parse_arn("arn:aws:iam::123456789012:role/a:b")
+        assert (parsed.resource_type, parsed.resource_id) == ("role", "a:b")
+
+    def test_immutable(self):
+        parsed = parse_arn("arn:aws:ec2:us-east-1:123456789012:instance/i-1")
+        with pytest.raises(AttributeError):
+            parsed.region = "eu-west-1"
+
+
+class TestPartitionForRegion:
+
+    @pytest.mark.parametrize("region,partition", [
+        ("us-east-1", "aws"), ("cn-north-1", "aws-cn"), ("us-gov-east-1", "aws-us-gov"),
+        ("global", "aws"), (None, "aws"),
+    ])
+    def test_partition(self, region, partition):
+        assert partition_for_region(region) == partition
+
+
+class TestNormalizeArn:
+
+    def test_prefix_lowercased_resource_kept(self):
+        assert normalize_arn(" ARN:AWS:EC2:US-EAST-1:123456789012:instance/i-0ABC/ ") == \
+            "arn:aws:ec2:us-east-1:123456789012:instance/i-0ABC"
+
+    def test_non_arn_returned_stripped(self):
+        assert normalize_arn(" bucket-a ") == "bucket-a"
@@ -36,6 +36,18 @@ class TestConvertToResource:
         assert resource.account_id == "123456789012"
         assert resource.region == "us-east-1"
 
+    def test_configuration_keeps_raw_properties(self, raw_cloud_control_description):
+        """Properties text is kept verbatim (not re-encoded) and not held decoded."""
+        from resource_discovery.models import RawJson, json_field_text
+        client = _make_client()
+        resource = client.convert_to_resource(
+            raw_cloud_control_description, "AWS::EC2::Instance"
+        )
+        assert isinstance(resource.configuration, RawJson)
+        assert resource.configuration._decoded is None
+        assert json_field_text(resource.configuration) == raw_cloud_control_description["Properties"]
+        assert resource.configuration == json.loads(raw_cloud_control_description["Properties"])
+
     def test_tags_extracted(self, raw_cloud_control_description):
         client = _make_client()
         resource = client.convert_to_resource(
@@ -54,6 +66,13 @@ class TestConvertToResource:
         assert "sns" in resource.arn
         assert "my-topic" in resource.arn
 
+    def test_synthesized_arn_uses_region_partition(self):
+        client = _make_client(region="cn-north-1")
+        raw = {"Identifier": "my-topic", "Properties": json.dumps({})}
+        resource = client.convert_to_resource(raw, "AWS::SNS::Topic")
+        assert resource.arn.startswith("arn:aws-cn:sns:cn-north-1:")
+        assert resource.region == "cn-north-1"
+
     def test_invalid_json_properties(self):
         """Malformed JSON in Properties should not crash."""
         client = _make_client()
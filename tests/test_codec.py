@@ -0,0 +1,81 @@
+"""
+Unit tests for resource_discovery.codec
+"""
+import json
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from resource_discovery import codec
+from resource_discovery.codec import RawJson
+from resource_discovery.models import DiscoverySource
+from tests.conftest import make_resource
+
+
+@pytest.fixture(params=codec.BACKENDS)
+def backend(request):
+    previous = codec.use_backend(request.param)
+    yield request.param
+    codec.use_backend(previous)
+
+
+class TestEncode:
+
+    def test_types_encoded_the_same_by_every_backend(self, backend):
+        value = {
+            "utc": datetime(2026, 3, 30, 12, 0, 5, 250, tzinfo=timezone.utc),
+            "offset": datetime(2026, 3, 30, 12, tzinfo=timezone(timedelta(hours=2))),
+            "naive": datetime(2026, 3, 30, 12),
+            "day": date(2026, 3, 30),
+            "count": Decimal("42"),
+            "ratio": Decimal("0.5"),
+            "source": DiscoverySource.CONFIG,
+            "configuration": RawJson('{"Size": 8}'),
+            "text": "café",
+        }
+        assert json.loads(codec.dumps(value)) == {
+            "utc": "2026-03-30T12:00:05.000250Z",
+            "offset": "2026-03-30T12:00:00+02:00",
+            "naive": "2026-03-30T12:00:00",
+            "day": "2026-03-30",
+            "count": 42,
+            "ratio": 0.5,
+            "source": "config",
+            "configuration": {"Size": 8},
+            "text": "café",
+        }
+
+    def test_compact_and_indented(self, backend):
+        assert codec.dumps({"a": [1, 2]}) == '{"a":[1,2]}'
+        assert codec.dumps({"a": 1}, indent=True) == '{\n  "a": 1\n}'
+        assert codec.dumpb({"a": 1}, newline=True) == b'{"a":1}\n'
+
+    def test_unknown_types_stringified(self, backend):
+        resource = make_resource()
+        assert json.loads(codec.dumps({"r": resource, "big": 2 ** 70})) == {"r": str(resource), "big": 2 ** 70}
+
+    def test_round_trip(self, backend):
+        record = make_resource(tags={"Name": "web"}).to_dict()
+        assert codec.loads(codec.dumpb(record)) == json.loads(json.dumps(record, default=codec.default))
+
+    def test_invalid_json_is_value_error(self, backend):
+        with pytest.raises(ValueError):
+            codec.loads(b'{"a":')
+
+
+class TestBackends:
+
+    def test_stdlib_always_available(self):
+        assert "json" in codec.BACKENDS
+        assert codec.backend() == codec.BACKENDS[0]
+
+    def test_use_backend_returns_previous(self):
+        previous = codec.use_backend("json")
+        try:
+            assert codec.backend() == "json"
+        finally:
+            assert codec.use_backend(previous) == "json"
+
+    def test_unknown_backend_rejected(self):
+        with pytest.raises(ValueError):
+            codec.use_backend("simplejson")
@@ -0,0 +1,103 @@
+"""
+Unit tests for reporting.columnar (Parquet / Arrow IPC export)
+"""
+import json
+import pytest
+from datetime import datetime, timezone
+
+pa = pytest.importorskip("pyarrow")
+pc = pytest.importorskip("pyarrow.compute")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from reporting.columnar import (
+    iter_record_batches, write_parquet_dataset, open_parquet_dataset, write_arrow_file,
+)
+from resource_discovery.models import Resource, DiscoverySource
+
+
+def _resources(n):
+    for i in range(n):
+        yield Resource(
+            arn=f"arn:aws:ec2:us-east-1:{100 + i % 2}:instance/i-{i:03d}",
+            resource_type="AWS::EC2::Instance" if i % 3 else "AWS::S3::Bucket",
+            region="us-east-1",
+            account_id=f"00000000{100 + i % 2}",
+            name=f"res-{i}",
+            tags={"Name": f"res-{i}", "Env": "prod"},
+            configuration={"State": {"Name": "running"}, "Index": i},
+            relationships=["arn:aws:ec2:us-east-1:100:vpc/vpc-1"],
+            created_at=datetime(2026, 3, 30, 12, 0),
+            source=DiscoverySource.CONFIG,
+        )
+
+
+class TestRecordBatches:
+
+    def test_batches_are_bounded(self):
+        batches = list(iter_record_batches(_resources(10), batch_size=4))
+        assert [b.num_rows for b in batches] == [4, 4, 2]
+
+    def test_typed_columns(self):
+        batch = next(iter_record_batches(_resources(1)))
+        row = batch.to_pylist()[0]
+
+        assert row["tags"] == [("Name", "res-0"), ("Env", "prod")]
+        assert json.loads(row["configuration"]) == {"State": {"Name": "running"}, "Index": 0}
+        assert row["relationships"] == ["arn:aws:ec2:us-east-1:100:vpc/vpc-1"]
+        assert row["created_at"] == datetime(2026, 3, 30, 12, 0, tzinfo=timezone.utc)
+        assert row["last_modified"] is None
+        assert row["discovery_source"] == "config"
+
+    def test_accepts_dicts(self):
+        rows = [{"arn": "a", "resource_type": "AWS::S3::Bucket", "account_id": "1",
+                 "created_at": "2026-03-30T12:00:00+00:00"}]
+        batch = next(iter_record_batches(rows))
+        assert batch.column("created_at")[0].as_py() == datetime(2026, 3, 30, 12, tzinfo=timezone.utc)
+        assert batch.column("tags")[0].as_py() == []
+
+
+class TestParquetDataset:
+
+    def test_partitioned_by_account_and_type(self, tmp_path):
+        assert write_parquet_dataset(_resources(12), str(tmp_path), batch_size=5) == 12
+
+        partitions = sorted(p.relative_to(tmp_path).parent.as_posix() for p in tmp_path.rglob("*.parquet"))
+        assert partitions[0] == "account_id=00000000100/resource_type=AWS%3A%3AEC2%3A%3AInstance"
+        assert len(partitions) == 4
+
+        dataset = open_parquet_dataset(str(tmp_path))
+        table = dataset.to_table()
+        assert table.num_rows == 12
+        assert table.schema.field("account_id").type == pa.string()
+
+        ec2 = dataset.to_table(filter=pc.field("resource_type") == "AWS::EC2::Instance")
+        assert ec2.num_rows == 8
+
+    def test_small_batches_coalesced_into_row_groups(self, tmp_path):
+        write_parquet_dataset(_resources(12), str(tmp_path), batch_size=2, min_rows_per_group=100)
+
+        for path in tmp_path.rglob("*.parquet"):
+            metadata = pq.ParquetFile(str(path)).metadata
+            assert metadata.num_row_groups == 1
+
+    def test_rewrite_replaces_partitions(self, tmp_path):
+        write_parquet_dataset(_resources(12), str(tmp_path), batch_size=1, min_rows_per_group=1)
+        write_parquet_dataset(_resources(12), str(tmp_path))
+
+        assert open_parquet_dataset(str(tmp_path)).to_table().num_rows == 12
+
+    def test_empty_source_writes_nothing(self, tmp_path):
+        assert write_parquet_dataset(iter([]), str(tmp_path / "out")) == 0
+
+
+class TestArrowFile:
+
+    def test_round_trip(self, tmp_path):
+        path = tmp_path / "nested" / "export.arrow"
+        assert write_arrow_file(_resources(7), str(path), batch_size=3) == 7
+
+        with pa.ipc.open_file(str(path)) as reader:
+            assert reader.num_record_batches == 3
+            table = reader.read_all()
+        assert table.num_rows == 7
+        assert table.column("arn")[0].as_py() == "arn:aws:ec2:us-east-1:100:instance/i-000"
@@ -134,3 +134,22 @@ class TestCheckConfigEnabled:
             "DescribeConfigurationRecorders",
         )
         assert client.check_config_enabled() is False
+
+
+class TestSelectResources:
+
+    def test_yields_parsed_items_for_type(self):
+        client = ConfigClient(MagicMock(), region="us-east-1")
+        paginate = client.client.get_paginator.return_value.paginate
+        paginate.return_value = [{"Results": ['{"arn": "arn:aws:s3:::b", "resourceType": "AWS::S3::Bucket"}']}]
+
+        items = list(client.select_resources("AWS::S3::Bucket"))
+
+        assert items == [{"arn": "arn:aws:s3:::b", "resourceType": "AWS::S3::Bucket"}]
+        client.client.get_paginator.assert_called_with("select_resource_config")
+        assert "resourceType = 'AWS::S3::Bucket'" in paginate.call_args.kwargs["Expression"]
+
+    def test_rejects_invalid_type(self):
+        client = ConfigClient(MagicMock(), region="us-east-1")
+        with pytest.raises(ValueError):
+            list(client.select_resources("AWS::S3::Bucket' OR '1'='1"))
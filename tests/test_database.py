@@ -8,6 +8,7 @@ import pytest
 from unittest.mock import MagicMock, patch, PropertyMock
 
 from lib.database import DatabaseClient
+from resource_discovery.error_ledger import ErrorLedger
 
 
 # ===================================================================
@@ -191,6 +192,18 @@ class TestSaveResources:
         client.save_resources(resources)
         mock_cursor.execute.assert_called_once()
 
+    def test_raw_json_properties_passed_through(self):
+        from resource_discovery.models import RawJson
+        client, _, mock_cursor = _make_db_client()
+        raw = '{"InstanceType":"t3.micro"}'
+
+        client.save_resources([{"arn": "arn:aws:ec2:us-east-1:123:instance/i-1",
+                                "resource_type": "AWS::EC2::Instance", "properties": RawJson(raw)}])
+
+        params = mock_cursor.execute.call_args[0][1]
+        assert params[-1] == raw
+        assert params[3:5] == ("us-east-1", "123")
+
     def test_batch_resources(self):
         client, _, mock_cursor = _make_db_client()
 
@@ -278,6 +291,115 @@ class TestDiscoveryRuns:
         assert 150 in params
         assert 12 in params
 
+    def test_prune_resource_changes_keeps_last_runs(self):
+        client, _, mock_cursor = _make_db_client()
+        mock_cursor.rowcount = 42
+
+        assert client.prune_resource_changes(keep_runs=3) == 42
+
+        sql, params = mock_cursor.execute.call_args[0]
+        assert "DELETE FROM resource_changes" in sql
+        assert "status = 'completed'" in sql
+        assert params == (2,)
+
+    def test_save_run_errors_one_row_per_key(self):
+        client, _, mock_cursor = _make_db_client()
+        ledger = ErrorLedger()
+        for region in ("us-east-1", "us-east-1", "eu-west-1"):
+            ledger.record("denied", account_id="111", region=region, source="config", operation="list",
+                          code="AccessDenied")
+
+        assert client.save_run_errors("run-abc-123", ledger) == 2
+
+        sql, rows = mock_cursor.executemany.call_args[0]
+        assert "INSERT INTO discovery_run_errors" in sql
+        # A key saved again (e.g. by a retried run) keeps its first samples and appends the new ones
+        assert "|| EXCLUDED.sample_messages)[1:3]" in sql
+        assert [row[:7] for row in rows] == [
+            ("run-abc-123", "111", "us-east-1", "config", "list", "AccessDenied", 2),
+            ("run-abc-123", "111", "eu-west-1", "config", "list", "AccessDenied", 1),
+        ]
+
+    def test_save_run_errors_empty_ledger(self):
+        client, _, mock_cursor = _make_db_client()
+        assert client.save_run_errors("run-abc-123", ErrorLedger()) == 0
+        mock_cursor.executemany.assert_not_called()
+
+
+class TestSaveResourceBatch:
+
+    def test_copies_rows_then_upserts(self):
+        from resource_discovery.models import ResourceBatch
+        from tests.conftest import make_resource
+        client, _, mock_cursor = _make_db_client()
+        copy = mock_cursor.copy.return_value.__enter__.return_value
+        batch = ResourceBatch.from_resources([make_resource(arn=f"arn:{i}") for i in range(3)])
+
+        client.save_resource_batch(batch, run_id="run-1")
+
+        # Changes the upsert logs are tagged with the run
+        assert mock_cursor.execute.call_args_list[0][0] == (
+            "SELECT set_config('cloudauditor.run_id', %s, true)", ("run-1",)
+        )
+        assert "COPY resources_staging" in mock_cursor.copy.call_args[0][0]
+        assert copy.write_row.call_count == 3
+        upsert = mock_cursor.execute.call_args[0][0]
+        assert "DISTINCT ON" in upsert
+        assert "ON CONFLICT" in upsert
+
+
+# ===================================================================
+# report jobs
+# ===================================================================
+
+class TestReportJobs:
+
+    def test_create_report_job(self):
+        client, _, mock_cursor = _make_db_client()
+
+        client.create_report_job("job-1", {"report_type": "diff"})
+
+        sql, params = mock_cursor.execute.call_args[0]
+        assert "INSERT INTO report_jobs" in sql
+        assert params[0] == "job-1"
+        assert json.loads(params[1]) == {"report_type": "diff"}
+
+    def test_get_report_job_missing(self):
+        client, _, mock_cursor = _make_db_client()
+        mock_cursor.fetchone.return_value = None
+
+        assert client.get_report_job("job-1") is None
+
+    def test_get_report_job_returns_dict(self):
+        client, _, mock_cursor = _make_db_client()
+        mock_cursor.fetchone.return_value = ("job-1", "running", {}, 2000, 1,
+                                             None, None, None, None, None, None, None, None)
+
+        job = client.get_report_job("job-1")
+
+        assert job["status"] == "running"
+        assert job["rows_processed"] == 2000
+        assert job["sheets_completed"] == 1
+
+    def test_start_report_job_claims_only_queued(self):
+        client, _, mock_cursor = _make_db_client()
+        mock_cursor.rowcount = 0
+
+        assert client.start_report_job("job-1") is False
+        assert "status = 'queued'" in mock_cursor.execute.call_args[0][0]
+
+        mock_cursor.rowcount = 1
+        assert client.start_report_job("job-1") is True
+
+    def test_fail_report_job(self):
+        client, _, mock_cursor = _make_db_client()
+
+        client.fail_report_job("job-1", "boom")
+
+        sql, params = mock_cursor.execute.call_args[0]
+        assert "status = 'failed'" in sql
+        assert params == ("boom", "job-1")
+
 
 # ===================================================================
 # Connection management
@@ -304,3 +426,95 @@ class TestConnectionManagement:
 
             conn = client._get_connection()
             assert conn is new_conn
+
+
+# ===================================================================
+# Reader/writer routing
+# ===================================================================
+
+class TestReadOnlyRouting:
+
+    def _client(self, env, read_only=True):
+        base_env = {"DB_HOST": "writer-host", "DB_NAME": "db", "DB_USER": "user", "DB_PORT": "5432"}
+        base_env.update(env)
+        with patch.dict("os.environ", base_env, clear=True), patch("lib.database.boto3"):
+            return DatabaseClient(read_only=read_only)
+
+    def test_read_only_uses_reader_endpoint(self):
+        client = self._client({"DB_READER_HOST": "reader-host"})
+
+        with patch("lib.database.psycopg") as mock_psycopg:
+            client._get_connection()
+
+        kwargs = mock_psycopg.connect.call_args[1]
+        assert kwargs["host"] == "reader-host"
+        assert "default_transaction_read_only=on" in kwargs["options"]
+
+    def test_read_only_without_reader_uses_writer(self):
+        client = self._client({})
+
+        with patch("lib.database.psycopg") as mock_psycopg:
+            client._get_connection()
+
+        assert mock_psycopg.connect.call_args[1]["host"] == "writer-host"
+
+    def test_writer_client_ignores_reader(self):
+        client = self._client({"DB_READER_HOST": "reader-host"}, read_only=False)
+
+        with patch("lib.database.psycopg") as mock_psycopg:
+            client._get_connection()
+
+        kwargs = mock_psycopg.connect.call_args[1]
+        assert kwargs["host"] == "writer-host"
+        assert "options" not in kwargs
+
+    def test_falls_back_to_writer_when_reader_unreachable(self):
+        client = self._client({"DB_READER_HOST": "reader-host"})
+        writer_conn = MagicMock()
+
+        with patch("lib.database.psycopg") as mock_psycopg:
+            mock_psycopg.connect.side_effect = [Exception("reader down"), writer_conn]
+            conn = client._get_connection()
+
+        assert conn is writer_conn
+        assert mock_psycopg.connect.call_args[1]["host"] == "writer-host"
+
+    def test_connection_kwargs_for_cli_config(self):
+        from lib.database import connection_kwargs
+        config = {"host": "w", "reader_host": "r", "port": 5432, "dbname": "d", "user": "u", "password": "p"}
+
+        assert connection_kwargs(config)["host"] == "w"
+        assert connection_kwargs(config, read_only=True)["host"] == "r"
+        assert "reader_host" not in connection_kwargs(config, read_only=True)
+
+
+# ===================================================================
+# stream_query
+# ===================================================================
+
+class TestStreamQuery:
+
+    def _conn_with_rows(self, rows):
+        mock_cursor = MagicMock()
+        mock_cursor.__iter__.return_value = iter(rows)
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+        return mock_conn, mock_cursor
+
+    def test_yields_bounded_chunks(self):
+        from lib.database import stream_query
+        mock_conn, mock_cursor = self._conn_with_rows([(i,) for i in range(5)])
+
+        chunks = list(stream_query(mock_conn, "SELECT 1", itersize=2))
+
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        assert mock_cursor.itersize == 2
+
+    def test_uses_named_cursor_in_transaction(self):
+        from lib.database import stream_query
+        mock_conn, _ = self._conn_with_rows([])
+
+        assert list(stream_query(mock_conn, "SELECT 1", name="my_cursor")) == []
+        mock_conn.cursor.assert_called_once_with(name="my_cursor")
+        mock_conn.transaction.assert_called_once()
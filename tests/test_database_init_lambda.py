@@ -159,3 +159,49 @@ class TestSendResponse:
         body = json.loads(call_args[1]["body"])
         assert body["Status"] == "SUCCESS"
         assert body["StackId"] == "stack-123"
+
+
+class TestSyncPropertyIndexes:
+
+    def test_creates_missing_and_drops_stale(self):
+        from database_init.app import sync_property_indexes, property_index_name
+        cursor = MagicMock()
+        wanted = property_index_name("AWS::EC2::Instance", "InstanceType")
+        cursor.fetchall.return_value = [("idx_resprop_stale", True)]
+
+        created, dropped = sync_property_indexes(cursor, {"AWS::EC2::Instance": ["InstanceType"]})
+
+        assert created == [wanted]
+        assert dropped == ["idx_resprop_stale"]
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert any("DROP INDEX CONCURRENTLY" in s and "idx_resprop_stale" in s for s in statements)
+        create_sql = next(s for s in statements if "CREATE INDEX CONCURRENTLY" in s)
+        assert "((properties->>'InstanceType'))" in create_sql
+        assert "WHERE resource_type = 'AWS::EC2::Instance'" in create_sql
+
+    def test_rebuilds_invalid_and_keeps_valid(self):
+        from database_init.app import sync_property_indexes, property_index_name
+        cursor = MagicMock()
+        valid = property_index_name("AWS::RDS::DBInstance", "Engine")
+        invalid = property_index_name("AWS::EC2::Instance", "InstanceType")
+        cursor.fetchall.return_value = [(valid, True), (invalid, False)]
+
+        created, dropped = sync_property_indexes(
+            cursor, {"AWS::RDS::DBInstance": ["Engine"], "AWS::EC2::Instance": ["InstanceType"]}
+        )
+
+        assert created == [invalid]
+        assert dropped == [invalid]
+
+    def test_index_name_fits_postgres_limit(self):
+        from database_init.app import property_index_name
+        name = property_index_name("AWS::ElasticLoadBalancingV2::LoadBalancer", "LoadBalancerAttributes.Key")
+        assert len(name) <= 63
+        assert name.startswith("idx_resprop_")
+
+    def test_registry_rejects_unsafe_entries(self, tmp_path):
+        from database_init.app import load_property_index_registry
+        path = tmp_path / "registry.json"
+        path.write_text(json.dumps({"AWS::EC2::Instance": ["x'); DROP TABLE resources; --"]}))
+        with pytest.raises(ValueError):
+            load_property_index_registry(str(path))
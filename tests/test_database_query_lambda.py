@@ -140,6 +140,21 @@ class TestDatabaseQueryLambda:
         body = json.loads(response["body"])
         assert body["results"]["count"] == 1
 
+    @patch("database_query_lambda.DatabaseClient")
+    def test_list_reports_keep_their_limit_handling(self, mock_db_cls, mock_context):
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = []
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_db_cls.return_value._get_connection.return_value = mock_conn
+
+        handler = _import_handler()
+        response = handler({"report_type": "by_type", "limit": 20000}, mock_context)
+
+        assert response["statusCode"] == 200
+        assert mock_cursor.execute.call_args[0][1][-1] == 20000
+
     @patch("database_query_lambda.DatabaseClient")
     def test_custom_query(self, mock_db_cls, mock_context):
         mock_cursor = MagicMock()
@@ -174,6 +189,32 @@ class TestDatabaseQueryLambda:
         body = json.loads(response["body"])
         assert "error" in body
 
+    @patch("database_query_lambda.DatabaseClient")
+    def test_custom_dml_query_uses_writable_connection(self, mock_db_cls, mock_context):
+        mock_cursor = MagicMock()
+        mock_cursor.description = None
+        mock_cursor.rowcount = 3
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_db_cls.return_value._get_connection.return_value = mock_conn
+
+        handler = _import_handler()
+        response = handler({"query": "DELETE FROM resources WHERE region = ''"}, mock_context)
+
+        assert response["statusCode"] == 200
+        mock_db_cls.assert_called_once_with(read_only=False)
+        mock_cursor.fetchall.assert_not_called()
+        assert json.loads(response["body"])["results"]["row_count"] == 3
+
+    @patch("database_query_lambda.DatabaseClient")
+    def test_canned_reports_use_reader(self, mock_db_cls, mock_context):
+        mock_db_cls.side_effect = Exception("Connection failed")
+
+        _import_handler()({"report_type": "summary"}, mock_context)
+
+        mock_db_cls.assert_called_once_with(read_only=True)
+
     @patch("database_query_lambda.DatabaseClient")
     def test_exception_returns_500(self, mock_db_cls, mock_context):
         mock_db_cls.side_effect = Exception("Connection failed")
@@ -210,3 +251,166 @@ class TestDatabaseQueryLambda:
         sql_calls = [c[0][0] for c in execute_calls]
         # At least one query should contain the IN clause
         assert any("IN" in sql for sql in sql_calls)
+
+    @patch("database_query_lambda.DatabaseClient")
+    def test_search_report_paginates(self, mock_db_cls, mock_context):
+        mock_cursor = MagicMock()
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+
+        # limit=2 → handler fetches 3 rows to detect another page
+        mock_cursor.fetchall.return_value = [
+            ("111", "global", "AWS::S3::Bucket", "logs-bucket", "arn:aws:s3:::logs-bucket", "logs-bucket", 0.9),
+            ("111", "global", "AWS::S3::Bucket", "logs-archive", "arn:aws:s3:::logs-archive", "logs-archive", 0.5),
+            ("222", "global", "AWS::S3::Bucket", "app-logs", "arn:aws:s3:::app-logs", "app-logs", 0.3),
+        ]
+
+        mock_db = MagicMock()
+        mock_db._get_connection.return_value = mock_conn
+        mock_db_cls.return_value = mock_db
+
+        handler = _import_handler()
+        response = handler({"report_type": "search", "search": "logs_", "limit": 2}, mock_context)
+
+        assert response["statusCode"] == 200
+        results = json.loads(response["body"])["results"]
+        assert results["count"] == 2
+        assert results["has_more"] is True
+        assert results["resources"][0]["arn"] == "arn:aws:s3:::logs-bucket"
+
+        sql, params = mock_cursor.execute.call_args[0]
+        assert "ILIKE" in sql
+        assert "search_vector @@" in sql
+        # LIKE wildcards in the term are escaped, limit is over-fetched by one
+        assert "%logs\\_%" in params
+        assert params[-2:] == [3, 0]
+
+    @pytest.mark.parametrize("params", [
+        {"offset": "abc"},
+        {"offset": -1},
+        {"offset": 1.5},
+        {"offset": 10 ** 9},
+        {"limit": 0},
+        {"limit": "ten"},
+    ])
+    @patch("database_query_lambda.DatabaseClient")
+    def test_search_rejects_invalid_paging(self, mock_db_cls, mock_context, params):
+        handler = _import_handler()
+        response = handler({"report_type": "search", "search": "logs", **params}, mock_context)
+
+        assert response["statusCode"] == 400
+        assert next(iter(params)) in json.loads(response["body"])["error"]
+        mock_db_cls.assert_not_called()
+
+    @patch("database_query_lambda.DatabaseClient")
+    def test_search_accepts_numeric_string_offset(self, mock_db_cls, mock_context):
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = []
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_db_cls.return_value._get_connection.return_value = mock_conn
+
+        handler = _import_handler()
+        response = handler({"report_type": "search", "search": "logs", "offset": "20"}, mock_context)
+
+        assert response["statusCode"] == 200
+        assert mock_cursor.execute.call_args[0][1][-1] == 20
+
+    @patch("database_query_lambda.DatabaseClient")
+    def test_search_requires_term(self, mock_db_cls, mock_context):
+        mock_db_cls.return_value = MagicMock()
+
+        handler = _import_handler()
+        response = handler({"report_type": "search"}, mock_context)
+
+        assert response["statusCode"] == 400
+
+    @patch("database_query_lambda.DatabaseClient")
+    def test_resources_property_filter(self, mock_db_cls, mock_context):
+        mock_cursor = MagicMock()
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_cursor.fetchall.return_value = []
+
+        mock_db = MagicMock()
+        mock_db._get_connection.return_value = mock_conn
+        mock_db_cls.return_value = mock_db
+
+        handler = _import_handler()
+        response = handler({
+            "report_type": "resources",
+            "resource_type": "AWS::EC2::Instance",
+            "properties": {"InstanceType": "t3.micro"},
+            "limit": 10,
+        }, mock_context)
+
+        assert response["statusCode"] == 200
+        sql, params = mock_cursor.execute.call_args[0]
+        assert "resource_type = 'AWS::EC2::Instance'" in sql
+        assert "(properties->>'InstanceType') = %s" in sql
+        assert params == ["t3.micro", 10]
+
+    @patch("database_query_lambda.DatabaseClient")
+    def test_resources_property_filter_requires_type(self, mock_db_cls, mock_context):
+        mock_db_cls.return_value = MagicMock()
+
+        handler = _import_handler()
+        response = handler({"report_type": "resources", "properties": {"Engine": "postgres"}}, mock_context)
+
+        assert response["statusCode"] == 400
+
+    @patch("database_query_lambda.DatabaseClient")
+    def test_resources_empty_property_list_rejected(self, mock_db_cls, mock_context):
+        mock_db_cls.return_value = MagicMock()
+
+        handler = _import_handler()
+        response = handler({"report_type": "resources", "resource_type": "AWS::RDS::DBInstance",
+                            "properties": {"Engine": []}}, mock_context)
+
+        assert response["statusCode"] == 400
+        assert "empty list" in json.loads(response["body"])["error"]
+
+    @patch("database_query_lambda.DatabaseClient")
+    def test_dashboard_single_grouping_sets_pass(self, mock_db_cls, mock_context):
+        mock_cursor = MagicMock()
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+
+        scan = datetime(2026, 3, 30)
+        mock_cursor.fetchall.return_value = [
+            ("111", "AWS::EC2::Instance", None, 0b001, 5, scan),
+            ("111", "AWS::S3::Bucket", None, 0b001, 2, scan),
+            ("222", "AWS::EC2::Instance", None, 0b001, 3, scan),
+            ("111", None, None, 0b011, 7, scan),
+            ("222", None, None, 0b011, 3, scan),
+            (None, "AWS::EC2::Instance", None, 0b101, 8, scan),
+            (None, "AWS::S3::Bucket", None, 0b101, 2, scan),
+            (None, None, "us-east-1", 0b110, 10, scan),
+            (None, None, None, 0b111, 10, scan),
+        ]
+        mock_cursor.fetchone.return_value = (4,)
+
+        mock_db = MagicMock()
+        mock_db._get_connection.return_value = mock_conn
+        mock_db_cls.return_value = mock_db
+
+        handler = _import_handler()
+        response = handler({"report_type": "dashboard"}, mock_context)
+
+        assert response["statusCode"] == 200
+        results = json.loads(response["body"])["results"]
+        assert results["summary"]["total_resources"] == 10
+        assert results["summary"]["unique_resource_types"] == 2
+        assert results["summary"]["accounts_with_resources"] == 2
+        assert results["summary"]["monitored_accounts"] == 4
+        assert results["by_account"][0] == {"account_id": "111", "resource_count": 7, "resource_types": 2}
+        assert results["by_region"] == [{"region": "us-east-1", "count": 10}]
+        assert len(results["by_account_type"]) == 3
+
+        resource_queries = [c[0][0] for c in mock_cursor.execute.call_args_list if "FROM resources" in c[0][0]]
+        assert len(resource_queries) == 1
+        assert "GROUPING SETS" in resource_queries[0]
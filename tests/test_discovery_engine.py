@@ -4,10 +4,13 @@ Unit tests for resource_discovery.discovery_engine
 Tests the orchestration logic: method selection, fallback, deduplication,
 filtering, and summary generation.
 """
+import json
 import pytest
 from unittest.mock import MagicMock, patch, PropertyMock
 
+from resource_discovery.config_client import ConfigClient
 from resource_discovery.discovery_engine import ResourceDiscoveryEngine
+from resource_discovery.merge import ResourceMergeStore
 from resource_discovery.models import (
     Resource,
     DiscoveryConfig,
@@ -72,6 +75,12 @@ class TestGetResourceSummary:
         counts = list(summary.values())
         assert counts == sorted(counts, reverse=True)
 
+    def test_batch_matches_list(self, sample_discovery_result):
+        engine = _make_engine()
+        expected = engine.get_resource_summary(sample_discovery_result)
+        sample_discovery_result.to_batch()
+        assert engine.get_resource_summary(sample_discovery_result) == expected
+
 
 # ===================================================================
 # discover_all_resources – orchestration
@@ -129,25 +138,130 @@ class TestDiscoverAllResources:
         assert result.total_count == 6
         engine._discover_via_config.assert_called_once()
 
+    def test_config_enriches_re_resources(self):
+        """Config fields merge into the RE copy of the same ARN instead of being dropped."""
+        engine = _make_engine(has_re=True, has_config=True, is_aggregator=True)
+        arn = "arn:aws:ec2:us-east-1:123:i/i-0"
+        engine._discover_via_resource_explorer = MagicMock(return_value=[
+            make_resource(arn=arn, tags={"Name": "web"}, relationships=[])
+        ])
+        engine._discover_via_config = MagicMock(return_value=[
+            make_resource(arn=arn, tags={}, relationships=["sg-1"], source=DiscoverySource.CONFIG)
+        ])
+        engine.session.client.return_value.get_caller_identity.return_value = {"Account": "123"}
+
+        result = engine.discover_all_resources()
+
+        assert result.total_count == 1
+        assert result.resources[0].tags == {"Name": "web"}
+        assert result.resources[0].relationships == ["sg-1"]
+
+    def test_memory_budget_spills_result(self):
+        """Past the memory budget the result is spilled to disk but still fully iterable."""
+        engine = _make_engine(config=DiscoveryConfig(memory_budget_mb=0), has_re=True, is_aggregator=True)
+        engine._discover_via_resource_explorer = MagicMock(return_value=[
+            make_resource(arn=f"arn:aws:ec2:us-east-1:123:i/i-{i}") for i in range(3)
+        ])
+        engine.session.client.return_value.get_caller_identity.return_value = {"Account": "123"}
+
+        result = engine.discover_all_resources()
+
+        assert result.spill_files
+        assert result.total_count == 3
+        assert len(list(result.iter_resources())) == 3
+        assert engine.get_resource_summary(result) == {"AWS::EC2::Instance": 3}
+        result.discard_spill()
+
+    def test_memory_budget_bounds_merge_store(self, monkeypatch):
+        """Sources are merged page by page and the store spills, so it never holds the whole account."""
+        monkeypatch.setattr("resource_discovery.merge.SPILL_CHECK_ROWS", 10)
+        peak = []
+
+        class RecordingStore(ResourceMergeStore):
+            def add(self, resource):
+                added = super().add(resource)
+                peak.append(len(self))
+                return added
+
+        monkeypatch.setattr("resource_discovery.discovery_engine.ResourceMergeStore", RecordingStore)
+        engine = _make_engine(config=DiscoveryConfig(memory_budget_mb=0), has_re=True, is_aggregator=True)
+        engine._discover_via_resource_explorer = MagicMock(return_value=(
+            make_resource(arn=f"arn:aws:ec2:us-east-1:123:i/i-{i}") for i in range(100)
+        ))
+
+        result = engine.discover_all_resources(account_id="123")
+
+        assert max(peak) < 10
+        assert result.total_count == 100
+        assert len({r.arn for r in result.iter_resources()}) == 100
+        result.discard_spill()
+
+    def test_account_less_resources_get_discovered_account(self):
+        """S3 ARNs carry no account; their rows must not reach the database with account_id=''."""
+        engine = _make_engine(has_re=True, is_aggregator=True)
+        engine._discover_via_resource_explorer = MagicMock(return_value=[
+            make_resource(arn="arn:aws:s3:::bucket", resource_type="s3:bucket", region="global", account_id=""),
+        ])
+
+        result = engine.discover_all_resources(account_id="123")
+
+        assert [r.account_id for r in result.resources] == ["123"]
+
     def test_config_skipped_when_re_has_enough(self):
-        """If RE returns ≥10, Config should NOT be called."""
+        """By default Config is only a fallback for when RE finds little."""
         engine = _make_engine(has_re=True, has_config=True, is_aggregator=True)
+        engine._discover_via_resource_explorer = MagicMock(return_value=[
+            make_resource(arn=f"arn:aws:ec2:us-east-1:123:i/i-{i}") for i in range(15)
+        ])
+        engine._discover_via_config = MagicMock(return_value=[])
+        engine.session.client.return_value.get_caller_identity.return_value = {"Account": "123"}
 
-        resources = [
-            make_resource(arn=f"arn:aws:ec2:us-east-1:123:i/i-{i}")
-            for i in range(15)
-        ]
-        engine._discover_via_resource_explorer = MagicMock(return_value=resources)
+        result = engine.discover_all_resources()
 
-        sts_client = MagicMock()
-        sts_client.get_caller_identity.return_value = {"Account": "123"}
-        engine.session.client.return_value = sts_client
+        assert result.total_count == 15
+        engine._discover_via_config.assert_not_called()
+
+    def test_config_enrichment_runs_when_re_has_enough(self):
+        """With config_enrichment, Config enriches RE results even when RE found plenty."""
+        engine = _make_engine(config=DiscoveryConfig(config_enrichment=True),
+                              has_re=True, has_config=True, is_aggregator=True)
+        engine._discover_via_resource_explorer = MagicMock(return_value=[
+            make_resource(arn=f"arn:aws:ec2:us-east-1:123:i/i-{i}") for i in range(15)
+        ])
+        engine._discover_via_config = MagicMock(return_value=[])
+        engine.session.client.return_value.get_caller_identity.return_value = {"Account": "123"}
 
         result = engine.discover_all_resources()
 
         assert result.total_count == 15
-        assert not hasattr(engine, '_discover_via_config') or \
-            not getattr(engine._discover_via_config, 'called', False)
+        engine._discover_via_config.assert_called_once()
+
+    def test_config_items_merge_into_resource_explorer_entries(self):
+        """The same ARN from RE and Config becomes one Resource carrying Config's fields."""
+        arn = "arn:aws:ec2:us-east-1:123:instance/i-0"
+        config = DiscoveryConfig(include_types=["AWS::EC2::Instance"])
+        engine = _make_engine(config=config, has_re=True, is_aggregator=True)
+        engine._discover_via_resource_explorer = MagicMock(return_value=[
+            make_resource(arn=arn, resource_type="ec2:instance", tags={"Name": "web"}, configuration={},
+                          relationships=[], created_at=None)
+        ])
+        engine.config_client = ConfigClient(MagicMock(), region="us-east-1")
+        engine.config_client.client.get_paginator.return_value.paginate.return_value = [{"Results": [json.dumps({
+            "arn": arn, "resourceType": "AWS::EC2::Instance", "resourceId": "i-0", "accountId": "123",
+            "awsRegion": "us-east-1", "resourceCreationTime": "2026-01-01T00:00:00Z",
+            "configuration": {"instanceType": "t3.micro"},
+            "relationships": [{"resourceId": "sg-1", "resourceType": "AWS::EC2::SecurityGroup"}],
+            "tags": [{"key": "Name", "value": "web-config"}],
+        })]}]
+
+        result = engine.discover_all_resources(account_id="123")
+
+        [resource] = result.resources
+        assert resource.source == DiscoverySource.RESOURCE_EXPLORER
+        assert resource.tags == {"Name": "web"}  # RE wins tags
+        assert resource.configuration == {"instanceType": "t3.micro"}
+        assert resource.relationships == ["sg-1"]
+        assert resource.created_at == "2026-01-01T00:00:00Z"
 
     def test_type_filtering_applied(self):
         """Resources should be filtered by include_types/exclude_types."""
@@ -189,6 +303,21 @@ class TestDiscoverAllResources:
         assert result.success is False
         assert any("Resource Explorer" in e for e in result.errors)
 
+    def test_type_failures_counted_without_failing_run(self):
+        """Per-type listing failures go to the error ledger, not result.errors."""
+        config = DiscoveryConfig(include_types=["AWS::S3::Bucket", "AWS::SQS::Queue"], use_cloud_control=True)
+        engine = _make_engine(config=config, has_cc=True)
+        engine.cloud_control.region = "us-east-1"
+        engine.cloud_control.list_resources.side_effect = Exception("Rate exceeded")
+
+        result = engine.discover_all_resources(account_id="123")
+
+        assert result.success is True
+        assert result.errors == []
+        [(key, entry)] = list(result.error_ledger)
+        assert key == ("123", "us-east-1", "cloud_control", "list_resources", "Exception")
+        assert entry.count == 2
+
     def test_account_id_auto_detection_failure(self):
         """If STS fails, should return error result."""
         engine = _make_engine()
@@ -215,6 +344,61 @@ class TestDiscoverAllResources:
         engine.discover_organization_resources.assert_called_once_with(["111", "222"])
 
 
+class TestFilterPushdown:
+
+    def test_resource_explorer_query_filtered(self):
+        config = DiscoveryConfig(exclude_types=["AWS::IAM::Role"], regions=["us-east-1"])
+        engine = _make_engine(config=config, has_re=True, is_aggregator=True)
+        engine.resource_explorer.list_all_resources.return_value = iter([])
+
+        list(engine._discover_via_resource_explorer("123"))
+
+        engine.resource_explorer.list_all_resources.assert_called_once_with(filters={
+            "exclude_types": ["iam:role"],
+            "regions": ["us-east-1", "global"],
+        })
+
+    def test_nothing_included_skips_resource_explorer(self):
+        config = DiscoveryConfig(include_types=["AWS::IAM::Role"], exclude_types=["AWS::IAM::Role"])
+        engine = _make_engine(config=config, has_re=True, is_aggregator=True)
+
+        assert list(engine._discover_via_resource_explorer("123")) == []
+        engine.resource_explorer.list_all_resources.assert_not_called()
+
+    def test_resource_explorer_types_match_config_filter(self):
+        """An include list in CloudFormation names keeps Resource Explorer's resources."""
+        config = DiscoveryConfig(include_types=["AWS::EC2::Instance"], use_config=False)
+        engine = _make_engine(config=config, has_re=True, is_aggregator=True)
+        engine._discover_via_resource_explorer = MagicMock(return_value=[
+            make_resource(arn="arn:aws:ec2:us-east-1:123:instance/i-1", resource_type="ec2:instance"),
+            make_resource(arn="arn:aws:ec2:us-east-1:123:volume/vol-1", resource_type="ec2:volume"),
+        ])
+
+        result = engine.discover_all_resources(account_id="123")
+
+        assert [r.resource_type for r in result.resources] == ["ec2:instance"]
+
+    def test_config_lists_only_included_types(self):
+        config = DiscoveryConfig(include_types=["AWS::S3::Bucket"])
+        engine = _make_engine(config=config, has_config=True)
+        engine.config_client.select_resources.return_value = iter([])
+
+        list(engine._discover_via_config("123"))
+
+        engine.config_client.list_supported_resource_types.assert_not_called()
+        engine.config_client.select_resources.assert_called_once_with("AWS::S3::Bucket")
+
+    def test_cloud_control_skips_excluded_types(self):
+        config = DiscoveryConfig(exclude_types=["AWS::EC2::Instance"])
+        engine = _make_engine(config=config, has_cc=True)
+        engine.cloud_control.list_supported_resource_types.return_value = ["AWS::EC2::Instance", "AWS::S3::Bucket"]
+        engine.cloud_control.list_resources.return_value = iter([])
+
+        list(engine._discover_via_cloud_control("123"))
+
+        engine.cloud_control.list_resources.assert_called_once_with("AWS::S3::Bucket")
+
+
 # ===================================================================
 # _initialize_regions
 # ===================================================================
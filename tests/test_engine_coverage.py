@@ -60,7 +60,7 @@ class TestLocalIndexMultiRegion:
             )
             mock_re_cls.return_value = regional_client
 
-            resources = engine._discover_via_resource_explorer("123")
+            resources = list(engine._discover_via_resource_explorer("123"))
 
             # Should have created a client for each region
             assert mock_re_cls.call_count == 3
@@ -84,7 +84,7 @@ class TestLocalIndexMultiRegion:
             regional_client.convert_to_resource.return_value = make_resource(account_id="123")
             mock_re_cls.return_value = regional_client
 
-            resources = engine._discover_via_resource_explorer("123")
+            resources = list(engine._discover_via_resource_explorer("123"))
 
             # Should only get resources from the region with an index
             assert len(resources) == 1
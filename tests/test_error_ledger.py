@@ -0,0 +1,109 @@
+"""
+Unit tests for resource_discovery.error_ledger
+"""
+from botocore.exceptions import ClientError
+
+from resource_discovery.error_ledger import (
+    ACCOUNT_OPERATION,
+    OVERFLOW_CODE,
+    ErrorKey,
+    ErrorLedger,
+    error_code,
+)
+from resource_discovery.models import DiscoverySource
+from tests.conftest import make_discovery_result
+
+
+def _client_error(code="AccessDeniedException"):
+    return ClientError({"Error": {"Code": code, "Message": "no"}}, "ListResources")
+
+
+class TestErrorCode:
+
+    def test_client_error_code(self):
+        assert error_code(_client_error("ThrottlingException")) == "ThrottlingException"
+
+    def test_exception_class_name(self):
+        assert error_code(TimeoutError("slow")) == "TimeoutError"
+        assert error_code("plain message") == "Error"
+
+
+class TestErrorLedger:
+
+    def test_repeats_counted_under_one_key(self):
+        ledger = ErrorLedger(max_samples=2)
+        for i in range(5):
+            ledger.record(_client_error(), account_id="111", region="us-east-1",
+                          source=DiscoverySource.CONFIG, operation="list_discovered_resources")
+
+        [(key, entry)] = list(ledger)
+        assert key == ErrorKey("111", "us-east-1", "config", "list_discovered_resources", "AccessDeniedException")
+        assert entry.count == 5
+        assert len(entry.samples) == 2
+        assert entry.first_seen <= entry.last_seen
+        assert ledger.total == 5
+
+    def test_keys_bounded(self):
+        ledger = ErrorLedger(max_keys=2)
+        for region in ("us-east-1", "us-west-2", "eu-west-1", "ap-south-1"):
+            ledger.record("boom", account_id="111", region=region)
+
+        assert len(ledger) == 3
+        assert dict((key.error_code, entry.count) for key, entry in ledger)[OVERFLOW_CODE] == 2
+        assert ledger.total == 4
+
+    def test_merge(self):
+        first, second = ErrorLedger(), ErrorLedger()
+        first.record("a", account_id="111", code="X")
+        second.record("b", account_id="111", code="X")
+        second.record("c", account_id="222", code="Y")
+
+        first.merge(second)
+
+        assert first.by_account() == {"111": 2, "222": 1}
+
+    def test_failed_accounts(self):
+        ledger = ErrorLedger()
+        ledger.record("Failed to discover account 111: denied", account_id="111", operation=ACCOUNT_OPERATION)
+        ledger.record("throttled", account_id="222", operation="search")
+        assert ledger.failed_accounts() == {"111": "Failed to discover account 111: denied"}
+
+    def test_failed_accounts_report_latest_message(self):
+        ledger = ErrorLedger(max_samples=2)
+        for attempt in range(4):
+            ledger.record(f"attempt {attempt}: denied", account_id="111", operation=ACCOUNT_OPERATION)
+        assert ledger.failed_accounts() == {"111": "attempt 3: denied"}
+
+        later = ErrorLedger()
+        later.record("attempt 4: expired token", account_id="111", operation=ACCOUNT_OPERATION)
+        ledger.merge(later)
+        assert ledger.failed_accounts() == {"111": "attempt 4: expired token"}
+
+    def test_summary_most_frequent_first(self):
+        ledger = ErrorLedger()
+        ledger.record("a", code="Rare")
+        ledger.record("b", code="Common")
+        ledger.record("b", code="Common")
+        assert [row["error_code"] for row in ledger.summary()] == ["Common", "Rare"]
+
+
+class TestDiscoveryResultErrors:
+
+    def test_add_error_records_cause(self):
+        result = make_discovery_result()
+        result.add_error("Config discovery failed: no", _client_error("NoSuchConfigurationRecorderException"),
+                         account_id="111", source=DiscoverySource.CONFIG, operation="discover")
+
+        assert result.success is False
+        assert result.errors == ["Config discovery failed: no"]
+        [(key, _)] = list(result.error_ledger)
+        assert key.error_code == "NoSuchConfigurationRecorderException"
+
+    def test_add_result_merges_ledgers(self):
+        total = make_discovery_result(resources=[])
+        account = make_discovery_result(resources=[])
+        account.error_ledger.record("throttled", account_id="111", code="ThrottlingException")
+
+        total.add_result(account)
+
+        assert total.error_ledger.by_account() == {"111": 1}
@@ -74,45 +74,6 @@ class TestGenerateReport:
         assert os.path.getsize(path) > 0
 
 
-# ===================================================================
-# _create_summary_stats
-# ===================================================================
-
-class TestCreateSummaryStats:
-
-    def test_summary_has_header_rows(self, generator, sample_resources):
-        import pandas as pd
-        data = [r.to_dict() for r in sample_resources]
-        df = pd.DataFrame(data)
-
-        summary = generator._create_summary_stats(df)
-
-        # First two rows should be the header (Total Accounts, Total Resources)
-        assert summary.iloc[0]["resource_type"] == "Total Accounts"
-        assert summary.iloc[1]["resource_type"] == "Total Resources"
-
-    def test_summary_total_resources_correct(self, generator, sample_resources):
-        import pandas as pd
-        data = [r.to_dict() for r in sample_resources]
-        df = pd.DataFrame(data)
-
-        summary = generator._create_summary_stats(df)
-
-        total_row = summary[summary["resource_type"] == "Total Resources"]
-        assert total_row.iloc[0]["count"] == len(sample_resources)
-
-    def test_summary_total_accounts_correct(self, generator, sample_resources):
-        import pandas as pd
-        data = [r.to_dict() for r in sample_resources]
-        df = pd.DataFrame(data)
-
-        summary = generator._create_summary_stats(df)
-
-        accounts_row = summary[summary["resource_type"] == "Total Accounts"]
-        # sample_resources has 2 unique accounts (123456789012, 987654321098)
-        assert accounts_row.iloc[0]["count"] == 2
-
-
 # ===================================================================
 # Sheet structure (verify Excel internals)
 # ===================================================================
@@ -138,6 +99,27 @@ class TestSheetStructure:
         # At minimum, should have Executive Summary + at least 1 service tab
         assert len(sheet_names) >= 2
 
+    def test_one_tab_per_service_with_all_rows(self, generator):
+        """Every service gets exactly its own rows, in alphabetical tab order."""
+        import openpyxl
+        resources = [
+            make_resource(arn=f"arn:aws:svc{i % 120:03d}:us-east-1:123:r/{i}",
+                          resource_type=f"svc{i % 120:03d}:thing")
+            for i in range(360)
+        ]
+        resources.append(make_resource(arn="arn:aws:plain", resource_type="plain"))
+        path = generator.generate_report(make_discovery_result(resources=resources, total_count=len(resources)))
+        wb = openpyxl.load_workbook(path, read_only=True)
+
+        service_tabs = wb.sheetnames[1:]
+        assert service_tabs == sorted(service_tabs)
+        assert len(service_tabs) == 121
+        assert len(list(wb["SVC007"].values)) == 4  # header + 3 rows
+        assert len(list(wb["PLAIN"].values)) == 2
+        header = [c.value for c in next(wb["SVC007"].iter_rows(max_row=1))]
+        assert "service" not in header
+        assert header[0] == "arn"
+
     def test_sheet_name_truncation(self, generator):
         """Sheet names over 31 chars should be truncated."""
         long_type_resource = make_resource(
@@ -153,3 +135,125 @@ class TestSheetStructure:
         wb = openpyxl.load_workbook(path)
         for name in wb.sheetnames:
             assert len(name) <= 31
+
+
+# ===================================================================
+# resources_frame
+# ===================================================================
+
+class TestResourcesFrame:
+
+    def test_declared_dtypes(self):
+        import pandas as pd
+        from reporting.excel_generator import resources_frame
+        df = resources_frame([make_resource(), make_resource(region="eu-west-1")])
+
+        for col in ("resource_type", "region", "account_id", "discovery_source"):
+            assert isinstance(df[col].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_datetime64_dtype(df["created_at"])
+        assert df["created_at"].isna().all()
+
+    def test_timestamps_converted_to_naive_utc(self):
+        from datetime import timezone, timedelta
+        from reporting.excel_generator import resources_frame
+        aware = datetime(2026, 3, 30, 12, tzinfo=timezone(timedelta(hours=2)))
+        df = resources_frame([make_resource(created_at=aware, last_modified=datetime(2026, 3, 30, 8))])
+
+        assert df["created_at"][0] == datetime(2026, 3, 30, 10)
+        assert df["last_modified"][0] == datetime(2026, 3, 30, 8)
+
+    def test_text_fields_not_coerced(self):
+        """Numeric-looking IDs and nested blobs must survive untouched (no datetime guessing)."""
+        import json
+        from reporting.excel_generator import resources_frame
+        df = resources_frame([make_resource(account_id="000000000001", name="20260330",
+                                            configuration={"LaunchTime": "2026-03-30T12:00:00Z"})])
+
+        assert df["account_id"][0] == "000000000001"
+        assert df["name"][0] == "20260330"
+        assert json.loads(df["configuration"][0]) == {"LaunchTime": "2026-03-30T12:00:00Z"}
+        assert df["relationships"][0] == "[]"
+
+    def test_empty(self):
+        from reporting.excel_generator import resources_frame
+        assert resources_frame([]).empty
+
+    def test_batch_matches_object_frame(self, sample_resources):
+        import pandas as pd
+        from resource_discovery.models import ResourceBatch
+        from reporting.excel_generator import resources_frame
+        expected = resources_frame(sample_resources)
+        df = resources_frame(ResourceBatch.from_resources(sample_resources))
+
+        assert list(df.columns) == list(expected.columns)
+        pd.testing.assert_frame_equal(df.astype(str), expected.astype(str))
+        assert isinstance(df["region"].dtype, pd.CategoricalDtype)
+
+
+# ===================================================================
+# generate_streaming_report
+# ===================================================================
+
+class TestGenerateStreamingReport:
+
+    def test_matches_generate_report_layout(self, generator, populated_result):
+        import openpyxl
+        eager = openpyxl.load_workbook(generator.generate_report(populated_result, filename="eager.xlsx"))
+        streamed = openpyxl.load_workbook(
+            generator.generate_streaming_report(iter(populated_result.resources), filename="streamed.xlsx")
+        )
+
+        assert streamed.sheetnames == eager.sheetnames
+        for name in eager.sheetnames[1:]:
+            assert streamed[name].max_row == eager[name].max_row
+            assert [c.value for c in streamed[name][1]] == [c.value for c in eager[name][1]]
+
+    def test_summary_counts(self, generator, sample_resources):
+        import openpyxl
+        path = generator.generate_streaming_report(sample_resources)
+        rows = list(openpyxl.load_workbook(path)["Executive Summary"].values)
+
+        assert rows[1] == ("REPORT SUMMARY", "Total Accounts", 2)
+        assert rows[2] == ("REPORT SUMMARY", "Total Resources", len(sample_resources))
+
+    def test_nested_fields_serialized(self, generator):
+        import json
+        import openpyxl
+        resource = make_resource(resource_type="ec2:instance", tags={"Team": "core"})
+        path = generator.generate_streaming_report([resource])
+        sheet = openpyxl.load_workbook(path)["EC2"]
+        header = [c.value for c in sheet[1]]
+
+        assert json.loads(sheet.cell(row=2, column=header.index("tags") + 1).value) == {"Team": "core"}
+
+    def test_empty_iterator_returns_empty_string(self, generator):
+        assert generator.generate_streaming_report(iter([])) == ""
+
+
+# ===================================================================
+# generate_diff_report
+# ===================================================================
+
+class TestGenerateDiffReport:
+
+    def test_changes_split_by_type(self, generator):
+        import openpyxl
+        base = {"run_id": "run-1", "completed_at": datetime(2026, 3, 29, 3)}
+        target = {"run_id": "run-2", "completed_at": datetime(2026, 3, 30, 3)}
+        changes = [
+            {"change_type": "added", "account_id": "123", "region": "us-east-1",
+             "resource_type": "AWS::S3::Bucket", "resource_id": "b", "name": "b", "arn": "arn:aws:s3:::b"},
+            {"change_type": "modified", "account_id": "123", "region": "us-east-1",
+             "resource_type": "AWS::EC2::Instance", "resource_id": "i-1", "name": "web", "arn": "",
+             "changed_fields": "tags.Env", "change_summary": "tags.Env: dev -> prod"},
+        ]
+        path = generator.generate_diff_report(iter(changes), base, target)
+        workbook = openpyxl.load_workbook(path)
+
+        assert workbook.sheetnames == ["Change Summary", "Added", "Removed", "Modified"]
+        assert workbook["Added"].max_row == 2
+        assert workbook["Removed"].max_row == 1
+        assert list(workbook["Modified"].values)[1][-1] == "tags.Env: dev -> prod"
+        summary = dict(list(workbook["Change Summary"].values)[1:])
+        assert summary["Base Run"] == "run-1"
+        assert (summary["Added"], summary["Removed"], summary["Modified"]) == (1, 0, 1)
@@ -0,0 +1,67 @@
+"""
+Unit tests for resource_discovery.filters
+"""
+from unittest.mock import MagicMock
+
+from resource_discovery.filters import FilterPlan
+from resource_discovery.models import DiscoveryConfig
+
+
+class TestResourceExplorerQueries:
+
+    def test_no_filters(self):
+        assert FilterPlan(DiscoveryConfig()).resource_explorer_queries() == [{}]
+
+    def test_includes_minus_excludes_in_resource_explorer_names(self):
+        plan = FilterPlan(DiscoveryConfig(include_types=["AWS::S3::Bucket", "iam:role", "AWS::RDS::DBInstance"],
+                                          exclude_types=["AWS::IAM::Role"]))
+        assert plan.resource_explorer_queries() == [{"resource_types": ["rds:db", "s3:bucket"]}]
+
+    def test_services_searched_separately(self):
+        plan = FilterPlan(DiscoveryConfig(include_types=["AWS::S3::Bucket", "ec2:*", "AWS::EC2::Volume",
+                                                         "AWS::Custom::Thing"]))
+        assert plan.resource_explorer_queries() == [
+            {"resource_types": ["s3:bucket"]},
+            {"services": ["custom", "ec2"]},
+        ]
+
+    def test_other_globs_not_pushed_down(self):
+        plan = FilterPlan(DiscoveryConfig(include_types=["ec2:*gateway"], regions=["us-east-1"]))
+        assert plan.resource_explorer_queries() == [{"regions": ["us-east-1", "global"]}]
+
+    def test_exclusions_only_without_include_list(self):
+        plan = FilterPlan(DiscoveryConfig(exclude_types=["AWS::IAM::Role", "AWS::RDS::*"]))
+        assert plan.resource_explorer_queries() == [{"exclude_types": ["iam:role"], "exclude_services": ["rds"]}]
+
+    def test_regions_keep_global_resources(self):
+        plan = FilterPlan(DiscoveryConfig(regions=["us-east-1", "eu-west-1"]))
+        assert plan.resource_explorer_queries() == [{"regions": ["us-east-1", "eu-west-1", "global"]}]
+
+
+class TestSourceTypes:
+
+    def test_include_list_used_without_lookup(self):
+        supported = MagicMock()
+        plan = FilterPlan(DiscoveryConfig(include_types=["AWS::Custom::Thing"]))
+        assert plan.source_types(supported) == ["AWS::Custom::Thing"]
+        supported.assert_not_called()
+
+    def test_resource_explorer_names_listed_by_cloudformation_name(self):
+        supported = MagicMock()
+        plan = FilterPlan(DiscoveryConfig(include_types=["ec2:security-group", "rds:db"]))
+        assert plan.source_types(supported) == ["AWS::EC2::SecurityGroup", "AWS::RDS::DBInstance"]
+        supported.assert_not_called()
+
+    def test_globs_expanded_against_supported_types(self):
+        plan = FilterPlan(DiscoveryConfig(include_types=["ec2:*"], exclude_types=["ec2:volume"]))
+        supported = ["AWS::EC2::Instance", "AWS::EC2::Volume", "AWS::S3::Bucket"]
+        assert plan.source_types(lambda: supported) == ["AWS::EC2::Instance"]
+
+    def test_supported_types_minus_exclusions(self):
+        plan = FilterPlan(DiscoveryConfig(exclude_types=["AWS::EC2::Instance"]))
+        assert plan.source_types(lambda: ["AWS::EC2::Instance", "AWS::S3::Bucket"]) == ["AWS::S3::Bucket"]
+
+    def test_selects_nothing(self):
+        assert FilterPlan(DiscoveryConfig(include_types=[])).selects_nothing
+        assert FilterPlan(DiscoveryConfig(include_types=["s3:bucket"], exclude_types=["AWS::S3::*"])).selects_nothing
+        assert not FilterPlan(DiscoveryConfig()).selects_nothing
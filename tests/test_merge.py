@@ -0,0 +1,147 @@
+"""
+Unit tests for resource_discovery.merge
+"""
+import gc
+import os
+import pytest
+from datetime import datetime
+
+from resource_discovery.merge import ResourceMergeStore
+from resource_discovery.models import DiscoverySource
+from tests.conftest import make_resource
+
+ARN = "arn:aws:ec2:us-east-1:123456789012:instance/i-1"
+
+
+def _re(**overrides):
+    return make_resource(arn=ARN, source=DiscoverySource.RESOURCE_EXPLORER, **overrides)
+
+
+def _config(**overrides):
+    return make_resource(arn=ARN, source=DiscoverySource.CONFIG, **overrides)
+
+
+def _cloud_control(**overrides):
+    return make_resource(arn=ARN, source=DiscoverySource.CLOUD_CONTROL, **overrides)
+
+
+class TestResourceMergeStore:
+
+    def test_new_and_repeated_arns(self):
+        store = ResourceMergeStore()
+        assert store.extend([_re(), make_resource(arn="arn:aws:s3:::bucket")]) == 2
+        assert store.extend([_config()]) == 0
+        assert len(store) == 2
+        assert store.merged == 1
+
+    def test_arns_normalized(self):
+        store = ResourceMergeStore()
+        store.add(_re())
+        assert not store.add(make_resource(arn="ARN:AWS:EC2:US-EAST-1:123456789012:instance/i-1/"))
+        assert ARN.upper() not in store
+        assert store.get(" " + ARN) is store.resources()[0]
+
+    def test_config_enriches_resource_explorer_entry(self):
+        store = ResourceMergeStore()
+        original = _re(tags={"Name": "web"}, configuration={"State": "running"}, relationships=[])
+        store.add(original)
+        store.add(_config(tags={"Name": "stale"}, configuration={"InstanceType": "t3.micro"},
+                          relationships=["sg-1"], created_at=datetime(2026, 1, 1)))
+
+        merged = store.get(ARN)
+        assert merged is original
+        assert merged.tags == {"Name": "web"}
+        assert merged.configuration == {"InstanceType": "t3.micro"}
+        assert merged.relationships == ["sg-1"]
+        assert merged.created_at == datetime(2026, 1, 1)
+        assert merged.source == DiscoverySource.RESOURCE_EXPLORER
+
+    def test_precedence_independent_of_arrival_order(self):
+        for order in ([_cloud_control, _config], [_config, _cloud_control]):
+            store = ResourceMergeStore()
+            store.add(order[0](configuration={"From": order[0].__name__}))
+            store.add(order[1](configuration={"From": order[1].__name__}))
+            assert store.get(ARN).configuration == {"From": "_cloud_control"}
+
+    def test_empty_values_never_replace(self):
+        store = ResourceMergeStore()
+        store.add(_re(tags={"Name": "web"}))
+        store.add(_cloud_control(tags={}, name=None, configuration={"Full": True}))
+        assert store.get(ARN).tags == {"Name": "web"}
+        assert store.get(ARN).name == "test-instance"
+
+    def test_configured_precedence(self):
+        store = ResourceMergeStore({"tags": ["config", DiscoverySource.RESOURCE_EXPLORER]})
+        store.add(_re(tags={"Name": "re"}))
+        store.add(_config(tags={"Name": "config"}))
+        assert store.get(ARN).tags == {"Name": "config"}
+
+    def test_unknown_field_or_source_rejected(self):
+        with pytest.raises(ValueError):
+            ResourceMergeStore({"arn": ["config"]})
+        with pytest.raises(ValueError):
+            ResourceMergeStore({"tags": ["inventory"]})
+
+    def test_resources_without_arn_kept(self):
+        store = ResourceMergeStore()
+        assert store.extend([make_resource(arn=""), make_resource(arn="")]) == 2
+        assert len(store) == 2
+
+
+class TestResourceMergeStoreSpill:
+    """Tests for the merge store spilling past its memory budget."""
+
+    @staticmethod
+    def _arn(i):
+        return f"arn:aws:ec2:us-east-1:123456789012:instance/i-{i}"
+
+    def test_peak_retained_bounded_by_budget(self, monkeypatch):
+        monkeypatch.setattr("resource_discovery.merge.SPILL_CHECK_ROWS", 10)
+        store = ResourceMergeStore(memory_budget=1)
+        peak = 0
+        for i in range(95):
+            store.add(make_resource(arn=self._arn(i), source=DiscoverySource.RESOURCE_EXPLORER))
+            peak = max(peak, len(store))
+
+        assert peak < 10
+        assert store.spill_files
+        assert len(list(store.drain())) == 95
+        assert store.drained == 95
+        assert store.spill_files == []
+
+    def test_merges_across_spills(self, monkeypatch):
+        monkeypatch.setattr("resource_discovery.merge.SPILL_CHECK_ROWS", 10)
+        store = ResourceMergeStore(memory_budget=1)
+        for i in range(30):
+            store.add(make_resource(arn=self._arn(i), tags={"Name": f"re-{i}"}, relationships=[],
+                                    source=DiscoverySource.RESOURCE_EXPLORER))
+        for i in range(30):
+            store.add(make_resource(arn=self._arn(i), tags={"Name": "stale"}, relationships=[f"sg-{i}"],
+                                    configuration={"From": "config"}, source=DiscoverySource.CONFIG))
+        # Cloud Control ranks below Config for relationships, even though Config's value was spilled
+        store.add(make_resource(arn=self._arn(0), relationships=["cc"], configuration={"From": "cc"},
+                                source=DiscoverySource.CLOUD_CONTROL))
+
+        merged = {r.arn: r for r in store.drain()}
+
+        assert len(merged) == 30
+        assert merged[self._arn(0)].relationships == ["sg-0"]
+        assert merged[self._arn(0)].configuration == {"From": "cc"}
+        assert merged[self._arn(7)].tags == {"Name": "re-7"}
+        assert merged[self._arn(7)].source == DiscoverySource.RESOURCE_EXPLORER
+        assert store.merged == 31
+
+    def test_unbounded_store_never_spills(self):
+        store = ResourceMergeStore()
+        store.extend(make_resource(arn=self._arn(i)) for i in range(2000))
+        assert store.spill_files == []
+        assert len(store) == 2000
+
+    def test_files_removed_when_collected(self, monkeypatch):
+        monkeypatch.setattr("resource_discovery.merge.SPILL_CHECK_ROWS", 1)
+        store = ResourceMergeStore(memory_budget=1)
+        store.add(make_resource(arn=self._arn(0)))
+        paths = list(store.spill_files)
+        del store
+        gc.collect()
+        assert paths and not any(os.path.exists(path) for path in paths)
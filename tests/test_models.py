@@ -3,14 +3,22 @@ Unit tests for resource_discovery.models
 
 These are pure data-model tests with zero external dependencies.
 """
+import gc
+import os
 import pytest
 from datetime import datetime
 
 from resource_discovery.models import (
+    RawJson,
     Resource,
+    ResourceBatch,
+    json_field_text,
     DiscoveryConfig,
     DiscoveryResult,
     DiscoverySource,
+    RESOURCE_TIMESTAMP_FIELDS,
+    RESOURCE_CATEGORICAL_FIELDS,
+    RESOURCE_NESTED_FIELDS,
 )
 from tests.conftest import make_resource, make_discovery_result
 
@@ -48,6 +56,12 @@ class TestResource:
         }
         assert set(d.keys()) == expected_keys
 
+    def test_field_types_declared_for_to_dict_keys(self, sample_resource):
+        """Typed fields must exist in to_dict() and be declared only once."""
+        typed = RESOURCE_TIMESTAMP_FIELDS + RESOURCE_CATEGORICAL_FIELDS + RESOURCE_NESTED_FIELDS
+        assert len(typed) == len(set(typed))
+        assert set(typed) <= set(sample_resource.to_dict())
+
     def test_to_dict_source_uses_value(self):
         """discovery_source should be the enum's .value string, not the enum."""
         r = make_resource(source=DiscoverySource.CONFIG)
@@ -66,6 +80,40 @@ class TestResource:
         r = make_resource(configuration=config)
         assert r.to_dict()["configuration"] == config
 
+    def test_slotted(self):
+        """Resources carry no per-instance __dict__."""
+        r = make_resource()
+        assert not hasattr(r, "__dict__")
+        with pytest.raises(AttributeError):
+            r.unknown_field = 1
+
+    def test_dimension_strings_interned(self):
+        """Equal region/account/type strings from different sources share one object."""
+        a = make_resource(region="".join(["us-", "east-1"]), account_id="".join(["1234", "5678"]))
+        b = make_resource(region="".join(["us-east", "-1"]), account_id="".join(["12", "345678"]))
+        assert a.region is b.region
+        assert a.account_id is b.account_id
+        assert a.resource_type is b.resource_type
+
+    def test_empty_containers_shared_and_read_only(self):
+        """Empty defaults (and empty values passed in) are one shared read-only object."""
+        a = make_resource(tags={}, relationships=[])
+        b = Resource(arn="arn:x", resource_type="AWS::S3::Bucket", region="global", account_id="1")
+        assert a.tags is b.tags is b.configuration
+        assert a.relationships is b.relationships
+        with pytest.raises(TypeError):
+            b.tags["Name"] = "x"
+        with pytest.raises(TypeError):
+            b.relationships.append("arn:y")
+
+    def test_to_dict_returns_fresh_empty_containers(self):
+        """to_dict() output may be modified without affecting other resources."""
+        d = Resource(arn="arn:x", resource_type="AWS::S3::Bucket", region="global", account_id="1").to_dict()
+        d["tags"]["Name"] = "x"
+        d["relationships"].append("arn:y")
+        assert type(d["configuration"]) is dict
+        assert make_resource(tags={}).tags == {}
+
 
 # ===================================================================
 # DiscoveryConfig
@@ -115,6 +163,112 @@ class TestDiscoveryConfig:
         assert cfg.should_include_type("AWS::EC2::Instance") is False
 
 
+# ===================================================================
+# RawJson
+# ===================================================================
+
+class TestRawJson:
+    """Tests for the lazily decoded configuration payload."""
+
+    def test_decoded_on_first_access(self):
+        payload = RawJson('{"InstanceType": "t3.micro"}')
+        assert payload._decoded is None
+        assert payload["InstanceType"] == "t3.micro"
+        assert payload == {"InstanceType": "t3.micro"}
+
+    def test_release_drops_decoded_copy(self):
+        payload = RawJson(b'{"a": 1}')
+        assert payload.get("a") == 1
+        payload.release()
+        assert payload._decoded is None
+        assert dict(payload) == {"a": 1}
+
+    def test_serialized_from_raw_text(self):
+        raw = '{"b":2,  "a":1}'
+        assert json_field_text(RawJson(raw)) == raw
+        assert json_field_text({"a": 1}) == '{"a":1}'
+        assert json_field_text(None) is None
+
+    def test_non_object_rejected(self):
+        with pytest.raises(ValueError):
+            RawJson("[1, 2]").decoded()
+
+    def test_batch_keeps_raw_text(self):
+        raw = '{"Size":8}'
+        batch = ResourceBatch.from_resources([make_resource(configuration=RawJson(raw))])
+        assert batch.blobs["configuration"][0] == raw.encode()
+        assert batch[0].configuration == {"Size": 8}
+
+
+# ===================================================================
+# ResourceBatch
+# ===================================================================
+
+class TestResourceBatch:
+    """Tests for the columnar resource container."""
+
+    def test_round_trip(self, sample_resources):
+        """Iterating a batch yields the resources it was built from."""
+        batch = ResourceBatch.from_resources(sample_resources)
+        assert len(batch) == len(sample_resources)
+        assert list(batch) == sample_resources
+        assert batch[1] == sample_resources[1]
+
+    def test_dimensions_dictionary_encoded(self, sample_resources):
+        batch = ResourceBatch.from_resources(sample_resources * 3)
+        types = batch.dictionaries["resource_type"].values
+        assert len(types) == len({r.resource_type for r in sample_resources})
+        assert batch.column("region") == [r.region for r in sample_resources * 3]
+
+    def test_extend_with_batch_remaps_codes(self):
+        a = ResourceBatch.from_resources([make_resource(region="us-east-1")])
+        b = ResourceBatch.from_resources([make_resource(region="eu-west-1"), make_resource(region="us-east-1")])
+        a.extend(b)
+        assert a.column("region") == ["us-east-1", "eu-west-1", "us-east-1"]
+        assert a.dictionaries["region"].values == ["us-east-1", "eu-west-1"]
+
+    def test_type_counts_and_filter(self, sample_resources):
+        batch = ResourceBatch.from_resources(sample_resources)
+        counts = batch.type_counts()
+        assert counts["AWS::EC2::Instance"] == 2
+
+        only_ec2 = batch.filter_types(lambda t: t == "AWS::EC2::Instance")
+        assert len(only_ec2) == 2
+        assert {r.resource_type for r in only_ec2} == {"AWS::EC2::Instance"}
+
+    def test_copy_rows(self):
+        batch = ResourceBatch.from_resources([
+            make_resource(arn="arn:x", region="", tags={}, configuration={"Size": 8}),
+        ])
+        (row,) = batch.copy_rows()
+        assert row[:6] == ("arn:x", "AWS::EC2::Instance", "arn:x", "global", "123456789012", "test-instance")
+        assert row[6] == "{}"
+        assert row[7] == '{"Size":8}'
+
+    def test_copy_rows_fills_region_and_account_from_arn(self):
+        batch = ResourceBatch.from_resources([
+            make_resource(arn="arn:aws:ec2:eu-west-1:111122223333:instance/i-1", region="", account_id=""),
+            make_resource(arn="arn:aws:s3:::bucket", resource_type="AWS::S3::Bucket", region="global",
+                          account_id=""),
+        ])
+        ec2, s3 = batch.copy_rows(account_id="444455556666")
+        assert ec2[3:5] == ("eu-west-1", "111122223333")
+        assert s3[3:5] == ("global", "444455556666")
+
+    def test_to_arrow(self, sample_resources):
+        pa = pytest.importorskip("pyarrow")
+        record_batch = ResourceBatch.from_resources(sample_resources).to_arrow()
+        assert record_batch.num_rows == len(sample_resources)
+        assert pa.types.is_dictionary(record_batch.schema.field("region").type)
+        assert record_batch.column("region").to_pylist() == [r.region for r in sample_resources]
+
+    def test_result_to_batch(self, sample_resources):
+        result = make_discovery_result(resources=sample_resources, total_count=len(sample_resources))
+        batch = result.to_batch()
+        assert result.resources is batch
+        assert result.to_batch() is batch
+
+
 # ===================================================================
 # DiscoveryResult
 # ===================================================================
@@ -143,6 +297,70 @@ class TestDiscoveryResult:
         assert result.success is True
 
 
+class TestDiscoveryResultSpill:
+    """Tests for memory-bounded results spilling to disk."""
+
+    @staticmethod
+    def _resources(count):
+        return [make_resource(arn=f"arn:aws:ec2:us-east-1:123:instance/i-{i}", name=f"r{i}") for i in range(count)]
+
+    def test_unbounded_result_never_spills(self):
+        result = make_discovery_result()
+        result.add_resources(self._resources(3))
+        assert result.spill_files == []
+        assert result.resource_count == 3
+
+    def test_spills_past_budget(self, monkeypatch):
+        monkeypatch.setattr("resource_discovery.models.SPILL_CHECK_ROWS", 10)
+        result = make_discovery_result(memory_budget=1)
+        result.add_resources(self._resources(25))
+
+        assert len(result.spill_files) == 3
+        assert all(os.path.getsize(path) for path in result.spill_files)
+        assert result.spilled_count == 25
+        assert result.resource_count == 25
+        assert not result.resources
+
+    def test_iterators_cover_spilled_and_in_memory(self, monkeypatch):
+        monkeypatch.setattr("resource_discovery.models.SPILL_CHECK_ROWS", 10)
+        result = make_discovery_result(memory_budget=10 ** 9)
+        resources = self._resources(25)
+        result.add_resources(resources[:20])
+        result.spill()
+        result.add_resources(resources[20:])
+
+        assert [r.name for r in result.iter_resources()] == [r.name for r in resources]
+        assert [len(b) for b in result.iter_batches()] == [20, 5]
+        assert next(result.iter_resources()) == resources[0]
+
+    def test_discard_spill_removes_files(self):
+        result = make_discovery_result(memory_budget=1)
+        result.add_resources(self._resources(2))
+        paths = list(result.spill_files)
+        result.discard_spill()
+        assert result.spill_files == [] and result.resource_count == 0
+        assert not any(os.path.exists(path) for path in paths)
+
+    def test_files_removed_when_collected(self):
+        result = make_discovery_result(memory_budget=1)
+        result.add_resources(self._resources(2))
+        paths = list(result.spill_files)
+        del result
+        gc.collect()
+        assert not any(os.path.exists(path) for path in paths)
+
+    def test_add_result_moves_spilled_batches(self):
+        account = make_discovery_result(memory_budget=1, errors=["e1"])
+        account.add_resources(self._resources(4))
+        paths = list(account.spill_files)
+        total = make_discovery_result(memory_budget=10 ** 9)
+        total.add_result(account)
+
+        assert total.resource_count == 4
+        assert total.errors == ["e1"]
+        assert not any(os.path.exists(path) for path in paths)
+
+
 # ===================================================================
 # DiscoverySource enum
 # ===================================================================
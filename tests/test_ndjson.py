@@ -0,0 +1,88 @@
+"""
+Unit tests for reporting.ndjson (streaming NDJSON export)
+"""
+import gzip
+import io
+import json
+import pytest
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from reporting.ndjson import write_ndjson, encode_record, open_output
+from resource_discovery import codec
+from resource_discovery.models import DiscoverySource, RawJson
+from tests.conftest import make_resource
+
+
+def _lines(data):
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+@contextmanager
+def _stdlib_codec():
+    previous = codec.use_backend("json")
+    try:
+        yield
+    finally:
+        codec.use_backend(previous)
+
+
+class TestEncodeRecord:
+
+    def test_one_compact_line(self):
+        line = encode_record({"a": 1, "b": [1, 2]})
+        assert line == b'{"a":1,"b":[1,2]}\n'
+
+    def test_stdlib_fallback_matches_fast_encoder(self):
+        record = make_resource(created_at=datetime(2026, 3, 30, 12, tzinfo=timezone.utc),
+                               tags={"Name": "café"}).to_dict()
+        fast = encode_record(record)
+        with _stdlib_codec():
+            fallback = encode_record(record)
+
+        assert json.loads(fallback) == json.loads(fast)
+        assert json.loads(fallback)["created_at"] == "2026-03-30T12:00:00Z"
+
+    def test_raw_json_embedded_without_decoding(self):
+        raw = RawJson('{"Size": 8, "Nested": {"A": [1, 2]}}')
+        line = encode_record({"configuration": raw})
+        assert json.loads(line) == {"configuration": {"Size": 8, "Nested": {"A": [1, 2]}}}
+        with _stdlib_codec():
+            assert encode_record({"configuration": raw}) == line
+
+    def test_unknown_types_stringified(self):
+        assert json.loads(encode_record({"source": DiscoverySource.CONFIG, "big": 2 ** 70})) == {
+            "source": "config", "big": 2 ** 70,
+        }
+
+
+class TestWriteNdjson:
+
+    def test_resources_written_line_by_line(self, tmp_path):
+        path = tmp_path / "out.ndjson"
+        count = write_ndjson((make_resource(name=f"r{i}") for i in range(3)), str(path))
+
+        assert count == 3
+        rows = _lines(path.read_bytes())
+        assert [r["name"] for r in rows] == ["r0", "r1", "r2"]
+        assert rows[0]["discovery_source"] == "resource_explorer"
+
+    def test_gzip_to_file_object_left_open(self):
+        output = io.BytesIO()
+        write_ndjson([{"arn": "a"}, {"arn": "b"}], output, compression="gzip")
+
+        assert not output.closed
+        assert _lines(gzip.decompress(output.getvalue())) == [{"arn": "a"}, {"arn": "b"}]
+
+    def test_zstd(self):
+        zstandard = pytest.importorskip("zstandard")
+        output = io.BytesIO()
+        write_ndjson([{"arn": "a"}], output, compression="zstd")
+
+        data = zstandard.ZstdDecompressor().decompressobj().decompress(output.getvalue())
+        assert _lines(data) == [{"arn": "a"}]
+
+    def test_unknown_compression_rejected(self):
+        with pytest.raises(ValueError):
+            with open_output(io.BytesIO(), "brotli"):
+                pass
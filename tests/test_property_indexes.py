@@ -0,0 +1,79 @@
+"""
+Unit tests for lib.property_indexes
+
+Checks predicate generation against the partial expression indexes
+created by database_init.app.
+"""
+import json
+import pytest
+
+from lib.property_indexes import build_property_filter, load_registry, property_expression
+from database_init import app as db_init
+
+
+REGISTRY = {"AWS::EC2::Instance": ["InstanceType"], "AWS::RDS::DBInstance": ["Engine"]}
+
+
+class TestPropertyExpression:
+
+    def test_shared_with_index_ddl(self):
+        assert property_expression is db_init.property_expression
+
+    def test_nested_path(self):
+        assert property_expression("State.Name") == "properties->'State'->>'Name'"
+
+    def test_rejects_injection(self):
+        with pytest.raises(ValueError):
+            property_expression("x'); DROP TABLE resources; --")
+
+
+class TestBuildPropertyFilter:
+
+    def test_equality_predicate(self):
+        sql, params = build_property_filter("AWS::EC2::Instance", {"InstanceType": "t3.micro"}, REGISTRY)
+        assert sql == "resource_type = 'AWS::EC2::Instance' AND (properties->>'InstanceType') = %s"
+        assert params == ["t3.micro"]
+
+    def test_list_value_becomes_in(self):
+        sql, params = build_property_filter("AWS::RDS::DBInstance", {"Engine": ["postgres", "mysql"]}, REGISTRY)
+        assert "(properties->>'Engine') IN (%s, %s)" in sql
+        assert params == ["postgres", "mysql"]
+
+    def test_empty_list_rejected(self):
+        with pytest.raises(ValueError):
+            build_property_filter("AWS::RDS::DBInstance", {"Engine": []}, REGISTRY)
+
+    def test_non_string_values_bound_as_json_text(self):
+        sql, params = build_property_filter(
+            "AWS::EC2::Instance", {"EbsOptimized": True, "CpuOptions.CoreCount": [2, 4]}, REGISTRY
+        )
+        assert params == ["true", "2", "4"]
+
+    def test_none_becomes_is_null(self):
+        sql, params = build_property_filter("AWS::EC2::Instance", {"KeyName": None}, REGISTRY)
+        assert sql.endswith("(properties->>'KeyName') IS NULL")
+        assert params == []
+
+    def test_type_only(self):
+        sql, params = build_property_filter("AWS::S3::Bucket", {}, REGISTRY)
+        assert sql == "resource_type = 'AWS::S3::Bucket'"
+        assert params == []
+
+    def test_rejects_invalid_resource_type(self):
+        with pytest.raises(ValueError):
+            build_property_filter("AWS::EC2::Instance' OR '1'='1", {}, REGISTRY)
+
+
+class TestLoadRegistry:
+
+    def test_default_registry_loads(self):
+        registry = load_registry()
+        assert "InstanceType" in registry["AWS::EC2::Instance"]
+
+    def test_missing_file_returns_empty(self, tmp_path):
+        assert load_registry(str(tmp_path / "missing.json")) == {}
+
+    def test_custom_path(self, tmp_path):
+        path = tmp_path / "registry.json"
+        path.write_text(json.dumps(REGISTRY))
+        assert load_registry(str(path)) == REGISTRY
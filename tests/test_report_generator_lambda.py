@@ -6,7 +6,9 @@ Tests report generation pipeline, S3 upload, and handler logic.
 import json
 import pytest
 from unittest.mock import MagicMock, patch
-from datetime import datetime
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
 
 
 @pytest.fixture
@@ -29,21 +31,28 @@ def env_vars():
 
 class TestReportGeneratorLambda:
 
-    @patch("report_generator_lambda.upload_to_s3")
-    @patch("report_generator_lambda.generate_excel_report")
-    @patch("report_generator_lambda.fetch_resources_from_database")
+    @patch("report_generator_lambda.get_latest_run_id", return_value=None)
+    @patch("report_generator_lambda.get_s3_client")
+    @patch("report_generator_lambda.write_excel_report")
+    @patch("report_generator_lambda.iter_resources_from_database")
     @patch("report_generator_lambda.get_secret")
     def test_handler_generates_and_uploads(self, mock_secret, mock_fetch, mock_excel,
-                                           mock_upload, env_vars, mock_context):
+                                           mock_s3_client, mock_run_id, env_vars, mock_context):
         with patch.dict("os.environ", env_vars):
             mock_secret.return_value = {"username": "user", "password": "pass"}
-            mock_fetch.return_value = [
+            mock_fetch.return_value = iter([[
                 {"arn": "arn:aws:ec2:us-east-1:123:i/i-001", "resource_type": "AWS::EC2::Instance",
                  "region": "us-east-1", "account_id": "123", "name": "web",
                  "resource_id": "i-001"},
-            ]
-            mock_excel.return_value = b"fake-excel-bytes"
-            mock_upload.return_value = "https://s3.amazonaws.com/presigned-url"
+            ]])
+
+            def fake_excel(resources, output, progress=None):
+                output.write(b"fake-excel-bytes")
+                return len(list(resources))
+
+            mock_excel.side_effect = fake_excel
+            mock_s3 = mock_s3_client.return_value
+            mock_s3.generate_presigned_url.return_value = "https://s3.amazonaws.com/presigned-url"
 
             from report_generator_lambda import lambda_handler
             response = lambda_handler({}, mock_context)
@@ -53,14 +62,18 @@ class TestReportGeneratorLambda:
             assert body["success"] is True
             assert body["resource_count"] == 1
             assert "download_url" in body
-            mock_upload.assert_called_once()
+            mock_s3.put_object.assert_called_once()
+            assert mock_s3.put_object.call_args[1]["Body"] == b"fake-excel-bytes"
 
-    @patch("report_generator_lambda.fetch_resources_from_database")
+    @patch("report_generator_lambda.get_latest_run_id", return_value=None)
+    @patch("report_generator_lambda.get_s3_client")
+    @patch("report_generator_lambda.iter_resources_from_database")
     @patch("report_generator_lambda.get_secret")
-    def test_handler_no_resources(self, mock_secret, mock_fetch, env_vars, mock_context):
+    def test_handler_no_resources(self, mock_secret, mock_fetch, mock_s3_client, mock_run_id,
+                                  env_vars, mock_context):
         with patch.dict("os.environ", env_vars):
             mock_secret.return_value = {"username": "user", "password": "pass"}
-            mock_fetch.return_value = []
+            mock_fetch.return_value = iter([])
 
             from report_generator_lambda import lambda_handler
             response = lambda_handler({}, mock_context)
@@ -68,6 +81,7 @@ class TestReportGeneratorLambda:
             assert response["statusCode"] == 200
             body = json.loads(response["body"])
             assert body["resource_count"] == 0
+            mock_s3_client.return_value.put_object.assert_not_called()
 
     @patch("report_generator_lambda.get_secret")
     def test_handler_error_response(self, mock_secret, env_vars, mock_context):
@@ -82,6 +96,501 @@ class TestReportGeneratorLambda:
             assert body["success"] is False
 
 
+class TestDiffReport:
+
+    @patch("report_generator_lambda.get_latest_run_id", return_value=None)
+    @patch("report_generator_lambda.get_s3_client")
+    @patch("report_generator_lambda.write_diff_report")
+    @patch("report_generator_lambda.get_secret")
+    def test_handler_diff_report(self, mock_secret, mock_diff, mock_s3_client, mock_run_id,
+                                 env_vars, mock_context):
+        with patch.dict("os.environ", env_vars):
+            mock_secret.return_value = {"username": "user", "password": "pass"}
+
+            def fake_diff(*args, **kwargs):
+                args[4].write(b"diff-bytes")
+                return {"added": 2, "removed": 1, "modified": 3}, {"run_id": "run-1"}, {"run_id": "run-2"}
+
+            mock_diff.side_effect = fake_diff
+            mock_s3 = mock_s3_client.return_value
+            mock_s3.generate_presigned_url.return_value = "https://s3.amazonaws.com/presigned-url"
+
+            from report_generator_lambda import lambda_handler
+            response = lambda_handler({"report_type": "diff", "base_run_id": "run-1",
+                                       "account_ids": ["123"]}, mock_context)
+
+            assert response["statusCode"] == 200
+            body = json.loads(response["body"])
+            assert body["change_count"] == 6
+            assert body["base_run_id"] == "run-1"
+            assert body["s3_key"].startswith("reports/CloudAuditor_Diff_")
+            assert mock_diff.call_args[1]["base_run_id"] == "run-1"
+            assert mock_diff.call_args[1]["account_ids"] == ["123"]
+            mock_s3.put_object.assert_called_once()
+
+    @patch("report_generator_lambda.get_latest_run_id", return_value=None)
+    @patch("report_generator_lambda.get_s3_client")
+    @patch("report_generator_lambda.write_diff_report")
+    @patch("report_generator_lambda.get_secret")
+    def test_handler_diff_without_previous_run(self, mock_secret, mock_diff, mock_s3_client,
+                                               mock_run_id, env_vars, mock_context):
+        with patch.dict("os.environ", env_vars):
+            mock_secret.return_value = {"username": "user", "password": "pass"}
+            mock_diff.side_effect = ValueError("No completed discovery run before run-1")
+
+            from report_generator_lambda import lambda_handler
+            response = lambda_handler({"report_type": "diff"}, mock_context)
+
+            assert response["statusCode"] == 400
+            mock_s3_client.return_value.put_object.assert_not_called()
+
+    @patch("report_generator_lambda.psycopg")
+    def test_write_diff_report_streams_changes(self, mock_psycopg, tmp_path):
+        import openpyxl
+        mock_cursor = MagicMock()
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_psycopg.connect.return_value = mock_conn
+        mock_cursor.fetchone.side_effect = [
+            ("run-2", datetime(2026, 3, 30, 2), datetime(2026, 3, 30, 3), 5),
+            ("run-1", datetime(2026, 3, 29, 2), datetime(2026, 3, 29, 3), 4),
+        ]
+        mock_cursor.__iter__.return_value = iter([
+            ("removed", "123", "us-east-1", "AWS::S3::Bucket", "old", "old", "arn:aws:s3:::old", None, None),
+        ])
+
+        from report_generator_lambda import write_diff_report
+        output = tmp_path / "diff.xlsx"
+        counts, base_run, target_run = write_diff_report("host", "db", "user", "pass", str(output))
+
+        assert counts == {"added": 0, "removed": 1, "modified": 0}
+        assert (base_run["run_id"], target_run["run_id"]) == ("run-1", "run-2")
+        assert openpyxl.load_workbook(output)["Removed"].max_row == 2
+        mock_conn.close.assert_called_once()
+
+
+class TestReportCache:
+
+    @pytest.fixture
+    def s3(self):
+        import boto3
+        from moto import mock_aws
+        with mock_aws(), patch.dict("os.environ", {"AWS_DEFAULT_REGION": "us-east-1",
+                                                   "AWS_ACCESS_KEY_ID": "testing",
+                                                   "AWS_SECRET_ACCESS_KEY": "testing"}):
+            client = boto3.client("s3", region_name="us-east-1")
+            client.create_bucket(Bucket="test-bucket")
+            yield client
+
+    def test_cache_key_is_deterministic(self):
+        from report_generator_lambda import report_cache_key
+        key = report_cache_key("run-1", "inventory", ["222", "111"])
+
+        assert key == report_cache_key("run-1", "inventory", ["111", "222", "111"])
+        assert key.startswith("reports/cache/run-1/") and key.endswith(".xlsx")
+        assert key != report_cache_key("run-2", "inventory", ["111", "222"])
+        assert key != report_cache_key("run-1", "inventory", ["111"])
+        assert key != report_cache_key("run-1", "diff", ["111", "222"])
+
+    @patch("report_generator_lambda.psycopg")
+    def test_latest_run_lookup_failure_disables_cache(self, mock_psycopg):
+        mock_psycopg.connect.side_effect = Exception("connection refused")
+
+        from report_generator_lambda import get_latest_run_id
+        assert get_latest_run_id("host", "db", "user", "pass") is None
+
+    @patch("report_generator_lambda.psycopg")
+    def test_latest_run_ignored_while_a_run_is_in_progress(self, mock_psycopg):
+        cursor = mock_psycopg.connect.return_value.cursor.return_value.__enter__.return_value
+
+        from report_generator_lambda import get_latest_run_id
+        cursor.fetchone.return_value = ("run-1", False)
+        assert get_latest_run_id("host", "db", "user", "pass") == "run-1"
+        cursor.fetchone.return_value = ("run-1", True)
+        assert get_latest_run_id("host", "db", "user", "pass") is None
+
+    def test_store_and_load_round_trip(self, s3):
+        from report_generator_lambda import load_cached_report, store_cached_report
+        key = "reports/cache/run-1/abc.xlsx"
+
+        assert load_cached_report(s3, "test-bucket", key) is None
+        store_cached_report(s3, "test-bucket", key, {"resource_count": 3})
+        assert load_cached_report(s3, "test-bucket", key) == {"resource_count": 3}
+
+    @patch("report_generator_lambda.get_latest_run_id", return_value="run-2")
+    @patch("report_generator_lambda.write_excel_report")
+    @patch("report_generator_lambda.iter_resources_from_database")
+    @patch("report_generator_lambda.get_secret")
+    def test_second_request_served_from_cache(self, mock_secret, mock_fetch, mock_excel, mock_run_id,
+                                              s3, env_vars, mock_context):
+        mock_secret.return_value = {"username": "user", "password": "pass"}
+        mock_fetch.return_value = iter([[{"account_id": "123"}]])
+
+        def fake_excel(resources, output, progress=None):
+            output.write(b"fake-excel-bytes")
+            return len(list(resources))
+
+        mock_excel.side_effect = fake_excel
+        s3.put_object(Bucket="test-bucket", Key="reports/cache/run-1/old.xlsx", Body=b"x")
+
+        from report_generator_lambda import lambda_handler
+        with patch.dict("os.environ", env_vars), \
+                patch("report_generator_lambda.get_s3_client", return_value=s3):
+            first = json.loads(lambda_handler({"account_ids": ["123"]}, mock_context)["body"])
+            second = json.loads(lambda_handler({"account_ids": ["123"]}, mock_context)["body"])
+
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["s3_key"] == first["s3_key"]
+        assert second["resource_count"] == 1
+        assert second["filename"] == first["filename"]
+        assert mock_excel.call_count == 1
+        assert s3.get_object(Bucket="test-bucket", Key=first["s3_key"])["Body"].read() == b"fake-excel-bytes"
+        # Older runs' artifacts are left to the bucket lifecycle rule (jobs may still reference them)
+        keys = [o["Key"] for o in s3.list_objects_v2(Bucket="test-bucket")["Contents"]]
+        assert "reports/cache/run-1/old.xlsx" in keys
+
+    @patch("report_generator_lambda.get_latest_run_id", return_value="run-2")
+    @patch("report_generator_lambda.write_excel_report")
+    @patch("report_generator_lambda.iter_resources_from_database")
+    @patch("report_generator_lambda.get_secret")
+    def test_refresh_bypasses_cache(self, mock_secret, mock_fetch, mock_excel, mock_run_id,
+                                    s3, env_vars, mock_context):
+        mock_secret.return_value = {"username": "user", "password": "pass"}
+        mock_fetch.side_effect = lambda *a, **kw: iter([[{"account_id": "123"}]])
+
+        def fake_excel(resources, output, progress=None):
+            output.write(b"fake-excel-bytes")
+            return len(list(resources))
+
+        mock_excel.side_effect = fake_excel
+
+        from report_generator_lambda import lambda_handler
+        with patch.dict("os.environ", env_vars), \
+                patch("report_generator_lambda.get_s3_client", return_value=s3):
+            lambda_handler({}, mock_context)
+            body = json.loads(lambda_handler({"refresh": True}, mock_context)["body"])
+
+        assert body["cached"] is False
+        assert mock_excel.call_count == 2
+
+
+class TestNdjsonExport:
+
+    @pytest.fixture
+    def s3(self):
+        import boto3
+        from moto import mock_aws
+        with mock_aws(), patch.dict("os.environ", {"AWS_DEFAULT_REGION": "us-east-1",
+                                                   "AWS_ACCESS_KEY_ID": "testing",
+                                                   "AWS_SECRET_ACCESS_KEY": "testing"}):
+            client = boto3.client("s3", region_name="us-east-1")
+            client.create_bucket(Bucket="test-bucket")
+            yield client
+
+    @patch("report_generator_lambda.get_latest_run_id", return_value=None)
+    @patch("report_generator_lambda.iter_resources_from_database")
+    @patch("report_generator_lambda.get_secret")
+    def test_gzip_ndjson_uploaded(self, mock_secret, mock_fetch, mock_run_id, s3, env_vars, mock_context):
+        import gzip
+        mock_secret.return_value = {"username": "user", "password": "pass"}
+        mock_fetch.return_value = iter([[{"arn": "a", "account_id": "123"}], [{"arn": "b", "account_id": "123"}]])
+
+        from report_generator_lambda import lambda_handler
+        with patch.dict("os.environ", env_vars), \
+                patch("report_generator_lambda.get_s3_client", return_value=s3):
+            response = lambda_handler({"export_format": "ndjson"}, mock_context)
+
+        body = json.loads(response["body"])
+        assert response["statusCode"] == 200
+        assert body["resource_count"] == 2
+        assert body["compression"] == "gzip"
+        assert body["s3_key"].endswith(".ndjson.gz")
+        obj = s3.get_object(Bucket="test-bucket", Key=body["s3_key"])
+        assert obj["ContentType"] == "application/gzip"
+        lines = gzip.decompress(obj["Body"].read()).decode().splitlines()
+        assert [json.loads(line)["arn"] for line in lines] == ["a", "b"]
+
+    @patch("report_generator_lambda.get_latest_run_id", return_value="run-1")
+    @patch("report_generator_lambda.iter_resources_from_database")
+    @patch("report_generator_lambda.get_secret")
+    def test_cache_key_distinguishes_format(self, mock_secret, mock_fetch, mock_run_id,
+                                            s3, env_vars, mock_context):
+        mock_secret.return_value = {"username": "user", "password": "pass"}
+        mock_fetch.side_effect = lambda *a, **kw: iter([[{"arn": "a", "account_id": "123"}]])
+
+        from report_generator_lambda import lambda_handler
+        with patch.dict("os.environ", env_vars), \
+                patch("report_generator_lambda.get_s3_client", return_value=s3):
+            plain = json.loads(lambda_handler({"export_format": "ndjson", "compression": "none"},
+                                              mock_context)["body"])
+            gz = json.loads(lambda_handler({"export_format": "ndjson"}, mock_context)["body"])
+
+        assert plain["s3_key"].endswith(".ndjson")
+        assert gz["cached"] is False
+        assert plain["s3_key"] != gz["s3_key"]
+
+    @patch("report_generator_lambda.get_secret")
+    def test_invalid_combinations_rejected(self, mock_secret, env_vars, mock_context):
+        mock_secret.return_value = {"username": "user", "password": "pass"}
+
+        from report_generator_lambda import lambda_handler
+        with patch.dict("os.environ", env_vars):
+            for event in ({"export_format": "csv"},
+                          {"export_format": "ndjson", "report_type": "diff"},
+                          {"export_format": "ndjson", "compression": "brotli"}):
+                assert lambda_handler(event, mock_context)["statusCode"] == 400
+
+
+class TestPrerender:
+
+    @pytest.fixture
+    def s3(self):
+        import boto3
+        from moto import mock_aws
+        with mock_aws(), patch.dict("os.environ", {"AWS_DEFAULT_REGION": "us-east-1",
+                                                   "AWS_ACCESS_KEY_ID": "testing",
+                                                   "AWS_SECRET_ACCESS_KEY": "testing"}):
+            client = boto3.client("s3", region_name="us-east-1")
+            client.create_bucket(Bucket="test-bucket")
+            yield client
+
+    @staticmethod
+    def _rows():
+        ts = datetime(2026, 3, 30)
+        return [[(f"r-{account}-{i}", "AWS::S3::Bucket", f"arn:{account}:{i}", "us-east-1", account,
+                  f"b{i}", {}, {}, ts, ts, ts) for i in range(count)]
+                for account, count in (("111", 3), ("222", 2))]
+
+    def _prerender(self, s3, env_vars, event):
+        from report_generator_lambda import lambda_handler
+        with patch.dict("os.environ", env_vars), \
+                patch("report_generator_lambda.get_secret", return_value={"username": "u", "password": "p"}), \
+                patch("report_generator_lambda.get_latest_run_id", return_value="run-1"), \
+                patch("report_generator_lambda._connect_read_only"), \
+                patch("report_generator_lambda.stream_query", return_value=iter(self._rows())) as mock_stream, \
+                patch("report_generator_lambda.get_s3_client", return_value=s3):
+            body = json.loads(lambda_handler({"action": "prerender", **event}, MagicMock())["body"])
+        return body, mock_stream
+
+    def test_per_account_reports_served_from_cache(self, s3, env_vars, mock_context):
+        body, mock_stream = self._prerender(s3, env_vars, {"run_id": "run-1", "workers": 1})
+
+        assert body == {"success": True, "run_id": "run-1", "rendered": 2, "skipped": 0,
+                        "resource_count": 5, "errors": {}}
+        assert mock_stream.call_count == 1
+
+        from report_generator_lambda import lambda_handler
+        with patch.dict("os.environ", env_vars), \
+                patch("report_generator_lambda.get_secret", return_value={"username": "u", "password": "p"}), \
+                patch("report_generator_lambda.get_latest_run_id", return_value="run-1"), \
+                patch("report_generator_lambda.iter_resources_from_database") as mock_fetch, \
+                patch("report_generator_lambda.get_s3_client", return_value=s3):
+            response = json.loads(lambda_handler({"account_ids": ["222"]}, mock_context)["body"])
+
+        mock_fetch.assert_not_called()
+        assert response["cached"] is True
+        assert response["resource_count"] == 2
+        assert response["filename"].startswith("CloudAuditor_Report_222_")
+
+    def test_superseded_run_not_rendered(self, s3, env_vars):
+        body, mock_stream = self._prerender(s3, env_vars, {"run_id": "run-0", "workers": 1})
+
+        assert "no longer the latest" in body["message"]
+        mock_stream.assert_not_called()
+
+    def test_cached_accounts_skipped(self, s3, env_vars):
+        self._prerender(s3, env_vars, {"run_id": "run-1", "workers": 1})
+        body, _ = self._prerender(s3, env_vars, {"run_id": "run-1", "workers": 1})
+
+        assert body["rendered"] == 0
+        assert body["skipped"] == 2
+
+    def test_renders_in_worker_processes(self, s3, env_vars):
+        body, _ = self._prerender(s3, env_vars, {"run_id": "run-1", "workers": 2})
+
+        assert body["rendered"] == 2
+        assert body["resource_count"] == 5
+        assert body["errors"] == {}
+
+    def test_spill_round_trip(self, tmp_path):
+        from report_generator_lambda import _read_spill, _spill_rows
+        rows = [{"arn": f"a{i}"} for i in range(5000)]
+
+        assert list(_read_spill(_spill_rows(iter(rows), str(tmp_path)))) == rows
+
+
+class TestReportJobs:
+
+    def test_submit_queues_job_and_invokes_worker(self, env_vars, mock_context):
+        mock_context.invoked_function_arn = "arn:aws:lambda:us-east-1:123:function:report"
+        db = MagicMock()
+
+        from report_generator_lambda import lambda_handler
+        with patch("report_generator_lambda.DatabaseClient", return_value=db), \
+                patch("report_generator_lambda.boto3") as mock_boto3:
+            response = lambda_handler({"action": "submit", "report_type": "diff"}, mock_context)
+
+        body = json.loads(response["body"])
+        assert response["statusCode"] == 202
+        assert body["status"] == "queued"
+        db.create_report_job.assert_called_once_with(body["job_id"], {"report_type": "diff"})
+        invoke = mock_boto3.client.return_value.invoke.call_args[1]
+        assert invoke["InvocationType"] == "Event"
+        assert invoke["FunctionName"] == mock_context.invoked_function_arn
+        assert json.loads(invoke["Payload"]) == {"action": "run_job", "job_id": body["job_id"]}
+
+    def test_submit_marks_job_failed_when_invoke_fails(self, env_vars, mock_context):
+        db = MagicMock()
+
+        from report_generator_lambda import lambda_handler
+        with patch("report_generator_lambda.DatabaseClient", return_value=db), \
+                patch("report_generator_lambda.boto3") as mock_boto3:
+            mock_boto3.client.return_value.invoke.side_effect = Exception("throttled")
+            response = lambda_handler({"action": "submit"}, mock_context)
+
+        assert response["statusCode"] == 500
+        db.fail_report_job.assert_called_once()
+
+    def test_run_job_records_progress_and_result(self, env_vars, mock_context):
+        db = MagicMock()
+        db.get_report_job.return_value = {"status": "queued", "request": {"account_ids": ["123"]}}
+        db.start_report_job.return_value = True
+
+        def fake_generate(request, progress=None):
+            assert request == {"account_ids": ["123"]}
+            progress(1000, 0)
+            progress(1500, 5)
+            return {"statusCode": 200, "body": json.dumps({
+                "success": True, "resource_count": 1500, "s3_bucket": "b", "s3_key": "k",
+                "download_url": "https://signed", "filename": "r.xlsx"})}
+
+        from report_generator_lambda import lambda_handler
+        with patch("report_generator_lambda.DatabaseClient", return_value=db), \
+                patch("report_generator_lambda.generate_report", side_effect=fake_generate):
+            response = lambda_handler({"action": "run_job", "job_id": "job-1"}, mock_context)
+
+        assert response["statusCode"] == 200
+        db.update_report_job_progress.assert_any_call("job-1", 1000, 0)
+        db.update_report_job_progress.assert_any_call("job-1", 1500, 5)
+        db.complete_report_job.assert_called_once_with(
+            "job-1", "b", "k", {"resource_count": 1500, "filename": "r.xlsx"})
+
+    def test_run_job_skips_claimed_job(self, env_vars, mock_context):
+        db = MagicMock()
+        db.get_report_job.return_value = {"status": "running", "request": {}}
+        db.start_report_job.return_value = False
+
+        from report_generator_lambda import lambda_handler
+        with patch("report_generator_lambda.DatabaseClient", return_value=db), \
+                patch("report_generator_lambda.generate_report") as mock_generate:
+            response = lambda_handler({"action": "run_job", "job_id": "job-1"}, mock_context)
+
+        assert response["statusCode"] == 409
+        mock_generate.assert_not_called()
+
+    def test_run_job_failure_recorded(self, env_vars, mock_context):
+        db = MagicMock()
+        db.get_report_job.return_value = {"status": "queued", "request": {}}
+        db.start_report_job.return_value = True
+
+        from report_generator_lambda import lambda_handler
+        with patch("report_generator_lambda.DatabaseClient", return_value=db), \
+                patch("report_generator_lambda.generate_report", side_effect=RuntimeError("db down")):
+            response = lambda_handler({"action": "run_job", "job_id": "job-1"}, mock_context)
+
+        assert response["statusCode"] == 500
+        db.fail_report_job.assert_called_once_with("job-1", "db down")
+        db.complete_report_job.assert_not_called()
+
+    def test_status_of_completed_job_includes_download_url(self, env_vars, mock_context):
+        now = datetime.now()
+        db = MagicMock()
+        db.get_report_job.return_value = {
+            "job_id": "job-1", "status": "completed", "rows_processed": 1500, "sheets_completed": 5,
+            "s3_bucket": "b", "s3_key": "k", "result": {"resource_count": 1500, "filename": "r.xlsx"},
+            "error": None, "created_at": now, "started_at": now, "updated_at": now, "completed_at": now,
+        }
+        s3 = MagicMock()
+        s3.head_object.return_value = {"LastModified": datetime.now(timezone.utc)}
+        s3.generate_presigned_url.return_value = "https://signed"
+
+        from report_generator_lambda import lambda_handler
+        with patch("report_generator_lambda.DatabaseClient", return_value=db), \
+                patch("report_generator_lambda.get_s3_client", return_value=s3):
+            response = lambda_handler({"action": "status", "job_id": "job-1"}, mock_context)
+
+        body = json.loads(response["body"])
+        assert body["status"] == "completed"
+        assert body["download_url"] == "https://signed"
+        assert body["resource_count"] == 1500
+
+    def _job_status(self, mock_context, s3, **job):
+        now = datetime.now()
+        db = MagicMock()
+        db.get_report_job.return_value = {
+            "job_id": "job-1", "status": "completed", "rows_processed": 10, "sheets_completed": 5,
+            "s3_bucket": "b", "s3_key": "reports/cache/run-1/k.xlsx", "result": {"resource_count": 10},
+            "error": None, "created_at": now, "started_at": now, "updated_at": now, "completed_at": now,
+            **job,
+        }
+
+        from report_generator_lambda import lambda_handler
+        with patch("report_generator_lambda.DatabaseClient", return_value=db), \
+                patch("report_generator_lambda.get_s3_client", return_value=s3):
+            return json.loads(lambda_handler({"action": "status", "job_id": "job-1"}, mock_context)["body"])
+
+    def test_status_of_job_served_from_expiring_cache(self, env_vars, mock_context):
+        from datetime import timedelta
+        s3 = MagicMock()
+        # The job just completed, from an artifact rendered eight days ago
+        s3.head_object.return_value = {"LastModified": datetime.now(timezone.utc) - timedelta(days=8)}
+
+        body = self._job_status(mock_context, s3)
+
+        assert body["status"] == "expired"
+        assert "download_url" not in body
+        s3.generate_presigned_url.assert_not_called()
+
+    def test_status_of_job_whose_report_was_deleted(self, env_vars, mock_context):
+        s3 = MagicMock()
+        s3.head_object.side_effect = ClientError({"Error": {"Code": "404"}}, "HeadObject")
+
+        body = self._job_status(mock_context, s3, s3_key="reports/CloudAuditor_Report.xlsx")
+
+        assert body["status"] == "expired"
+        s3.generate_presigned_url.assert_not_called()
+
+    def test_status_marks_stale_running_job_failed(self, env_vars, mock_context):
+        from datetime import timedelta
+        stale = datetime.now() - timedelta(hours=1)
+        db = MagicMock()
+        db.get_report_job.return_value = {
+            "job_id": "job-1", "status": "running", "rows_processed": 3000, "sheets_completed": 0,
+            "s3_bucket": None, "s3_key": None, "result": None, "error": None,
+            "created_at": stale, "started_at": stale, "updated_at": stale, "completed_at": None,
+        }
+
+        from report_generator_lambda import lambda_handler
+        with patch("report_generator_lambda.DatabaseClient", return_value=db):
+            body = json.loads(lambda_handler({"action": "status", "job_id": "job-1"}, mock_context)["body"])
+
+        assert body["status"] == "failed"
+        assert "timed out" in body["error"]
+        db.fail_report_job.assert_called_once()
+
+    def test_status_unknown_job(self, env_vars, mock_context):
+        db = MagicMock()
+        db.get_report_job.return_value = None
+
+        from report_generator_lambda import lambda_handler
+        with patch("report_generator_lambda.DatabaseClient", return_value=db):
+            response = lambda_handler({"action": "status", "job_id": "nope"}, mock_context)
+
+        assert response["statusCode"] == 404
+
+
 class TestFetchResources:
 
     @patch("report_generator_lambda.psycopg")
@@ -131,6 +640,42 @@ class TestFetchResources:
         sql = mock_cursor.execute.call_args[0][0]
         assert "account_id IN" in sql
 
+    @patch("report_generator_lambda.psycopg")
+    def test_connects_read_only_to_reader(self, mock_psycopg):
+        mock_cursor = MagicMock()
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_psycopg.connect.return_value = mock_conn
+        mock_cursor.fetchall.return_value = []
+
+        from report_generator_lambda import fetch_resources_from_database
+        fetch_resources_from_database("writer", "db", "user", "pass", reader_host="reader")
+
+        kwargs = mock_psycopg.connect.call_args[1]
+        assert kwargs["host"] == "reader"
+        assert "default_transaction_read_only=on" in kwargs["options"]
+
+    @patch("report_generator_lambda.psycopg")
+    def test_streams_chunks_from_server_side_cursor(self, mock_psycopg):
+        mock_cursor = MagicMock()
+        mock_conn = MagicMock()
+        mock_conn.cursor.return_value.__enter__ = MagicMock(return_value=mock_cursor)
+        mock_conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+        mock_psycopg.connect.return_value = mock_conn
+        row = ("i-001", "AWS::EC2::Instance", "arn:aws:ec2:us-east-1:123:instance/i-001", "us-east-1",
+               "123", "web", None, None, None, None, datetime(2026, 3, 30))
+        mock_cursor.__iter__.return_value = iter([row] * 5)
+
+        from report_generator_lambda import iter_resources_from_database
+        chunks = list(iter_resources_from_database("host", "db", "user", "pass", itersize=2))
+
+        assert [len(c) for c in chunks] == [2, 2, 1]
+        assert chunks[0][0]["resource_id"] == "i-001"
+        assert chunks[0][0]["tags"] == {}
+        assert mock_conn.cursor.call_args[1]["name"] == "report_resources"
+        mock_conn.close.assert_called_once()
+
 
 class TestUploadToS3:
 
@@ -180,3 +725,44 @@ class TestGenerateExcelReport:
         result = generate_excel_report(resources)
         assert isinstance(result, bytes)
         assert len(result) > 0
+
+    def test_streamed_sheets_and_aggregates(self, tmp_path):
+        from openpyxl import load_workbook
+        from report_generator_lambda import write_excel_report
+
+        def resources():
+            for i in range(6):
+                yield {
+                    "arn": f"arn:aws:ec2:us-east-1:123:instance/i-{i}",
+                    "resource_type": "AWS::EC2::Instance" if i % 2 else "AWS::S3::Bucket",
+                    "region": "us-east-1" if i < 4 else "eu-west-1",
+                    "account_id": "111" if i < 3 else "222",
+                    "name": f"r{i}",
+                    "resource_id": f"i-{i}",
+                    "inserted_at": "2026-03-30T00:00:00Z",
+                }
+
+        path = tmp_path / "report.xlsx"
+        assert write_excel_report(resources(), str(path)) == 6
+
+        wb = load_workbook(path, read_only=True)
+        assert wb.sheetnames == ["Executive Summary", "All Resources", "By Type", "By Account", "By Region"]
+        summary = dict(list(wb["Executive Summary"].values)[1:])
+        assert summary["Total Resources"] == 6
+        assert summary["Accounts"] == 2
+        assert summary["Regions"] == 2
+        assert len(list(wb["All Resources"].values)) == 7
+        assert list(wb["By Account"].values)[1] == ("111", 3, 2, 1)
+        assert list(wb["By Region"].values)[1] == ("us-east-1", 4)
+
+    def test_progress_reported_per_rows_and_sheet(self, tmp_path):
+        from report_generator_lambda import PROGRESS_EVERY_ROWS, write_excel_report
+        calls = []
+        resources = ({"arn": f"a{i}", "account_id": "123", "region": "us-east-1",
+                      "resource_type": "AWS::S3::Bucket"} for i in range(PROGRESS_EVERY_ROWS + 1))
+
+        write_excel_report(resources, str(tmp_path / "report.xlsx"),
+                           progress=lambda rows, sheets: calls.append((rows, sheets)))
+
+        assert calls[0] == (PROGRESS_EVERY_ROWS, 0)
+        assert calls[1:] == [(PROGRESS_EVERY_ROWS + 1, n) for n in range(1, 6)]
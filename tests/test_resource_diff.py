@@ -0,0 +1,132 @@
+"""
+Unit tests for lib.resource_diff (run-to-run diff report query)
+"""
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from lib.resource_diff import (
+    get_run_pair, build_diff_query, summarize_changes, row_to_change_dict, iter_resource_diff,
+    SUMMARY_VALUE_LIMIT,
+)
+
+BASE = {"run_id": "run-1", "started_at": datetime(2026, 3, 29, 2, tzinfo=timezone.utc),
+        "completed_at": datetime(2026, 3, 29, 3, tzinfo=timezone.utc), "total_resources": 10}
+TARGET = {"run_id": "run-2", "started_at": datetime(2026, 3, 30, 2, tzinfo=timezone.utc),
+          "completed_at": datetime(2026, 3, 30, 3, tzinfo=timezone.utc), "total_resources": 11}
+
+
+def _run_row(run):
+    return (run["run_id"], run["started_at"], run["completed_at"], run["total_resources"])
+
+
+@pytest.fixture
+def mock_conn():
+    conn = MagicMock()
+    cursor = MagicMock()
+    conn.cursor.return_value.__enter__ = MagicMock(return_value=cursor)
+    conn.cursor.return_value.__exit__ = MagicMock(return_value=False)
+    return conn, cursor
+
+
+class TestGetRunPair:
+
+    def test_defaults_to_latest_and_previous(self, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.side_effect = [_run_row(TARGET), _run_row(BASE)]
+
+        base, target = get_run_pair(conn)
+
+        assert (base["run_id"], target["run_id"]) == ("run-1", "run-2")
+        # Base lookup is bounded by the target's start time
+        assert cursor.execute.call_args_list[1][0][1] == (TARGET["started_at"],)
+
+    def test_explicit_run_ids(self, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.side_effect = [_run_row(TARGET), _run_row(BASE)]
+
+        get_run_pair(conn, base_run_id="run-1", target_run_id="run-2")
+
+        assert cursor.execute.call_args_list[0][0][1] == ("run-2",)
+        assert cursor.execute.call_args_list[1][0][1] == ("run-1",)
+
+    def test_single_run_raises(self, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.side_effect = [_run_row(TARGET), None]
+
+        with pytest.raises(ValueError, match="before run-2"):
+            get_run_pair(conn)
+
+    def test_reversed_runs_raise(self, mock_conn):
+        conn, cursor = mock_conn
+        cursor.fetchone.side_effect = [_run_row(BASE), _run_row(TARGET)]
+
+        with pytest.raises(ValueError, match="must start before"):
+            get_run_pair(conn, base_run_id="run-2", target_run_id="run-1")
+
+
+class TestBuildDiffQuery:
+
+    def test_window_params(self):
+        query, params = build_diff_query(BASE, TARGET)
+
+        assert params == {
+            "base_started": BASE["started_at"], "base_completed": BASE["completed_at"],
+            "target_started": TARGET["started_at"], "target_completed": TARGET["completed_at"],
+        }
+        assert "resource_changes" in query
+        for change_type in ("'added'", "'removed'", "'modified'"):
+            assert change_type in query
+        assert "ANY(" not in query
+
+    def test_modified_changes_selected_by_run(self):
+        query, _ = build_diff_query(BASE, TARGET)
+        field_changes = query.split("modified AS")[0]
+
+        # Changes are attributed by the run that wrote them, not by when they were written
+        assert "c.run_id IN (" in field_changes
+        assert "started_at > %(base_started)s AND started_at <= %(target_started)s" in field_changes
+        assert "status <> 'failed'" in field_changes
+        assert "c.changed_at >" not in field_changes
+
+    def test_account_filter_applied_to_every_branch(self):
+        query, params = build_diff_query(BASE, TARGET, account_ids=["111", "222"])
+
+        assert params["account_ids"] == ["111", "222"]
+        assert query.count("r.account_id = ANY(%(account_ids)s)") == 3
+
+
+class TestSummaries:
+
+    def test_summarize_changes(self):
+        summary = summarize_changes({
+            "properties.InstanceType": {"old": "t3.micro", "new": "t3.large"},
+            "tags.Env": {"old": None, "new": "prod"},
+        })
+        assert summary == "properties.InstanceType: t3.micro -> t3.large\ntags.Env: null -> prod"
+
+    def test_long_values_truncated(self):
+        summary = summarize_changes({"properties.Policy": {"old": {"a": "x" * 500}, "new": None}})
+        old_value = summary.split(": ", 1)[1].split(" -> ")[0]
+        assert len(old_value) == SUMMARY_VALUE_LIMIT
+        assert old_value.endswith("...")
+
+    def test_row_to_change_dict(self):
+        row = ("modified", "123", "us-east-1", "AWS::EC2::Instance", "i-001", "web", None,
+               ["name", "tags.Env"], {"name": {"old": "a", "new": "b"}})
+        change = row_to_change_dict(row)
+
+        assert change["change_type"] == "modified"
+        assert change["arn"] == ""
+        assert change["changed_fields"] == "name, tags.Env"
+        assert change["change_summary"] == "name: a -> b"
+
+    def test_iter_resource_diff_uses_named_cursor(self, mock_conn):
+        conn, cursor = mock_conn
+        cursor.__iter__.return_value = iter([("added", "123", "us-east-1", "AWS::S3::Bucket", "b", "b",
+                                              "arn:aws:s3:::b", None, None)])
+
+        chunks = list(iter_resource_diff(conn, BASE, TARGET))
+
+        assert chunks[0][0]["change_summary"] == ""
+        assert conn.cursor.call_args[1]["name"] == "resource_diff"
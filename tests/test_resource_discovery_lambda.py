@@ -4,10 +4,12 @@ Unit tests for resource_discovery_lambda.lambda_handler
 Tests the Lambda handler orchestration with all collaborators mocked.
 """
 import json
+import os
 import pytest
 from unittest.mock import MagicMock, patch, PropertyMock
 
 from resource_discovery.models import DiscoveryResult, DiscoverySource
+from resource_discovery.error_ledger import ACCOUNT_OPERATION
 from tests.conftest import make_resource, make_discovery_result
 
 
@@ -71,6 +73,31 @@ class TestResourceDiscoveryLambda:
         assert body["success"] is True
         assert body["total_resources"] == 5
 
+    @patch("resource_discovery_lambda.OrganizationsClient")
+    @patch("resource_discovery_lambda.DatabaseClient")
+    @patch("resource_discovery_lambda.ResourceDiscoveryEngine")
+    @patch("resource_discovery_lambda.boto3")
+    def test_spilled_result_saved_batch_by_batch(self, mock_boto3, mock_engine_cls, mock_db_cls, mock_org_cls,
+                                                 scheduled_event, mock_context):
+        mock_db = MagicMock()
+        mock_db.get_monitored_accounts.return_value = [{"account_id": "123", "status": "active"}]
+        mock_db_cls.return_value = mock_db
+        mock_org_cls.return_value.is_organization_management_account.return_value = False
+
+        result = make_discovery_result(memory_budget=1)
+        result.add_resources([make_resource(arn=f"arn:aws:ec2:us-east-1:123:i/i-{i}") for i in range(3)])
+        result.total_count = result.resource_count
+        spill_files = list(result.spill_files)
+        mock_engine_cls.return_value.discover_all_resources.return_value = result
+        mock_engine_cls.return_value.get_resource_summary.return_value = {"AWS::EC2::Instance": 3}
+
+        response = _import_handler()(scheduled_event, mock_context)
+
+        assert response["statusCode"] == 200
+        saved = [len(call.args[0]) for call in mock_db.save_resource_batch.call_args_list]
+        assert sum(saved) == 3
+        assert not any(os.path.exists(path) for path in spill_files)
+
     @patch("resource_discovery_lambda.OrganizationsClient")
     @patch("resource_discovery_lambda.DatabaseClient")
     @patch("resource_discovery_lambda.ResourceDiscoveryEngine")
@@ -151,11 +178,12 @@ class TestResourceDiscoveryLambda:
         mock_org.is_organization_management_account.return_value = False
         mock_org_cls.return_value = mock_org
 
-        # Discovery returns with errors containing account ID
-        result = make_discovery_result(
-            success=False,
-            errors=["Failed to discover account 123: timeout"],
-        )
+        # Discovery couldn't reach account 123; a per-type failure elsewhere doesn't mark its account
+        result = make_discovery_result()
+        result.add_error("Failed to discover account 123: timeout", account_id="123",
+                         operation=ACCOUNT_OPERATION)
+        result.error_ledger.record("AWS::S3::Bucket: denied", account_id="456", source="config",
+                                   operation="list_discovered_resources", code="AccessDenied")
         mock_engine = MagicMock()
         mock_engine.discover_all_resources.return_value = result
         mock_engine.get_resource_summary.return_value = {}
@@ -167,7 +195,12 @@ class TestResourceDiscoveryLambda:
         # Should have called update_account_status with 'error'
         update_calls = mock_db.update_account_status.call_args_list
         error_calls = [c for c in update_calls if c[0][1] == "error"]
-        assert len(error_calls) > 0
+        assert [c[0][0] for c in error_calls] == ["123"]
+        assert error_calls[0][1]["last_error"] == "Failed to discover account 123: timeout"
+        # The ledger is stored as discovery_run_errors rows
+        run_id, ledger = mock_db.save_run_errors.call_args[0]
+        assert ledger is result.error_ledger
+        assert json.loads(response["body"])["errors_by_account"] == {"123": 1, "456": 1}
 
     @patch("resource_discovery_lambda.OrganizationsClient")
     @patch("resource_discovery_lambda.DatabaseClient")
@@ -196,6 +229,31 @@ class TestResourceDiscoveryLambda:
         mock_db.start_discovery_run.assert_called_once()
         mock_db.complete_discovery_run.assert_called_once()
 
+    @patch("resource_discovery_lambda.OrganizationsClient")
+    @patch("resource_discovery_lambda.DatabaseClient")
+    @patch("resource_discovery_lambda.ResourceDiscoveryEngine")
+    @patch("resource_discovery_lambda.boto3")
+    def test_triggers_report_prerendering(self, mock_boto3, mock_engine_cls, mock_db_cls, mock_org_cls,
+                                          scheduled_event, mock_context):
+        mock_db = MagicMock()
+        mock_db.get_monitored_accounts.return_value = [
+            {"account_id": "123", "role_arn": "arn", "status": "active"}
+        ]
+        mock_db_cls.return_value = mock_db
+        mock_org_cls.return_value.is_organization_management_account.return_value = False
+        mock_engine_cls.return_value.discover_all_resources.return_value = make_discovery_result()
+        mock_engine_cls.return_value.get_resource_summary.return_value = {}
+
+        handler = _import_handler()
+        with patch.dict("os.environ", {"REPORT_FUNCTION_NAME": "report-fn"}):
+            handler(scheduled_event, mock_context)
+
+        invoke = mock_boto3.client.return_value.invoke.call_args[1]
+        run_id = mock_db.start_discovery_run.call_args[0][0]
+        assert invoke["FunctionName"] == "report-fn"
+        assert invoke["InvocationType"] == "Event"
+        assert json.loads(invoke["Payload"]) == {"action": "prerender", "run_id": run_id}
+
     @patch("resource_discovery_lambda.OrganizationsClient")
     @patch("resource_discovery_lambda.DatabaseClient")
     @patch("resource_discovery_lambda.boto3")
@@ -8,7 +8,7 @@ import pytest
 from unittest.mock import MagicMock, patch
 from botocore.exceptions import ClientError
 
-from resource_discovery.resource_explorer_client import ResourceExplorerClient
+from resource_discovery.resource_explorer_client import MAX_QUERY_LENGTH, ResourceExplorerClient
 from resource_discovery.models import DiscoverySource
 
 
@@ -94,6 +94,17 @@ class TestConvertToResource:
         resource = client.convert_to_resource(raw)
         assert resource.account_id == "unknown"
 
+    def test_owning_account_for_s3(self):
+        """S3 ARNs carry no account; the owning account Resource Explorer reports is used."""
+        client = _make_client()
+        raw = {
+            "Arn": "arn:aws:s3:::my-bucket",
+            "ResourceType": "s3:bucket",
+            "OwningAccountId": "123456789012",
+            "Properties": [],
+        }
+        assert client.convert_to_resource(raw).account_id == "123456789012"
+
 
 # ===================================================================
 # _build_query_string
@@ -117,9 +128,8 @@ class TestBuildQueryString:
         q = client._build_query_string({
             "resource_types": ["AWS::EC2::Instance", "AWS::S3::Bucket"]
         })
-        assert "resourcetype:AWS::EC2::Instance" in q
-        assert "resourcetype:AWS::S3::Bucket" in q
-        assert " OR " in q
+        # Same-prefix terms are ORed by Resource Explorer; there is no OR keyword
+        assert q == "resourcetype:AWS::EC2::Instance resourcetype:AWS::S3::Bucket"
 
     def test_tag_filter(self):
         client = _make_client()
@@ -134,9 +144,7 @@ class TestBuildQueryString:
     def test_region_filter_multiple(self):
         client = _make_client()
         q = client._build_query_string({"regions": ["us-east-1", "eu-west-1"]})
-        assert "region:us-east-1" in q
-        assert "region:eu-west-1" in q
-        assert " OR " in q
+        assert q == "region:us-east-1 region:eu-west-1"
 
     def test_combined_filters(self):
         client = _make_client()
@@ -145,10 +153,39 @@ class TestBuildQueryString:
             "tags": {"Team": "platform"},
             "regions": "us-east-1",
         })
-        assert " AND " in q
-        assert "resourcetype:AWS::EC2::Instance" in q
-        assert "tag:Team=platform" in q
-        assert "region:us-east-1" in q
+        # Different prefixes are ANDed
+        assert q == "resourcetype:AWS::EC2::Instance tag:Team=platform region:us-east-1"
+
+    def test_exclude_types_negated(self):
+        client = _make_client()
+        q = client._build_query_string({"exclude_types": ["AWS::IAM::Role"], "regions": ["us-east-1"]})
+        assert q == "region:us-east-1 -resourcetype:AWS::IAM::Role"
+
+    def test_service_terms(self):
+        client = _make_client()
+        q = client._build_query_string({"services": ["ec2"], "exclude_services": ["iam"]})
+        assert q == "service:ec2 -service:iam"
+
+    def test_exclusions_dropped_past_length_limit(self):
+        client = _make_client()
+        excluded = [f"AWS::Service{i}::Type" for i in range(60)]
+        q = client._build_query_string({"exclude_types": excluded, "regions": ["us-east-1"]})
+        assert q == "region:us-east-1"
+
+    def test_long_type_list_split_across_queries(self):
+        client = _make_client()
+        types = [f"AWS::Service{i}::Type" for i in range(120)]
+        queries = client._build_query_strings({"resource_types": types, "regions": ["us-east-1"]})
+        assert len(queries) > 1
+        assert all(len(q) <= MAX_QUERY_LENGTH and q.endswith("region:us-east-1") for q in queries)
+        found = [term for q in queries for term in q.split() if term.startswith("resourcetype:")]
+        assert found == [f"resourcetype:{t}" for t in types]
+
+    def test_short_query_not_split(self):
+        client = _make_client()
+        assert client._build_query_strings({"resource_types": ["AWS::S3::Bucket"]}) == [
+            "resourcetype:AWS::S3::Bucket"
+        ]
 
 
 # ===================================================================
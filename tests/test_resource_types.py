@@ -0,0 +1,74 @@
+"""
+Unit tests for resource_discovery.resource_types
+"""
+import pytest
+
+from resource_discovery.models import DiscoveryConfig
+from resource_discovery.resource_types import TypeFilter, TypeMatcher, canonical_type
+
+
+class TestCanonicalType:
+
+    @pytest.mark.parametrize("cloudformation,resource_explorer", [
+        ("AWS::EC2::Instance", "ec2:instance"),
+        ("AWS::EC2::SecurityGroup", "ec2:security-group"),
+        ("AWS::RDS::DBInstance", "rds:db"),
+        ("AWS::RDS::DBCluster", "rds:cluster"),
+        ("AWS::ElasticLoadBalancingV2::LoadBalancer", "elasticloadbalancing:loadbalancer/net"),
+        ("AWS::Logs::LogGroup", "logs:log-group"),
+    ])
+    def test_naming_schemes_agree(self, cloudformation, resource_explorer):
+        assert canonical_type(cloudformation) == canonical_type(resource_explorer)
+
+    def test_unknown_types_normalized(self):
+        assert canonical_type("AWS::Foo::BarBaz") == canonical_type("foo:bar-baz") == "foo:barbaz"
+
+
+class TestTypeMatcher:
+
+    def test_exact_types_in_either_scheme(self):
+        matcher = TypeMatcher(["ec2:instance", "AWS::S3::Bucket"])
+        assert matcher.matches("AWS::EC2::Instance")
+        assert matcher.matches("s3:bucket")
+        assert not matcher.matches("AWS::EC2::Volume")
+
+    def test_service_globs(self):
+        matcher = TypeMatcher(["ec2:*", "AWS::RDS::*"])
+        assert matcher.services == {"ec2", "rds"}
+        assert matcher.matches("AWS::EC2::Volume")
+        assert matcher.matches("rds:db")
+        assert not matcher.matches("AWS::S3::Bucket")
+
+    def test_other_globs(self):
+        matcher = TypeMatcher(["AWS::EC2::*Gateway", "*:function"])
+        assert matcher.has_type_globs
+        assert matcher.matches("ec2:internet-gateway")
+        assert matcher.matches("AWS::Lambda::Function")
+        assert not matcher.matches("AWS::EC2::Instance")
+
+    def test_cloudformation_names_resolved(self):
+        matcher = TypeMatcher(["rds:db", "AWS::Custom::Thing"])
+        assert matcher.cloudformation_types == ["AWS::RDS::DBInstance", "AWS::Custom::Thing"]
+        assert matcher.resolved
+        assert not TypeMatcher(["custom:thing"]).resolved
+
+
+class TestTypeFilter:
+
+    def test_exclusions_win(self):
+        type_filter = TypeFilter(["ec2:*"], ["AWS::EC2::Volume"])
+        assert type_filter.includes("ec2:instance")
+        assert not type_filter.includes("ec2:volume")
+        assert not type_filter.includes("s3:bucket")
+
+    def test_no_include_list_keeps_everything_not_excluded(self):
+        type_filter = TypeFilter(None, ["iam:*"])
+        assert type_filter.includes("AWS::S3::Bucket")
+        assert not type_filter.includes("AWS::IAM::Role")
+
+    def test_config_should_include_type(self):
+        config = DiscoveryConfig(include_types=["ec2:instance"])
+        assert config.should_include_type("AWS::EC2::Instance")
+        config.include_types = ["s3:*"]
+        assert not config.should_include_type("AWS::EC2::Instance")
+        assert config.should_include_type("AWS::S3::Bucket")
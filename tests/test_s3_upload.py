@@ -0,0 +1,86 @@
+"""
+Unit tests for lib.s3_upload (S3StreamingUpload)
+
+Runs against moto's in-memory S3.
+"""
+import os
+import zipfile
+import pytest
+import boto3
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from lib.s3_upload import S3StreamingUpload, MIN_PART_SIZE
+
+BUCKET = "test-reports"
+
+
+@pytest.fixture
+def s3():
+    with mock_aws(), patch.dict("os.environ", {"AWS_DEFAULT_REGION": "us-east-1",
+                                               "AWS_ACCESS_KEY_ID": "testing",
+                                               "AWS_SECRET_ACCESS_KEY": "testing"}):
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def _get(s3, key):
+    return s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+
+
+class TestS3StreamingUpload:
+
+    def test_small_object_uses_single_put(self, s3):
+        with patch.object(s3, "create_multipart_upload", wraps=s3.create_multipart_upload) as create:
+            with S3StreamingUpload(s3, BUCKET, "small.bin", content_type="text/plain") as sink:
+                sink.write(b"hello ")
+                sink.write(b"world")
+            create.assert_not_called()
+
+        assert _get(s3, "small.bin") == b"hello world"
+        assert s3.head_object(Bucket=BUCKET, Key="small.bin")["ContentType"] == "text/plain"
+
+    def test_large_object_uploaded_in_parts(self, s3):
+        data = os.urandom(2 * MIN_PART_SIZE + 1234)
+        with S3StreamingUpload(s3, BUCKET, "large.bin", part_size=MIN_PART_SIZE) as sink:
+            for offset in range(0, len(data), 1024 * 1024):
+                sink.write(data[offset:offset + 1024 * 1024])
+
+        assert _get(s3, "large.bin") == data
+        assert sink.tell() == len(data)
+        assert len(sink._futures) == 3
+
+    def test_exception_aborts_upload(self, s3):
+        with pytest.raises(RuntimeError):
+            with S3StreamingUpload(s3, BUCKET, "failed.bin", part_size=MIN_PART_SIZE) as sink:
+                sink.write(os.urandom(MIN_PART_SIZE + 1))
+                raise RuntimeError("render failed")
+
+        assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+        assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+
+    def test_spools_when_multipart_unavailable(self, s3):
+        data = os.urandom(MIN_PART_SIZE + 10)
+        error = ClientError({"Error": {"Code": "AccessDenied", "Message": "denied"}}, "CreateMultipartUpload")
+        with patch.object(s3, "create_multipart_upload", side_effect=error):
+            with S3StreamingUpload(s3, BUCKET, "spooled.bin", part_size=MIN_PART_SIZE) as sink:
+                sink.write(data[:100])
+                sink.write(data[100:])
+
+        assert _get(s3, "spooled.bin") == data
+
+    def test_zipfile_can_write_to_sink(self, s3):
+        """openpyxl saves through zipfile, which must cope with a non-seekable sink."""
+        with S3StreamingUpload(s3, BUCKET, "archive.zip") as sink:
+            with zipfile.ZipFile(sink, "w") as archive:
+                archive.writestr("a.txt", "contents")
+
+        import io
+        with zipfile.ZipFile(io.BytesIO(_get(s3, "archive.zip"))) as archive:
+            assert archive.read("a.txt") == b"contents"
+
+    def test_rejects_small_part_size(self, s3):
+        with pytest.raises(ValueError):
+            S3StreamingUpload(s3, BUCKET, "x", part_size=1024)
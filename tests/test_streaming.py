@@ -0,0 +1,81 @@
+"""
+Unit tests for reporting.streaming (StreamingWorkbook, ResourceAggregator)
+"""
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from openpyxl import load_workbook
+
+from reporting.streaming import StreamingWorkbook, ResourceAggregator, cell_value
+from resource_discovery.models import DiscoverySource
+
+
+class TestCellValue:
+
+    def test_nested_values_become_json(self):
+        assert cell_value({"a": [1, 2]}) == '{"a":[1,2]}'
+
+    def test_aware_datetime_converted_to_naive_utc(self):
+        value = cell_value(datetime(2026, 3, 30, 12, tzinfo=timezone.utc))
+        assert value == datetime(2026, 3, 30, 12)
+        assert value.tzinfo is None
+
+    def test_enum_uses_value(self):
+        assert cell_value(DiscoverySource.CONFIG) == "config"
+
+
+class TestStreamingWorkbook:
+
+    def test_write_sheet_counts_rows(self, tmp_path):
+        workbook = StreamingWorkbook()
+        assert workbook.write_sheet("Data", ["a", "b"], ([i, i * 2] for i in range(3))) == 3
+        workbook.save(tmp_path / "out.xlsx")
+
+        assert list(load_workbook(tmp_path / "out.xlsx")["Data"].values) == [("a", "b"), (0, 0), (1, 2), (2, 4)]
+
+    def test_rolls_over_at_row_limit(self, tmp_path):
+        workbook = StreamingWorkbook()
+        with patch("reporting.streaming.EXCEL_MAX_ROWS", 3):
+            workbook.write_sheet("Data", ["n"], ([i] for i in range(5)))
+        workbook.save(tmp_path / "out.xlsx")
+
+        wb = load_workbook(tmp_path / "out.xlsx")
+        assert wb.sheetnames == ["Data", "Data (2)", "Data (3)"]
+        assert list(wb["Data (3)"].values) == [("n",), (4,)]
+
+    def test_add_sheet_before(self, tmp_path):
+        workbook = StreamingWorkbook()
+        workbook.add_sheet("Summary", ["x"])
+        workbook.add_sheet("Zeta", ["x"])
+        workbook.add_sheet("Alpha", ["x"], before="Zeta")
+        workbook.save(tmp_path / "out.xlsx")
+
+        assert load_workbook(tmp_path / "out.xlsx").sheetnames == ["Summary", "Alpha", "Zeta"]
+
+    def test_roll_over_stays_next_to_sheet(self, tmp_path):
+        workbook = StreamingWorkbook()
+        workbook.add_sheet("Data", ["n"])
+        workbook.add_sheet("Other", ["n"])
+        with patch("reporting.streaming.EXCEL_MAX_ROWS", 2):
+            for i in range(3):
+                workbook.append("Data", [i])
+        workbook.save(tmp_path / "out.xlsx")
+
+        assert load_workbook(tmp_path / "out.xlsx").sheetnames == ["Data", "Data (2)", "Data (3)", "Other"]
+
+
+class TestResourceAggregator:
+
+    def test_counts(self):
+        stats = ResourceAggregator()
+        for account_id, resource_type, region in [
+            ("111", "AWS::EC2::Instance", "us-east-1"),
+            ("111", "AWS::S3::Bucket", "global"),
+            ("222", "AWS::EC2::Instance", "us-east-1"),
+        ]:
+            stats.add({"account_id": account_id, "resource_type": resource_type, "region": region})
+
+        assert stats.total == 3
+        assert stats.ranked(stats.by_type)[0] == ["AWS::EC2::Instance", 2]
+        assert stats.account_rows() == [["111", 2, 2, 2], ["222", 1, 1, 1]]